@@ -1,7 +1,12 @@
-import unittest, logging, json
+import unittest, logging, json, os, tempfile
+
+from unittest import mock
 
 from os import getcwd, path
-from ttproto.core.analyzer import Analyzer
+from ttproto.core.analyzer import Analyzer, LiveAnalyzer, TestCaseLog, TestCaseRegistry, AnalysisResultCache, \
+    TC_MANIFEST_FILENAME
+from ttproto.core.dissector import Capture
+from ttproto.utils import pure_pcapy
 from ttproto.core.typecheck3000 import InputParameterError
 from tests.test_tools.struct_validator import StructureValidator
 
@@ -19,6 +24,7 @@ class CoAPAnalyzerTestCase(unittest.TestCase):
     UNKNOWN_TEST_ENV = 'unknown'
     TEST_CASE_ID = 'TD_COAP_CORE_01'
     TEST_CASE_ID_WHICH_BUGGED_IN_THE_PAST = 'TD_COAP_CORE_24'
+    TEST_CASE_ID_WITHOUT_STIMULIS = 'TD_COAP_CORE_29'
     UNKNOWN_TEST_CASE_ID = 'TD_COAP_CORE_42'
 
     # Create a struct checker object
@@ -142,6 +148,58 @@ class CoAPAnalyzerTestCase(unittest.TestCase):
 
                 print('Testcase %s , got verdict: %s' % (str(tc[0]), str(verdict).upper()))
 
+    # ##### analyse_all
+    def test_analyse_all(self):
+        filename = path.join(self.TEST_DIR, self.TEST_CASE_ID + '_PASS.pcap')
+        if not path.isfile(filename):
+            self.skipTest('no dump file %s' % filename)
+
+        results = self.analyzer.analyse_all(filename)
+
+        # one result per implemented test case, in the same order
+        self.assertEqual(
+            [r[0] for r in results],
+            [tc[0] for tc in self.analyzer.get_implemented_testcases()]
+        )
+
+        # same verdict and review frames than for a single test case analysis
+        result = [r for r in results if r[0] == self.TEST_CASE_ID][0]
+        tc_name, verdict, rev_frames, log, partial_verdicts, exception_info = self.analyzer.analyse(
+            filename,
+            self.TEST_CASE_ID
+        )
+        self.assertEqual(result[1], verdict)
+        self.assertEqual(result[2], rev_frames)
+
+    def test_analyse_all_selected_test_cases(self):
+        filename = path.join(self.TEST_DIR, self.TEST_CASE_ID + '_PASS.pcap')
+        if not path.isfile(filename):
+            self.skipTest('no dump file %s' % filename)
+
+        results = self.analyzer.analyse_all(filename, [self.TEST_CASE_ID])
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0][0], self.TEST_CASE_ID)
+
+    def test_analyse_all_test_case_without_stimulis(self):
+        if not self.TEST_CASE_ID_WITHOUT_STIMULIS:
+            self.skipTest('no test case without stimulis for %s' % self.TEST_ENV)
+        filename = path.join(self.TEST_DIR, self.TEST_CASE_ID + '_PASS.pcap')
+        if not path.isfile(filename):
+            self.skipTest('no dump file %s' % filename)
+
+        # analyse() can't run it
+        with self.assertRaises(NotImplementedError):
+            self.analyzer.analyse(filename, self.TEST_CASE_ID_WITHOUT_STIMULIS)
+
+        # analyse_all() reports it as an error, without stopping the analysis
+        results = self.analyzer.analyse_all(filename, [self.TEST_CASE_ID_WITHOUT_STIMULIS, self.TEST_CASE_ID])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0], self.TEST_CASE_ID_WITHOUT_STIMULIS)
+        self.assertEqual(results[0][1], 'error')
+        self.assertEqual(len(results[0][5]), 1)
+        self.assertIs(results[0][5][0][0], NotImplementedError)
+        self.assertEqual(results[1][1], 'pass')
+
 
 class SixlowpanHcAnalyzerTestCase(CoAPAnalyzerTestCase):
     # #################### Tests parameters #########################
@@ -151,6 +209,7 @@ class SixlowpanHcAnalyzerTestCase(CoAPAnalyzerTestCase):
     TEST_CASE_ID = 'TD_6LOWPAN_HC_01'
     UNKNOWN_TEST_CASE_ID = 'TD_6LOWPAN_HC_666'
     TEST_CASE_ID_WHICH_BUGGED_IN_THE_PAST = None
+    TEST_CASE_ID_WITHOUT_STIMULIS = None
 
 
 class LwM2MPRO_AnalyzerTestCase(CoAPAnalyzerTestCase):
@@ -161,6 +220,7 @@ class LwM2MPRO_AnalyzerTestCase(CoAPAnalyzerTestCase):
     TEST_CASE_ID = 'TD_LWM2M_1_INT_204'
     UNKNOWN_TEST_CASE_ID = 'asdasd'
     TEST_CASE_ID_WHICH_BUGGED_IN_THE_PAST = None
+    TEST_CASE_ID_WITHOUT_STIMULIS = None
 
 
 class Onem2m_AnalyzerTestCase(CoAPAnalyzerTestCase):
@@ -171,6 +231,326 @@ class Onem2m_AnalyzerTestCase(CoAPAnalyzerTestCase):
     TEST_CASE_ID = 'TD_M2M_NH_01'
     UNKNOWN_TEST_CASE_ID = 'asdasd'
     TEST_CASE_ID_WHICH_BUGGED_IN_THE_PAST = None
+    TEST_CASE_ID_WITHOUT_STIMULIS = None
+
+
+class TestCaseRegistryTestCase(unittest.TestCase):
+    """
+    Test class for the registry of the test cases of a test environment
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.testcases_dir = path.join(self.tmp_dir.name, 'tat_dummy', 'testcases')
+        os.makedirs(self.testcases_dir)
+        for name in ('__init__.py', 'td_dummy_02.py', 'td_dummy_01.py', 'common.py'):
+            open(path.join(self.testcases_dir, name), 'w').close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write_manifest(self, modnames):
+        with open(path.join(self.testcases_dir, TC_MANIFEST_FILENAME), 'w') as f:
+            json.dump([
+                {
+                    'id': modname.upper(),
+                    'module': 'ttproto.tat_dummy.testcases.' + modname,
+                    'class': modname.upper(),
+                    'purpose': 'purpose of ' + modname,
+                    'stimulis': [],
+                    'sha1': AnalysisResultCache.hash_file(path.join(self.testcases_dir, modname + '.py')),
+                }
+                for modname in modnames
+            ], f)
+
+    def test_get_entries_from_directory(self):
+        registry = TestCaseRegistry(self.testcases_dir)
+
+        entries = registry.get_entries()
+        self.assertEqual([e['id'] for e in entries], ['TD_DUMMY_01', 'TD_DUMMY_02'])
+        self.assertEqual(entries[1]['module'], 'ttproto.tat_dummy.testcases.td_dummy_02')
+        self.assertIsNone(entries[1]['purpose'])
+
+        self.assertEqual(registry.get_entries(['td_dummy_02']), [entries[1]])
+        with self.assertRaises(FileNotFoundError):
+            registry.get_entries(['TD_DUMMY_03'])
+
+    def test_get_entries_from_manifest(self):
+        self.write_manifest(['td_dummy_01', 'td_dummy_02'])
+        registry = TestCaseRegistry(self.testcases_dir)
+
+        # The purpose comes from the manifest, the (empty) module isn't imported
+        entries = registry.get_entries(['TD_DUMMY_01'])
+        self.assertEqual(registry.get_purpose(entries[0]), 'purpose of td_dummy_01')
+
+    def test_out_of_date_manifest_is_ignored(self):
+        self.write_manifest(['td_dummy_01'])
+        registry = TestCaseRegistry(self.testcases_dir)
+
+        entries = registry.get_entries()
+        self.assertEqual([e['id'] for e in entries], ['TD_DUMMY_01', 'TD_DUMMY_02'])
+        self.assertIsNone(entries[0]['purpose'])
+
+    def test_modified_manifest_module_is_ignored(self):
+        self.write_manifest(['td_dummy_01', 'td_dummy_02'])
+        with open(path.join(self.testcases_dir, 'td_dummy_02.py'), 'w') as f:
+            f.write('# modified after the manifest was written\n')
+        registry = TestCaseRegistry(self.testcases_dir)
+
+        entries = registry.get_entries()
+        self.assertEqual([e['id'] for e in entries], ['TD_DUMMY_01', 'TD_DUMMY_02'])
+        self.assertIsNone(entries[0]['purpose'])
+
+    def test_registry_is_built_once_per_test_env(self):
+        self.assertIs(Analyzer('tat_coap').registry, Analyzer('tat_coap').registry)
+
+
+class LiveAnalyzerTestCase(unittest.TestCase):
+    """
+    Test class for the analysis of the frames of a live session
+    """
+
+    TEST_FILE = './tests/test_dumps/coap_core/TD_COAP_CORE_02_PASS_MULTIPLETIMES.pcap'
+    TEST_CASE_ID = 'TD_COAP_CORE_02'
+
+    @staticmethod
+    def read_frames(filename):
+        with open(filename, 'rb') as f:
+            reader = pure_pcapy.Reader(f)
+            while True:
+                header, data = reader.next()
+                if not header:
+                    return
+                ts = header.getts()
+                yield ts[0] + ts[1] * 0.000001, data, reader.datalink()
+
+    def test_live_analysis(self):
+        live_analyzer = LiveAnalyzer('tat_coap', [self.TEST_CASE_ID, 'TD_COAP_CORE_01'])
+
+        provisional_verdicts = []
+        for timestamp, data, datalink in self.read_frames(self.TEST_FILE):
+            live_analyzer.add_frame(timestamp, data, datalink)
+            provisional_verdicts += [(r[0], r[1]) for r in live_analyzer.update()]
+
+        # The verdict of the TC is updated while the frames are received
+        self.assertIn((self.TEST_CASE_ID, 'pass'), provisional_verdicts)
+        self.assertNotIn('TD_COAP_CORE_01', [tc_id for tc_id, _ in provisional_verdicts])
+
+        # The final verdicts are the ones of the post mortem analysis
+        results = live_analyzer.finish()
+        expected = Analyzer('tat_coap').analyse_all(self.TEST_FILE, [self.TEST_CASE_ID, 'TD_COAP_CORE_01'])
+        self.assertEqual([r[:3] for r in results], [r[:3] for r in expected])
+        self.assertEqual(results[0][1], 'pass')
+        self.assertEqual(results[1][1], 'inconclusive')
+
+    def test_live_analysis_runs_changed_conversations(self):
+        filename = './tests/test_dumps/preprocess/coap/Two_tc_two_times_each_with_overlap.pcap'
+        tc_id = 'TD_COAP_CORE_04'
+        test_case_class = Analyzer('tat_coap').import_test_cases([tc_id])[0]
+        live_analyzer = LiveAnalyzer('tat_coap', [tc_id])
+
+        # Record the first frame of each conversation run
+        runs = []
+        run = test_case_class.run
+
+        def recording_run(test_case):
+            runs.append(test_case._frame)
+            return run(test_case)
+
+        with mock.patch.object(test_case_class, 'run', recording_run):
+            for timestamp, data, datalink in self.read_frames(filename):
+                count = len(runs)
+                live_analyzer.add_frame(timestamp, data, datalink)
+                live_analyzer.update()
+
+                # Only the conversation which received the frame is run again
+                self.assertLessEqual(len(runs) - count, 1)
+
+        # The TC was run on its two conversations, which got two frames each
+        self.assertEqual(len(runs), 4)
+        self.assertEqual(len(set(map(id, runs))), 2)
+
+        # The results replayed are the ones of the post mortem analysis
+        expected = Analyzer('tat_coap').analyse_all(filename, [tc_id])
+        self.assertEqual([r[:5] for r in live_analyzer.finish()], [r[:5] for r in expected])
+
+
+class TestCaseLogTestCase(unittest.TestCase):
+    """
+    Test class for the structured log of the test cases
+    """
+
+    TEST_FILE = './tests/test_dumps/coap_core/TD_COAP_CORE_01_PASS.pcap'
+
+    def setUp(self):
+        from ttproto.tat_coap.testcases.td_coap_core_01 import TD_COAP_CORE_01
+        self.test_case = TD_COAP_CORE_01(Capture(self.TEST_FILE))
+        self.results = self.test_case.run_test_case()
+
+    def test_log_entries(self):
+        entries = self.test_case.get_log().get_entries()
+        entry_types = [entry_type for entry_type, _ in entries]
+        self.assertIn(TestCaseLog.FRAME, entry_types)
+        self.assertIn(TestCaseLog.VERDICT, entry_types)
+
+        # One verdict entry per partial verdict with a message
+        self.assertEqual(
+            [value for entry_type, value in entries if entry_type == TestCaseLog.VERDICT],
+            [v for v in self.results[3] if v[1]]
+        )
+
+    def test_log_rendering(self):
+        log = self.test_case.get_log()
+        text = log.get_text()
+        self.assertEqual(text, self.results[2])
+        self.assertEqual(len(text.splitlines()), len(log))
+        self.assertIn('<Frame   1:', text)
+
+        # Rendering again gives the same text, also after more entries
+        self.assertEqual(log.get_text(), text)
+        self.test_case.log('done')
+        self.assertEqual(log.get_text(), text + 'done\n')
+
+        dicts = json.loads(json.dumps(log.get_dicts()))
+        self.assertEqual(len(dicts), len(log))
+        self.assertEqual(dicts[0]['type'], TestCaseLog.FRAME)
+        self.assertEqual(dicts[0]['frame_id'], 1)
+        self.assertEqual(dicts[-1], {'type': TestCaseLog.MESSAGE, 'message': 'done'})
+
+
+class AnalysisResultCacheTestCase(unittest.TestCase):
+    """
+    Test class for the cache of the analysis results
+    """
+
+    TEST_DIR = './tests/test_dumps/coap_core/'
+    TEST_CASE_ID = 'TD_COAP_CORE_01'
+
+    def setUp(self):
+        self.analyzer = Analyzer('tat_coap')
+        self.analyzer.results_cache.clear()
+        self.test_case_class = self.analyzer.import_test_cases([self.TEST_CASE_ID])[0]
+
+    def tearDown(self):
+        self.analyzer.results_cache.clear()
+
+    def test_analyse_twice(self):
+        filename = path.join(self.TEST_DIR, self.TEST_CASE_ID + '_PASS.pcap')
+        results = self.analyzer.analyse(filename, self.TEST_CASE_ID)
+        self.assertEqual(self.analyzer.results_cache.misses, 1)
+
+        # Any analyzer of the process gets the same results from the cache
+        cached_results = Analyzer('tat_coap').analyse(filename, self.TEST_CASE_ID)
+        self.assertEqual(self.analyzer.results_cache.hits, 1)
+        self.assertEqual(cached_results, results)
+
+        # The returned results are copies
+        cached_results[2].append(42)
+        self.assertEqual(self.analyzer.analyse(filename, self.TEST_CASE_ID), results)
+
+    def test_key_of_capture_content(self):
+        filename = path.join(self.TEST_DIR, self.TEST_CASE_ID + '_PASS.pcap')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            copy = path.join(tmp_dir, 'copy.pcap')
+            with open(filename, 'rb') as src, open(copy, 'wb') as dst:
+                dst.write(src.read())
+
+            cache = self.analyzer.results_cache
+            key = cache.get_key(filename, self.test_case_class)
+            self.assertEqual(cache.get_key(copy, self.test_case_class), key)
+
+            with open(copy, 'ab') as dst:
+                dst.write(b'\x00')
+            self.assertNotEqual(cache.get_key(copy, self.test_case_class), key)
+
+        test_case_class_2 = self.analyzer.import_test_cases(['TD_COAP_CORE_02'])[0]
+        key_2 = cache.get_key(filename, test_case_class_2)
+        self.assertEqual(key_2[0], key[0])
+        self.assertNotEqual(key_2[2], key[2])
+
+    def test_lru_eviction(self):
+        cache = AnalysisResultCache(max_size=2)
+        keys = [('capture%d' % i, self.TEST_CASE_ID, 'source') for i in range(3)]
+        cache.put(keys[0], 'pass', [1], 'log', [('pass', 'ok')])
+        cache.put(keys[1], 'fail', [2], 'log', [('fail', 'ko')])
+
+        # Using the first one makes the second one the least recently used
+        self.assertEqual(cache.get(keys[0]), ('pass', [1], 'log', [('pass', 'ok')]))
+        cache.put(keys[2], 'inconclusive', [], 'log', [])
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNotNone(cache.get(keys[2]))
+
+
+class TestCaseBudgetsTestCase(unittest.TestCase):
+    """
+    Test class for the budgets of the test cases executions
+    """
+
+    TEST_FILE = './tests/test_dumps/coap_core/TD_COAP_CORE_01_PASS.pcap'
+
+    def setUp(self):
+        from ttproto.tat_coap.testcases.td_coap_core_01 import TD_COAP_CORE_01
+        self.test_case_class = TD_COAP_CORE_01
+        self.test_case_class.telemetry.clear()
+
+    def tearDown(self):
+        self.test_case_class.telemetry.clear()
+
+    @unittest.skipIf(
+        any(os.environ.get(name) for name in ('TC_MAX_DURATION', 'TC_MAX_FRAMES', 'TC_MAX_MATCH_CALLS')),
+        'budgets set in the environment'
+    )
+    def test_unbounded_by_default(self):
+        self.assertIsNone(self.test_case_class.max_duration)
+        self.assertIsNone(self.test_case_class.max_frames)
+        self.assertIsNone(self.test_case_class.max_match_calls)
+
+    def test_within_budgets(self):
+        test_case = self.test_case_class(Capture(self.TEST_FILE))
+        verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case()
+        self.assertEqual(verdict, 'pass')
+
+        usage = test_case.get_budgets_usage()
+        self.assertIsNone(usage['exceeded'])
+        self.assertGreater(usage['frames'], 0)
+        self.assertGreater(usage['match_calls'], 0)
+
+        stats = self.test_case_class.telemetry.get_stats()[self.test_case_class.__name__]
+        self.assertEqual(stats['runs'], 1)
+        self.assertEqual(stats['exceeded'], 0)
+        self.assertEqual(stats['max_match_calls'], usage['match_calls'])
+
+    def test_match_calls_budget_exceeded(self):
+        test_case = self.test_case_class(Capture(self.TEST_FILE))
+        test_case.max_match_calls = 1
+        verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case()
+
+        self.assertEqual(verdict, 'error')
+        self.assertEqual(test_case.get_budgets_usage()['exceeded'], 'match calls')
+        self.assertEqual(len(exceps), 1)
+        self.assertIs(exceps[0][0], self.test_case_class.BudgetExceeded)
+        self.assertIn('match calls budget', log)
+        self.assertEqual(self.test_case_class.telemetry.get_stats()[self.test_case_class.__name__]['exceeded'], 1)
+
+    def test_frames_budget_exceeded(self):
+        test_case = self.test_case_class(Capture(self.TEST_FILE))
+        test_case.max_frames = 1
+        verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case()
+
+        self.assertEqual(verdict, 'error')
+        self.assertEqual(test_case.get_budgets_usage()['exceeded'], 'frames')
+
+    def test_obs_07_ends_with_the_conversation(self):
+        # This capture used to make TD_COAP_OBS_07 loop forever
+        from ttproto.tat_coap.testcases.td_coap_obs_07 import TD_COAP_OBS_07
+        test_case = TD_COAP_OBS_07(Capture('./tests/test_dumps/coap_observe/TD_COAP_OBS_04_PASS.pcap'))
+        verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case()
+
+        self.assertNotEqual(verdict, 'error')
+        self.assertIsNone(test_case.get_budgets_usage()['exceeded'])
 
 # #################### Main run the tests #########################
 if __name__ == '__main__':
@@ -0,0 +1,112 @@
+import asyncio
+import unittest
+
+from ttproto.core import clock
+from ttproto.core.port import MessagePort, DatagramMessagePort
+from ttproto.core.primitive import BytesValue
+from ttproto.core.snapshot import AsyncSnapshotManager, Timer, async_alt
+
+
+class AsyncBackendTestCase(unittest.TestCase):
+    """
+    Test class for the asyncio backend of the clock, ports and snapshot runtime
+    """
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.clock = clock.AsyncioClock(self.loop)
+        clock.Clock.set_instance(self.clock)
+
+    def tearDown(self):
+        clock.Clock.set_instance(clock.SystemClock())
+        self.loop.close()
+        asyncio.set_event_loop(None)
+
+    def run_loop(self, coro):
+        return self.loop.run_until_complete(asyncio.wait_for(coro, 5))
+
+    def test_clock(self):
+        reported = []
+        self.clock.schedule_event_relative(0.02, lambda: reported.append(2))
+        self.clock.schedule_event_relative(0.01, lambda: reported.append(1))
+        self.clock.schedule_event_relative(0.01, lambda: reported.append('cancelled')).cancel()
+
+        self.run_loop(asyncio.sleep(0.05))
+        self.assertEqual(reported, [1, 2])
+
+    def test_timer_timeout(self):
+        async def component():
+            t = Timer(0.01)
+            em = await t.timeout.branch()
+            return em.get_event() is t.timeout
+
+        self.assertTrue(self.run_loop(component()))
+
+    def test_receive_or_timeout(self):
+        async def component():
+            port_a = DatagramMessagePort()
+            port_b = DatagramMessagePort()
+            link_a = MessagePort(port_a)
+            link_b = MessagePort(port_b)
+
+            await port_b.open(local_addr=('127.0.0.1', 0))
+            await port_a.open(remote_addr=port_b.get_extra_info('sockname'))
+            try:
+                link_a.send(BytesValue(b'ping'))
+
+                t = Timer(1)
+                receive = link_b.receive.branch()
+                em = await async_alt(receive, t.timeout.branch())
+                t.stop()
+                received = em.get_branch() is receive and em.get_binary() == b'ping'
+
+                # nothing else is received
+                t.start(0.01)
+                em = await async_alt(link_b.receive.branch(), t.timeout.branch())
+                timed_out = em.get_event() is t.timeout
+            finally:
+                port_a.close()
+                port_b.close()
+
+            return received, timed_out
+
+        self.assertEqual(self.run_loop(component()), (True, True))
+
+    def test_port_errors_logged(self):
+        port = DatagramMessagePort()
+
+        with self.assertLogs('ttproto.core.port', 'WARNING') as logs:
+            # not connected to a MessagePort
+            port.datagram_received(b'ping', ('127.0.0.1', 5683))
+            port.error_received(ConnectionRefusedError('refused'))
+
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'ERROR'])
+        self.assertIn('refused', logs.output[1])
+
+    def test_concurrent_components(self):
+        async def component(i):
+            t = Timer(0.01 * (i % 5))
+            await t.timeout.branch()
+            return i
+
+        async def main():
+            return await asyncio.gather(*(component(i) for i in range(200)))
+
+        self.assertEqual(self.run_loop(main()), list(range(200)))
+
+    def test_manager_per_task(self):
+        async def get_manager():
+            sm = AsyncSnapshotManager()
+            self.assertIs(sm, AsyncSnapshotManager())
+            return sm
+
+        async def main():
+            return await asyncio.gather(get_manager(), get_manager())
+
+        sm1, sm2 = self.run_loop(main())
+        self.assertIsNot(sm1, sm2)
+
+
+if __name__ == '__main__':
+    unittest.main()
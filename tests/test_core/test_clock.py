@@ -0,0 +1,169 @@
+import sys
+import threading
+import time
+import unittest
+
+from ttproto.core.clock import Clock, EventQueueClock, ScheduledEvent, SimulatedClock, SystemClock
+from ttproto.core.snapshot import SnapshotManager, Timer
+
+
+class ManualClock(EventQueueClock):
+    """
+    Event queue clock whose time is set by the test, and whose due events are
+    reported by fire()
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.now = 0
+
+    def _time(self):
+        return self.now
+
+    def fire(self):
+        reported = []
+        with self._lock:
+            while True:
+                ev = self._get_first_event()
+                if ev is None or ev[0] > self.now:
+                    return reported
+                self._shift()
+                reported.append(ev[1]())
+
+
+class EventQueueClockTestCase(unittest.TestCase):
+    """
+    Test class for the heap based event queue of the clocks
+    """
+
+    def setUp(self):
+        self.clock = ManualClock()
+
+    def callback(self, name):
+        return lambda: name
+
+    def test_chronological_order(self):
+        for t in (5, 1, 3, 2, 4):
+            self.clock.schedule_event_absolute(t, self.callback(t))
+        self.clock.now = 10
+        self.assertEqual(self.clock.fire(), [1, 2, 3, 4, 5])
+
+    def test_same_timestamp_in_scheduling_order(self):
+        for name in 'abcdef':
+            self.clock.schedule_event_absolute(1, self.callback(name))
+        self.clock.schedule_event_relative(0.5, self.callback('first'))
+        self.clock.now = 1
+        self.assertEqual(self.clock.fire(), ['first', 'a', 'b', 'c', 'd', 'e', 'f'])
+
+    def test_only_due_events(self):
+        self.clock.schedule_event_absolute(1, self.callback(1))
+        self.clock.schedule_event_absolute(2, self.callback(2))
+        self.clock.now = 1
+        self.assertEqual(self.clock.fire(), [1])
+        self.clock.now = 2
+        self.assertEqual(self.clock.fire(), [2])
+
+    def test_cancel(self):
+        handles = [self.clock.schedule_event_absolute(t, self.callback(t)) for t in range(10)]
+        self.assertIsInstance(handles[0], ScheduledEvent)
+
+        for handle in handles[::2]:
+            handle.cancel()
+        # cancelling twice has no effect
+        handles[0].cancel()
+        self.assertFalse(handles[0].pending)
+
+        self.clock.now = 10
+        self.assertEqual(self.clock.fire(), [1, 3, 5, 7, 9])
+        self.assertFalse(any(handle.pending for handle in handles))
+
+        # cancelling a reported event has no effect
+        handles[1].cancel()
+        with self.clock._lock:
+            self.assertIsNone(self.clock._get_first_event())
+
+    def test_unschedule_events(self):
+        def shared():
+            return 'shared'
+
+        self.clock.schedule_event_absolute(1, shared)
+        self.clock.schedule_event_absolute(2, self.callback('other'))
+        handle = self.clock.schedule_event_absolute(3, shared)
+
+        self.clock.unschedule_events(shared)
+        self.assertFalse(handle.pending)
+
+        self.clock.now = 10
+        self.assertEqual(self.clock.fire(), ['other'])
+
+    def test_reset(self):
+        handle = self.clock.schedule_event_absolute(1, self.callback(1))
+        self.clock.reset()
+        self.assertFalse(handle.pending)
+        self.clock.now = 10
+        self.assertEqual(self.clock.fire(), [])
+
+
+
+class SystemClockTestCase(unittest.TestCase):
+    """
+    Test class for the clock following the system time
+    """
+
+    def setUp(self):
+        self.clock = SystemClock()
+
+    def tearDown(self):
+        self.clock.kill()
+
+    def test_event_scheduled_never(self):
+        done = threading.Event()
+
+        self.clock.schedule_event_absolute(sys.maxsize, lambda: None)
+        # let the clock thread wait for this event
+        time.sleep(0.1)
+
+        self.clock.schedule_event_relative(0.1, done.set)
+        self.assertTrue(done.wait(5))
+
+
+class SimulatedClockTestCase(unittest.TestCase):
+    """
+    Test class for the advance of the simulated clock
+    """
+
+    def setUp(self):
+        Clock.set_instance(SimulatedClock())
+
+    def tearDown(self):
+        Clock.set_instance(SystemClock())
+
+    def test_last_running_thread_terminated(self):
+        waiting = threading.Event()
+        done = threading.Event()
+
+        def waiter():
+            t = Timer()
+            t.start(10)
+            waiting.set()
+            t.timeout()
+            done.set()
+
+        def worker():
+            # terminates while the waiter is blocked on its timer
+            waiting.wait(5)
+            time.sleep(0.1)
+
+        threads = [SnapshotManager.Thread(target=f) for f in (waiter, worker)]
+        for th in threads:
+            th.daemon = True
+            th.start()
+        Clock.get_instance().start()
+
+        # the clock advances once the worker is terminated
+        self.assertTrue(done.wait(5))
+        self.assertEqual(Clock.get_instance().time(), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from ttproto.core.data import BinarySlice, Data
+from ttproto.core.lib.inet.coap import *
+
+
+def decode_options_one_by_one(buff):
+    """Decode an option list with the generic decoder of CoAPOption"""
+    bin_slice = BinarySlice(buff)
+    values = []
+    current = 0
+    while bin_slice and bin_slice[0] != 0xff:
+        opt, bin_slice = CoAPOption._decode_message(bin_slice, current)
+        current += opt['Delta']
+        values.append(opt)
+    return CoAPOptionList(values), bin_slice
+
+
+class CoAPOptionListDecoderTestCase(unittest.TestCase):
+    """
+    Test class for the table-driven decoder of the CoAP option lists
+    """
+
+    def setUp(self):
+        self.name_resolution = Data.disable_name_resolution()
+        self.name_resolution.__enter__()
+
+    def tearDown(self):
+        self.name_resolution.__exit__(None, None, None)
+
+    def check(self, buff):
+        opts, remaining = CoAPOptionList.decode_message(BinarySlice(buff))
+        expected_opts, expected_remaining = decode_options_one_by_one(buff)
+
+        self.assertEqual(repr(opts), repr(expected_opts))
+        self.assertEqual(remaining.raw(), expected_remaining.raw())
+        return opts, remaining
+
+    def test_options(self):
+        opts = CoAPOptionList([
+            CoAPOptionIfMatch(b'\x01\x02'),
+            CoAPOptionUriHost('example.org'),
+            CoAPOptionObserve(0),
+            CoAPOptionUriPort(5683),
+            CoAPOptionUriPath('a' * 20),
+            CoAPOptionUriPath(''),
+            CoAPOptionContentFormat(11542),
+            CoAPOptionBlock2(num=1234, m=True, szx=6),
+            CoAPOptionBlock1(),
+            CoAPOptionProxyUri('x' * 300),
+            CoAPOptionIfNoneMatch(),
+            CoAPOptionOneM2MTY(2),
+        ])
+        buff = opts.build_message()[1] + b'\xffpayload'
+
+        decoded, remaining = self.check(buff)
+        self.assertEqual(remaining.raw(), b'\xffpayload')
+        self.assertEqual(decoded.build_message()[1], opts.build_message()[1])
+        # the options are reordered by number when building the message
+        self.assertEqual([type(o) for o in decoded],
+                         sorted((type(o) for o in opts), key=lambda t: t.get_variant_id()))
+
+    def test_unknown_option(self):
+        decoded, remaining = self.check(b'\xd2\x11ab')
+        self.assertIs(type(decoded[0]), CoAPOption)
+        self.assertEqual(decoded[0]['Value'], b'ab')
+        self.assertFalse(remaining)
+
+    def test_invalid(self):
+        for buff in (b'\x52\x00',  # non-empty IfNoneMatch
+                     b'\xb4ab',  # truncated value
+                     b'\xe0\x01',  # truncated extended delta
+                     b'\xb1\xff'):  # bad utf-8 string
+            with self.assertRaises(Exception):
+                CoAPOptionList.decode_message(BinarySlice(buff))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+import os
+import unittest
+
+from ttproto.core.data import Data
+from ttproto.core.dissector import Capture
+from ttproto.core.lib.inet.coap import *
+from ttproto.core.lib.inet.coap_blockwise import CoAPBlockReassembler
+from ttproto.core.lib.inet.reassembly import ReassemblyBuffer
+from ttproto.tat_coap.common import CoAPTestCase
+
+DUMPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../test_dumps/coap_block')
+
+CLIENT = ('fe80::1', 40000)
+SERVER = ('fe80::2', 5683)
+BODY = bytes(range(256)) * 4 + b'end'
+
+
+class ReassemblyBufferTestCase(unittest.TestCase):
+    """
+    Test class for the reassembly of chunks received at arbitrary offsets
+    """
+
+    def test_gaps(self):
+        buff = ReassemblyBuffer()
+        buff.add(10, b'x' * 10)
+        buff.add(40, b'y' * 5)
+        self.assertEqual(buff.missing(), [(0, 10), (20, 40)])
+        self.assertFalse(buff.is_complete())
+
+        buff.add(0, b'a' * 10)
+        buff.add(15, b'b' * 25)
+        self.assertEqual(buff.missing(), [])
+        self.assertEqual(buff.received, 45)
+
+        buff.set_size(50)
+        self.assertEqual(buff.missing(), [(45, 50)])
+        buff.add(45, b'zzzzz')
+        self.assertTrue(buff.is_complete())
+        self.assertEqual(buff.get_data(), b'a' * 10 + b'x' * 5 + b'b' * 25 + b'y' * 5 + b'zzzzz')
+
+    def test_bounds(self):
+        buff = ReassemblyBuffer(20)
+        with self.assertRaises(ValueError):
+            buff.add(15, b'x' * 10)
+        with self.assertRaises(ValueError):
+            buff.set_size(30)
+
+        buff = ReassemblyBuffer(max_size=100)
+        with self.assertRaises(ValueError):
+            buff.add(90, b'x' * 20)
+        self.assertEqual(buff.missing(), [])
+
+
+class CoAPBlockReassemblerTestCase(unittest.TestCase):
+    """
+    Test class for the reassembly of the CoAP blockwise transfers
+    """
+
+    def setUp(self):
+        self.name_resolution = Data.disable_name_resolution()
+        self.name_resolution.__enter__()
+        self.reassembler = CoAPBlockReassembler()
+        self.mid = 0
+
+    def tearDown(self):
+        self.name_resolution.__exit__(None, None, None)
+
+    def exchange(self, num, szx=2, token=b'a', ts=0, retransmit=False):
+        """Request the block num of /large and receive it"""
+        if not retransmit:
+            self.mid += 1
+        size = 2 ** (szx + 4)
+        chunk = BODY[num * size:(num + 1) * size]
+        more = (num + 1) * size < len(BODY)
+
+        self.reassembler.add(CoAP(code='get', mid=self.mid, tok=token,
+                                  opt=[CoAPOptionUriPath('large'), CoAPOptionBlock2(num=num, szx=szx)]),
+                             CLIENT, SERVER, ts)
+        return self.reassembler.add(CoAP(type='ack', code=2.05, mid=self.mid, tok=token, pl=chunk,
+                                         opt=[CoAPOptionBlock2(num=num, m=more, szx=szx)]),
+                                    SERVER, CLIENT, ts + 0.1)
+
+    def test_block2(self):
+        nb = len(BODY) // 64 + 1
+        for num in reversed(range(nb)):
+            # the blocks are received out of order (with a new token for each request)
+            tr = self.exchange(num, token=bytes([num]), ts=nb - num)
+            if num:
+                self.assertIsNone(tr.get_body())
+
+        self.assertEqual(len(self.reassembler.transfers), 1)
+        self.assertTrue(tr.is_complete())
+        self.assertEqual(tr.get_body(), BODY)
+        self.assertEqual(tr.key, (CLIENT, SERVER, CoAPOptionBlock2, '/large'))
+        self.assertAlmostEqual(tr.duration, nb - 1)
+
+    def test_missing(self):
+        self.exchange(0)
+        self.exchange(0, retransmit=True)
+        tr = self.exchange(2)
+        self.assertEqual(tr.missing(), [(64, 128)])
+        self.assertEqual(len(self.reassembler.transfers), 1)
+
+        # a new request for the first block restarts the transfer
+        self.exchange(0)
+        self.assertEqual(len(self.reassembler.transfers), 2)
+        self.assertEqual(self.reassembler.incomplete(), self.reassembler.transfers)
+
+    def test_check_blocks(self):
+        nb = len(BODY) // 64 + 1
+        for num in range(nb):
+            tr = self.exchange(num)
+        self.exchange(nb - 1, retransmit=True)
+        self.assertTrue(tr.is_complete())
+        self.assertEqual(tr.check_blocks(2), [])
+
+    def test_check_blocks_errors(self):
+        self.exchange(0)
+        self.exchange(2)
+        tr = self.exchange(3, szx=1)
+        self.assertEqual(tr.check_blocks(2), ['block 2: bytes [64:128] skipped', 'block 3: szx 1 instead of 2'])
+        self.assertEqual(tr.missing(), [(64, 96)])
+
+    def test_block1(self):
+        for num in range(3):
+            tr = self.reassembler.add(CoAP(code='put', mid=num, tok=b'b', pl=b'%d' % num * 16,
+                                           opt=[CoAPOptionUriPath('large-update'),
+                                                CoAPOptionBlock1(num=num, m=num < 2, szx=0)]),
+                                      CLIENT, SERVER)
+        self.assertEqual(tr.get_body(), b'0' * 16 + b'1' * 16 + b'2' * 16)
+        self.assertEqual(tr.option_type, CoAPOptionBlock1)
+        self.assertEqual(self.reassembler.completed(), [tr])
+
+    def test_capture(self):
+        capture = Capture(os.path.join(DUMPS_DIR, 'TD_COAP_BLOCK_01_PASS.pcap'))
+        reassembler = CoAPTestCase.get_block_reassembler(capture)
+
+        transfers = reassembler.completed()
+        self.assertEqual(len(transfers), 1)
+        self.assertEqual(transfers[0].uri, '/large')
+        self.assertEqual(transfers[0].get_body(), b''.join(bytes(f[CoAP]['pl']) for f in transfers[0].frames))
+        self.assertIs(CoAPTestCase.get_block_reassembler(capture), reassembler)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+from ttproto.core import control
+from ttproto.core.control import Config, Testcase, TestSession, set_verdict
+from ttproto.core.logger import Logger
+from ttproto.core.snapshot import Timer
+
+NB_TESTCASES = 8
+DURATION = 0.2
+
+
+class ParallelConfig(Config):
+    parallel = True
+
+
+class RecordingLogger(Logger):
+    """
+    Logger recording the start, termination and verdict of the testcases
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        if type(event) == control.EventTestcaseStarted:
+            self.events.append(('started', event.testcase.__name__))
+        elif type(event) == control.EventTestcaseTerminated:
+            self.events.append(('terminated', event.testcase.__name__, event.verdict))
+        elif type(event) == control.EventTestSessionTerminated:
+            self.summary = [(tc.__name__, v) for tc, v in event.verdict_summary.testcases()]
+
+
+def make_testcase(i, config_type, executions):
+    def func():
+        executions.append(('started', i))
+
+        # wait longer in the first testcases, so that they terminate last
+        Timer(DURATION * (NB_TESTCASES - i) / NB_TESTCASES).timeout()
+        set_verdict('pass' if i % 2 else 'inconclusive')
+
+        executions.append(('terminated', i))
+
+    func.__name__ = 'TC_%d' % i
+    return Testcase(func, config_type)
+
+
+class TestSessionParallelTestCase(unittest.TestCase):
+    """
+    Test class for the concurrent execution of the testcases of a session
+    """
+
+    def setUp(self):
+        # the starts and terminations of the testcases, in the order they happen
+        self.executions = []
+
+        self.default_logger = Logger.get_default()
+        self.logger = RecordingLogger()
+        Logger.set_default(self.logger)
+
+    def tearDown(self):
+        Logger.set_default(self.default_logger)
+
+    def run_session(self, config_type, max_parallel):
+        session = TestSession([make_testcase(i, config_type, self.executions) for i in range(NB_TESTCASES)],
+                              max_parallel=max_parallel)
+        session.set_config(config_type, config_type())
+        session.run()
+
+    def expected_events(self):
+        events = []
+        for i in range(NB_TESTCASES):
+            verdict = 'pass' if i % 2 else 'inconclusive'
+            events.append(('started', 'TC_%d' % i))
+            events.append(('terminated', 'TC_%d' % i, verdict))
+        return events
+
+    def test_parallel(self):
+        self.run_session(ParallelConfig, NB_TESTCASES)
+
+        # the events are logged in the order of the session
+        self.assertEqual(self.logger.events, self.expected_events())
+        self.assertEqual(self.logger.summary, [ev[1:] for ev in self.expected_events()[1::2]])
+
+        # all the testcases were started before the first one terminated
+        self.assertEqual(sorted(self.executions[:NB_TESTCASES]), [('started', i) for i in range(NB_TESTCASES)])
+
+    def test_not_parallel_config(self):
+        self.run_session(Config, NB_TESTCASES)
+
+        self.assertEqual(self.logger.events, self.expected_events())
+
+        # each testcase terminated before the next one started
+        self.assertEqual(self.executions, [(event, i) for i in range(NB_TESTCASES)
+                                           for event in ('started', 'terminated')])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import contextlib
+import io
+import os
+import socket
+import threading
+import unittest
+from unittest import mock
+
+from ttproto.core.data import Message
+from ttproto.core.lib.ports.datagram import UdpMessagePort, UnixDatagramPort
+from ttproto.core import named
+from ttproto.core.port import BaseMessagePort
+from ttproto.core.primitive import BytesValue
+
+NB_DATAGRAMS = 200
+
+
+class RecordingPort(BaseMessagePort):
+    """
+    Message port recording the messages forwarded to it
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.received = []
+        self.cond = threading.Condition()
+
+    def enqueue(self, msg):
+        with self.cond:
+            self.received.append(msg.get_binary())
+            self.cond.notify_all()
+
+    def send(self, payload):
+        self._forward(Message(BytesValue(payload)))
+
+    def wait(self, nb):
+        with self.cond:
+            self.cond.wait_for(lambda: len(self.received) >= nb, 5)
+            return list(self.received)
+
+
+class DatagramPortsTestCase(unittest.TestCase):
+    """
+    Test class for the native UDP and Unix datagram ports
+    """
+
+    def setUp(self):
+        self.ports = []
+
+    def tearDown(self):
+        for p in self.ports:
+            p.kill()
+
+    def pair(self, server_cls, client_cls, **server_kw):
+        server_link = RecordingPort()
+        client_link = RecordingPort()
+        server = server_cls(endpoint=server_link, **server_kw)
+        self.ports.append(server)
+        client = client_cls(server.get_sockname(), client_link)
+        self.ports.append(client)
+        return server_link, client_link
+
+    def exchange(self, server_link, client_link):
+        for i in range(NB_DATAGRAMS):
+            client_link.send(b'%d' % i)
+        self.assertEqual(server_link.wait(NB_DATAGRAMS), [b'%d' % i for i in range(NB_DATAGRAMS)])
+
+        # the server replies to the peer of the last datagram received
+        server_link.send(b'reply')
+        self.assertEqual(client_link.wait(1), [b'reply'])
+
+    def test_udp(self):
+        def client(addr, link):
+            return UdpMessagePort(remote_addr=addr, endpoint=link)
+
+        self.exchange(*self.pair(UdpMessagePort, client, local_addr=('127.0.0.1', 0)))
+
+    def test_unix(self):
+        def client(path, link):
+            return UnixDatagramPort(remote_path=path, endpoint=link)
+
+        self.exchange(*self.pair(UnixDatagramPort, client))
+
+    def test_name_resolution_disabled(self):
+        def client(addr, link):
+            return UdpMessagePort(remote_addr=addr, endpoint=link)
+
+        server_link, client_link = self.pair(UdpMessagePort, client, local_addr=('127.0.0.1', 0))
+
+        lookup_threads = set()
+        get_parent_var_name = named.get_parent_var_name
+
+        def lookup(*k, **kw):
+            lookup_threads.add(threading.current_thread())
+            return get_parent_var_name(*k, **kw)
+
+        with mock.patch.object(named, 'get_parent_var_name', lookup):
+            client_link.send(b'hello')
+            self.assertEqual(server_link.wait(1), [b'hello'])
+
+        # no name lookup when decoding in the receiving thread of the port
+        self.assertEqual(lookup_threads - {threading.current_thread()}, set())
+
+    def test_no_peer(self):
+        link = RecordingPort()
+        port = UdpMessagePort(local_addr=('127.0.0.1', 0), endpoint=link)
+        self.ports.append(port)
+
+        peer = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.addCleanup(peer.close)
+        peer.bind(('127.0.0.1', 0))
+        peer.settimeout(0.5)
+
+        # ignored (no known peer yet)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            link.send(b'ignored')
+        self.assertIn('warning: ignored (no known peer yet)', output.getvalue())
+        self.assertIsNone(port.get_peer())
+
+        # once the peer is known, the next message is sent to it (and only this one)
+        peer.sendto(b'hello', port.get_sockname())
+        self.assertEqual(link.wait(1), [b'hello'])
+        link.send(b'sent')
+        self.assertEqual(peer.recv(100), b'sent')
+        with self.assertRaises(socket.timeout):
+            peer.recv(100)
+
+    def test_kill(self):
+        port = UnixDatagramPort()
+        path = port.get_path()
+        port.kill()
+        port.kill()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import io
+import unittest
+from unittest import mock
+
+from ttproto.core import html_logger, xmlgen
+from ttproto.core.html_logger import HTMLLogger
+from ttproto.core.list import OrderedListClass
+from ttproto.core.lib.inet.basics import UInt8
+
+
+class UInt8List(
+    metaclass=OrderedListClass,
+    content_type=UInt8):
+    pass
+
+
+class HTMLLoggerDisplayValueTestCase(unittest.TestCase):
+    """
+    Test class for the rendering of the values in the HTML reports
+    """
+
+    def setUp(self):
+        self.logger = HTMLLogger()
+
+    def render(self, value, **kw):
+        output = io.StringIO()
+        with xmlgen.XHTML10Generator(output=output) as g:
+            self.logger.display_value(g, value, **kw)
+        return output.getvalue()
+
+    def test_short_list(self):
+        value = UInt8List(list(range(10)))
+        self.assertEqual(self.logger.calc_output_size(value, True), (11, 2))
+        output = self.render(value)
+        self.assertNotIn('not displayed', output)
+
+        # the indentation cell is not empty (it would be collapsed)
+        self.assertIn('\u00a0</td><th', output)
+
+    def test_long_list(self):
+        nb = html_logger.MAX_LIST_ITEMS + 100
+        value = UInt8List([i % 256 for i in range(nb)])
+
+        # the items beyond the limit are replaced with a single line
+        self.assertEqual(self.logger.calc_output_size(value), (nb + 1, 2))
+        self.assertEqual(self.logger.calc_output_size(value, True), (html_logger.MAX_LIST_ITEMS + 2, 2))
+
+        output = self.render(value)
+        self.assertIn('(100 items not displayed)', output)
+        self.assertEqual(output.count('<tr>'), html_logger.MAX_LIST_ITEMS + 2)
+
+    def test_output_size_given(self):
+        value = UInt8List(list(range(10)))
+        expected = self.render(value)
+
+        # the size computed by the caller is not computed again
+        output_size = self.logger.calc_output_size(value, True)
+        with mock.patch.object(self.logger, 'calc_output_size', wraps=self.logger.calc_output_size) as calc:
+            output = self.render(value, output_size=output_size)
+        calc.assert_not_called()
+        self.assertEqual(output, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
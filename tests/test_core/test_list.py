@@ -0,0 +1,51 @@
+import unittest
+
+from ttproto.core.list import UnorderedListClass
+from ttproto.core.data import LengthMismatch, ValueMismatch
+from ttproto.core.templates import AnyValue, Range
+from ttproto.core.lib.inet.basics import UInt8
+
+
+class UInt8UnorderedList(
+    metaclass=UnorderedListClass,
+    content_type=UInt8):
+    pass
+
+
+class UnorderedListMatchTestCase(unittest.TestCase):
+    """
+    Test class for the matching of unordered lists
+    """
+
+    def setUp(self):
+        self.value = UInt8UnorderedList([1, 2, 3])
+
+    def test_match_permutation(self):
+        self.assertTrue(UInt8UnorderedList([3, 1, 2]).match(self.value))
+
+    def test_match_needs_reassignment(self):
+        # a greedy pairing would give 1 to the first range and get stuck
+        pattern = UInt8UnorderedList([Range(UInt8, 1, 2), Range(UInt8, 1, 1), 3])
+        self.assertTrue(pattern.match(self.value))
+
+    def test_mismatch_duplicate_pattern(self):
+        mismatch_list = []
+        self.assertFalse(UInt8UnorderedList([3, 1, 1]).match(self.value, mismatch_list))
+        self.assertEqual(len(mismatch_list), 1)
+        self.assertIsInstance(mismatch_list[0], ValueMismatch)
+
+    def test_mismatch_length(self):
+        mismatch_list = []
+        self.assertFalse(UInt8UnorderedList([3, 1]).match(self.value, mismatch_list))
+        self.assertEqual(len(mismatch_list), 2)
+        self.assertIsInstance(mismatch_list[0], LengthMismatch)
+        self.assertIsInstance(mismatch_list[1], ValueMismatch)
+
+    def test_mismatch_long_list(self):
+        # used to explore every permutation before failing
+        pattern = UInt8UnorderedList([AnyValue(UInt8)] * 29 + [5])
+        self.assertFalse(pattern.match(UInt8UnorderedList([1] * 30)))
+
+
+if __name__ == '__main__':
+    unittest.main()
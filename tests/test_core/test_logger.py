@@ -0,0 +1,108 @@
+import contextlib
+import io
+import threading
+import unittest
+
+from ttproto.core.logger import EventText, Logger, LoggerGroup, QueueLoggerGroup
+
+
+class RecordingLogger(Logger):
+    """
+    Logger recording the events it receives and its flushes
+    """
+
+    def __init__(self, blocker=None):
+        self.events = []
+        self.flushes = []
+        self.exited = False
+        self.blocker = blocker
+
+    def log_event(self, event):
+        if self.blocker is not None:
+            self.blocker.wait()
+        if event[0] == 'error':
+            raise Exception('logger error')
+        self.events.append(event[0])
+
+    def flush(self):
+        self.flushes.append(len(self.events))
+
+    def __exit__(self, a, b, c):
+        self.exited = True
+
+
+class QueueLoggerGroupTestCase(unittest.TestCase):
+    """
+    Test class for the queue backed logger group
+    """
+
+    def test_order(self):
+        loggers = [RecordingLogger(), RecordingLogger()]
+        with QueueLoggerGroup(loggers) as group:
+            for i in range(1000):
+                group.log_event(EventText(str(i)))
+        expected = [str(i) for i in range(1000)]
+        for l in loggers:
+            self.assertEqual(l.events, expected)
+            self.assertTrue(l.exited)
+
+    def test_batches(self):
+        blocker = threading.Event()
+        l = RecordingLogger(blocker)
+        group = QueueLoggerGroup([l], batch_size=10)
+
+        # the consumer is blocked on its first batch, the next events are queued
+        for i in range(31):
+            group.log_event(EventText(str(i)))
+        blocker.set()
+        group.flush()
+
+        self.assertEqual(len(l.events), 31)
+        self.assertEqual(l.flushes[-1], 31)
+        # one flush per batch of at most 10 events
+        self.assertLessEqual(len(l.flushes), 5)
+        for a, b in zip([0] + l.flushes, l.flushes):
+            self.assertLessEqual(b - a, 10)
+
+    def test_backpressure(self):
+        blocker = threading.Event()
+        group = QueueLoggerGroup([RecordingLogger(blocker)], queue_size=2)
+
+        done = threading.Event()
+
+        def producer():
+            for i in range(5):
+                group.log_event(EventText(str(i)))
+            done.set()
+
+        th = threading.Thread(target=producer)
+        th.daemon = True
+        th.start()
+
+        # the producer waits until the queue has room
+        self.assertFalse(done.wait(0.1))
+        blocker.set()
+        self.assertTrue(done.wait(5))
+        group.flush()
+
+    def test_logger_error(self):
+        l = RecordingLogger()
+        group = QueueLoggerGroup([l])
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            for txt in ('a', 'error', 'b'):
+                group.log_event(EventText(txt))
+            group.flush()
+        self.assertEqual(l.events, ['a', 'b'])
+        self.assertIn('logger error', stderr.getvalue())
+
+    def test_add_logger(self):
+        l = RecordingLogger()
+        group = LoggerGroup()
+        group.add_logger(l)
+        group.log_event(EventText('a'))
+        self.assertEqual(l.events, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest import mock
+
+from ttproto.core.data import Data, Message
+from ttproto.core.lib.all import IPv6, UDP, ICMPv6EchoRequest
+from ttproto.core.logger import Logger
+from ttproto.core.packet import PacketValue
+from ttproto.core.port import EventMessageMismatch, EventMessageReceived, MessagePort
+from ttproto.core.snapshot import SnapshotManager
+
+
+class RecordingLogger(Logger):
+    """
+    Logger recording the types of the events it receives
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def log_event(self, event):
+        self.events.append(type(event))
+
+
+class MessagePortReceiveTestCase(unittest.TestCase):
+    """
+    Test class for the matching of the receive() templates of the message ports
+    """
+
+    def setUp(self):
+        self.logger = RecordingLogger()
+
+    def run_in_thread(self, func):
+        result = []
+        th = SnapshotManager.Thread(target=lambda: result.append(func()))
+        th.set_logger(self.logger)
+        th.start()
+        th.join(10)
+        return result[0]
+
+    def receive(self, port, *templates):
+        """Evaluate the receive() templates in order, and return the index of the first one matching"""
+        def func():
+            port.evaluate_snapshot()
+            for i, template in enumerate(templates):
+                if port.match_receive(template):
+                    return i
+        return self.run_in_thread(func)
+
+    def make_port(self, **kw):
+        port = MessagePort(**kw)
+        with Data.disable_name_resolution():
+            port.enqueue(Message(IPv6(src='::1', dst='::2', pl=UDP(sport=1, dport=2, pl=b'x'))))
+        return port
+
+    def test_candidates_only(self):
+        matched = []
+        packet_match = PacketValue._match
+
+        def counting_match(pattern, value, mismatch_list):
+            if pattern.get_variant() is IPv6:
+                matched.append(pattern)
+            return packet_match(pattern, value, mismatch_list)
+
+        port = self.make_port()
+        templates = IPv6(pl=ICMPv6EchoRequest()), IPv6(pl=UDP(dport=3)), IPv6(pl=UDP(dport=2))
+        with mock.patch.object(PacketValue, '_match', counting_match):
+            index = self.receive(port, *templates)
+
+        self.assertEqual(index, 2)
+        # the ICMPv6 template is not a candidate
+        self.assertEqual(matched, list(templates[1:]))
+        self.assertEqual(self.logger.events, [EventMessageReceived])
+
+    def test_log_mismatches(self):
+        port = self.make_port(log_mismatches=True)
+        template = IPv6(pl=ICMPv6EchoRequest())
+        self.assertIsNone(self.receive(port, template, template))
+        self.assertEqual(self.receive(port, IPv6()), 0)
+        # only one mismatch event per template for the same message
+        self.assertEqual(self.logger.events, [EventMessageMismatch, EventMessageReceived])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import unittest
+
+from ttproto.core import clock
+from ttproto.core.lib.ports.pcap import PcapPort
+from ttproto.core.port import MessagePort
+from ttproto.core.snapshot import SnapshotManager, Timer, alt
+
+PCAP_FILE = 'tests/test_dumps/6lowpan/TD_6LOWPAN_HC_01.pcap'
+PCAP_NB_FRAMES = 4
+
+
+class PcapPortReplayTestCase(unittest.TestCase):
+    """
+    Test class for the replay of a pcap file on a simulated clock
+    """
+
+    def tearDown(self):
+        clock.Clock.set_instance(clock.SystemClock())
+
+    def replay(self, predecode):
+        clock.Clock.set_instance(clock.SimulatedClock())
+
+        events = []
+        done = threading.Event()
+
+        def time():
+            return round(clock.Clock.get_instance().time() - events[0][1], 6)
+
+        def consumer(link):
+            # wait for the first frame before starting the timer
+            link.receive()
+            events.append(('receive', clock.Clock.get_instance().time()))
+
+            t = Timer()
+            while len([ev for ev in events if ev[0] == 'receive']) < PCAP_NB_FRAMES:
+                t.start(1)
+                with alt:
+                    @link.receive()
+                    def _():
+                        events.append(('receive', time()))
+
+                    @t.timeout()
+                    def _():
+                        events.append(('timeout', time()))
+            t.stop()
+            done.set()
+
+        link = MessagePort(PcapPort(PCAP_FILE, predecode=predecode))
+        th = SnapshotManager.Thread(target=consumer, args=(link,))
+        th.daemon = True
+        th.start()
+        clock.Clock.get_instance().start()
+
+        self.assertTrue(done.wait(30))
+        return [(ev[0], 0 if i == 0 else ev[1]) for i, ev in enumerate(events)]
+
+    def test_replay(self):
+        self.assertEqual(self.replay(predecode=True), [
+            ('receive', 0),
+            ('receive', 0.021845),
+            ('timeout', 1.021845),
+            ('timeout', 2.021845),
+            ('receive', 2.126303),
+            ('receive', 2.148166),
+        ])
+
+    def test_replay_without_predecoding(self):
+        self.assertEqual(self.replay(predecode=True), self.replay(predecode=False))
+
+    def replay_truncated(self, predecode):
+        clock.Clock.set_instance(clock.SimulatedClock())
+
+        # the last frame of the file is truncated
+        with open(PCAP_FILE, 'rb') as f:
+            content = f.read()
+        fd, filename = tempfile.mkstemp(suffix='.pcap')
+        self.addCleanup(os.remove, filename)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content[:-10])
+
+        received = []
+        done = threading.Event()
+
+        def consumer(link):
+            # wait for the first frame before starting the timer
+            link.receive()
+            received.append(clock.Clock.get_instance().time())
+
+            t = Timer()
+            while True:
+                t.start(10)
+                with alt:
+                    @link.receive()
+                    def _():
+                        received.append(clock.Clock.get_instance().time())
+
+                    @t.timeout()
+                    def _():
+                        done.set()
+                if done.is_set():
+                    return
+
+        with self.assertLogs('ttproto.core.lib.ports.pcap', 'ERROR'):
+            link = MessagePort(PcapPort(filename, predecode=predecode))
+            th = SnapshotManager.Thread(target=consumer, args=(link,))
+            th.daemon = True
+            th.start()
+            clock.Clock.get_instance().start()
+
+            self.assertTrue(done.wait(30))
+        return len(received)
+
+    def test_replay_truncated(self):
+        # the frames before the error are replayed, then the replay stops
+        self.assertEqual(self.replay_truncated(predecode=True), PCAP_NB_FRAMES - 1)
+
+    def test_replay_truncated_without_predecoding(self):
+        self.assertEqual(self.replay_truncated(predecode=False), PCAP_NB_FRAMES - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from ttproto.core.data import Data, Message
+from ttproto.core.dissector import Capture, LiveCapture
+from ttproto.core.lib.all import *
+from ttproto.utils import pure_pcapy
+
+SRC = Eui64Address('02:00:00:00:00:00:00:01')
+DST = Eui64Address('02:00:00:00:00:00:00:02')
+BODY = bytes(range(256)) + b'end'
+
+
+def crc16(data):
+    crc = 0
+    for c in data:
+        crc ^= c
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+    return crc
+
+
+def make_fragments(tag, chunk=96, fcs=False):
+    """Fragment a CoAP message over 802.15.4 (the fragments are returned as bytes)"""
+    frame = Ieee802154(src=SRC, dst=DST, dpid=0xabcd, pl=SixLowpanIPHC(pl=IPv6(
+        src='fe80::1', dst='fe80::2', pl=UDP(sport=40000, dport=5683, pl=CoAP(code='get', mid=1, pl=BODY)))))
+    data = frame.build_message()[1]
+    header = data[:21]
+    coap = CoAP(code='get', mid=1, pl=BODY).build_message()[1]
+
+    # split the compressed datagram after the compressed IPv6/UDP headers
+    compressed = data[21:-len(coap)]
+    size = 48 + len(coap)
+    result = [header + struct.pack('!HH', 0xc000 | size, tag) + compressed + coap[:chunk - 48]]
+    for ofs in range(chunk, size, chunk):
+        result.append(header + struct.pack('!HHB', 0xe000 | size, tag, ofs // 8) + coap[ofs - 48:ofs - 48 + chunk])
+
+    if fcs:
+        result = [f + struct.pack('<H', crc16(f)) for f in result]
+    return result
+
+
+class SixLowpanReassemblerTestCase(unittest.TestCase):
+    """
+    Test class for the reassembly of the fragmented 6LoWPAN datagrams
+    """
+
+    def setUp(self):
+        self.name_resolution = Data.disable_name_resolution()
+        self.name_resolution.__enter__()
+
+    def tearDown(self):
+        self.name_resolution.__exit__(None, None, None)
+
+    def add_all(self, reassembler, fragments, ts=0.0, refs=None):
+        results = []
+        for i, data in enumerate(fragments):
+            ieee = Message(data, Ieee802154).get_value()
+            results.append(reassembler.add(ieee, ts + i, refs[i] if refs else i))
+        return results
+
+    def check_datagram(self, data):
+        coap = Message(data, Ieee802154).get_value()['pl']['pl']['pl']['pl']
+        self.assertIsInstance(coap, CoAP)
+        self.assertEqual(coap['pl'], BODY)
+
+    def test_out_of_order(self):
+        fragments = make_fragments(0x1234)
+        self.assertGreater(len(fragments), 2)
+
+        reassembler = SixLowpanReassembler()
+        order = list(reversed(range(len(fragments))))
+        results = self.add_all(reassembler, [fragments[i] for i in order], refs=order)
+
+        self.assertEqual(results[:-1], [None] * (len(fragments) - 1))
+        data, refs = results[-1]
+        self.assertEqual(refs, order)
+        self.check_datagram(data)
+        self.assertEqual(reassembler.pending(), 0)
+
+    def test_fcs(self):
+        reassembler = SixLowpanReassembler()
+        data, refs = self.add_all(reassembler, make_fragments(1, fcs=True))[-1]
+        self.check_datagram(data)
+
+    def test_interleaved(self):
+        reassembler = SixLowpanReassembler()
+        first, second = make_fragments(1), make_fragments(2, chunk=64)
+        self.assertGreater(len(second), len(first))
+
+        fragments = [f for pair in zip(first, second) for f in pair] + second[len(first):]
+        results = [r for r in self.add_all(reassembler, fragments) if r]
+        self.assertEqual(len(results), 2)
+        for data, refs in results:
+            self.check_datagram(data)
+        self.assertEqual(len(results[0][1]), len(first))
+
+    def test_timeout(self):
+        reassembler = SixLowpanReassembler(timeout=10)
+        fragments = make_fragments(3)
+        self.add_all(reassembler, fragments[:1])
+        self.assertEqual(reassembler.pending(), 1)
+
+        # the first fragment has expired
+        self.assertIsNone(self.add_all(reassembler, fragments[1:], ts=20)[-1])
+        self.assertEqual(reassembler.discarded, 1)
+
+    def test_bounded(self):
+        reassembler = SixLowpanReassembler(max_datagrams=4)
+        for tag in range(10):
+            self.add_all(reassembler, make_fragments(tag)[:1])
+        self.assertEqual(reassembler.pending(), 4)
+        self.assertEqual(reassembler.discarded, 6)
+
+        # a fragment beyond the datagram size discards the datagram
+        fragment = make_fragments(9)[-1]
+        self.assertIsNone(self.add_all(reassembler, [fragment[:25] + b'\xff' + b'x' * 8])[0])
+        self.assertEqual(reassembler.pending(), 3)
+        self.assertEqual(reassembler.discarded, 7)
+
+    def test_capture(self):
+        fragments = make_fragments(5)
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'fragments.pcap')
+            dumper = pure_pcapy.Dumper(filename, 65535, pure_pcapy.DLT_IEEE802_15_4_NOFCS)
+            for i, data in enumerate(fragments):
+                dumper.dump(pure_pcapy.Pkthdr(i, 0, len(data), len(data)), data)
+            dumper.store.close()
+
+            frames = Capture(filename).frames
+
+        # the reassembled frame is numbered after the frames of the file
+        self.assertEqual([f['id'] for f in frames], list(range(1, len(fragments) + 2)))
+        self.assertEqual(frames[-1].fragments, list(range(1, len(fragments) + 1)))
+        self.assertIsNone(frames[-1].error)
+        self.assertIn(CoAP, frames[-1])
+        self.assertEqual(frames[-1][CoAP]['pl'], BODY)
+
+        live = LiveCapture()
+        for i, data in enumerate(fragments):
+            live.add_frame(float(i), data, pure_pcapy.DLT_IEEE802_15_4)
+        self.assertEqual(len(live.frames), len(fragments) + 1)
+        self.assertEqual(live.frames[-1]['id'], len(fragments) + 1)
+        self.assertEqual(live.add_frame(10.0, fragments[0], pure_pcapy.DLT_IEEE802_15_4)['id'], len(fragments) + 2)
+
+    def test_unique_ids(self):
+        first, second = make_fragments(1), make_fragments(2, chunk=64)
+        fragments = [f for pair in zip(first, second) for f in pair] + second[len(first):] + [b'\x00']
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'fragments.pcap')
+            dumper = pure_pcapy.Dumper(filename, 65535, pure_pcapy.DLT_IEEE802_15_4_NOFCS)
+            for i, data in enumerate(fragments):
+                dumper.dump(pure_pcapy.Pkthdr(i, 0, len(data), len(data)), data)
+            dumper.store.close()
+
+            capture = Capture(filename)
+            frames = capture.frames
+
+        # two datagrams reassembled in the middle of the capture (followed by
+        # another frame)
+        reassembled = [f for f in frames if f.fragments is not None]
+        self.assertEqual(len(reassembled), 2)
+        ids = [f['id'] for f in frames]
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(sorted(f['id'] for f in reassembled), [len(fragments) + 1, len(fragments) + 2])
+        self.assertEqual([f['id'] for f in frames if f.fragments is None], list(range(1, len(fragments) + 1)))
+
+        # a frame can be looked up by its id
+        for frame in reassembled:
+            self.assertEqual([f for f in frames if f['id'] == frame['id']], [frame])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import random
+import threading
+import unittest
+
+from ttproto.core.data import Data, Message
+from ttproto.core.dissector import LiveCapture
+from ttproto.core.lib.all import *
+from ttproto.utils import pure_pcapy
+
+SRC = Eui64Address('02:00:00:00:00:00:00:01')
+DST = Eui64Address('02:00:00:00:00:00:00:02')
+
+
+def make_frame(pl, src='fe80::1', dst='fe80::2'):
+    """Build an 802.15.4 frame carrying an IPv6 payload compressed with IPHC"""
+    frame = Ieee802154(src=SRC, dst=DST, dpid=0xabcd, pl=SixLowpanIPHC(pl=IPv6(src=src, dst=dst, pl=pl)))
+    return frame.build_message()[1]
+
+
+def make_ra(*contexts):
+    """contexts is a list of tuples (cid, prefix, length, lifetime, c)"""
+    return make_frame(ICMPv6RouterAdvertisement(opt=[
+        SixLowpanContextOption(cid=cid, pf=pfx, clen=length, lt=lt, c=c) for cid, pfx, length, lt, c in contexts]))
+
+
+def find_context(table, addr):
+    """Look up the context of an address by matching IPv6Prefix objects (longest prefix first)"""
+    matching = [(-length, i) for i, (pfx, length) in enumerate(table)
+                if IPv6Prefix(pfx, length).match(addr)
+                and IPv6Prefix(addr, length).get_address() == IPv6Prefix(addr, 64).get_address()]
+    return min(matching)[1] if matching else None
+
+
+def add(capture, data):
+    return capture.add_frame(float(len(capture.frames)), data, pure_pcapy.DLT_IEEE802_15_4)
+
+
+class SixLowpanContextTableTestCase(unittest.TestCase):
+    """
+    Test class for the 6LoWPAN-HC contexts of the decoding sessions
+    """
+
+    def setUp(self):
+        self.name_resolution = Data.disable_name_resolution()
+        self.name_resolution.__enter__()
+
+        # a frame using the context 2 for compressing its source address
+        with SixLowpanIPHC.contextes((2, '2001:db8::', 64)):
+            self.data = make_frame(UDP(sport=1, dport=2, pl=b'x'), src='2001:db8::1')
+
+    def tearDown(self):
+        self.name_resolution.__exit__(None, None, None)
+
+    def decode_src(self):
+        return Message(self.data, Ieee802154).get_value()[IPv6]['src']
+
+    def test_table(self):
+        table = SixLowpanContextTable((1, 'aaaa::', 64))
+        self.assertEqual(table[1], (IPv6Address('aaaa::'), 64))
+        self.assertEqual(table.find(IPv6Address('aaaa::1')), 1)
+        self.assertEqual(table.find(IPv6Address('aaaa::'), 64), 1)
+        self.assertIsNone(table.find(IPv6Address('bbbb::1')))
+
+        table.update((1, None, 0))
+        self.assertIsNone(table.find(IPv6Address('aaaa::1')))
+        self.assertEqual(list(table), list(SixLowpanContextTable()))
+
+    def test_find(self):
+        rand = random.Random(0)
+        prefixes = [bytes(16), b'\x20\x01\x0d\xb8' + bytes(12), b'\x20\x01\x0d\xb8\x00\x01' + bytes(10),
+                    b'\x20\x01\x0d\xb8\x00\x01\x00\x02' + bytes(8), b'\x20\x01\x0d\xb8\x00\x01\x00\x02\x80' + bytes(7)]
+        for i in range(20):
+            table = SixLowpanContextTable(*((cid, rand.choice(prefixes), rand.choice((0, 16, 32, 48, 60, 64, 72, 128)))
+                                            for cid in rand.sample(range(16), 6)))
+            for pfx in prefixes:
+                for iid in (bytes(8), b'\x80' + bytes(7), bytes(7) + b'\x01'):
+                    addr = IPv6Address(pfx[:8] + iid)
+                    self.assertEqual(table.find(addr), find_context(table, addr), (list(table), addr))
+
+        table = SixLowpanContextTable((3, 'aaaa::', 64), (5, '2001:db8:1::', 48), (7, '2001:db8:1:2::', 64))
+        self.assertEqual(table.find(IPv6Address('2001:db8:1:2::1')), 7)
+        self.assertEqual(table.find(IPv6Address('2001:db8:1::1')), 5)
+        self.assertEqual(table.find(IPv6Address('2001:db8:1::'), 48), 5)
+        self.assertIsNone(table.find(IPv6Address('2001:db8:1::'), 64))
+
+    def test_learn(self):
+        capture = LiveCapture()
+        self.assertEqual(add(capture, self.data)[IPv6]['src'], IPv6Address('::1'))
+
+        add(capture, make_ra((2, '2001:db8::', 64, 60, True), (3, 'aaaa::', 64, 60, False)))
+        self.assertEqual(capture.contexts[2], (IPv6Address('2001:db8::'), 64))
+        self.assertEqual(add(capture, self.data)[IPv6]['src'], IPv6Address('2001:db8::1'))
+
+        # the context 3 is only used for the decompression
+        self.assertEqual(capture.contexts[3], (IPv6Address('aaaa::'), 64))
+        self.assertIsNone(capture.contexts.find(IPv6Address('aaaa::1')))
+
+        # a null lifetime removes the context
+        add(capture, make_ra((2, '2001:db8::', 64, 0, True)))
+        self.assertEqual(add(capture, self.data)[IPv6]['src'], IPv6Address('::1'))
+
+        # the contexts are not shared with the other decoding sessions
+        self.assertEqual(self.decode_src(), IPv6Address('::1'))
+
+    def test_threads(self):
+        barrier = threading.Barrier(2)
+        results = {}
+
+        def decode(pfx):
+            with SixLowpanIPHC.contextes((2, pfx, 64)), Data.disable_name_resolution():
+                barrier.wait()
+                results[pfx] = [str(self.decode_src()) for i in range(10)]
+
+        threads = [threading.Thread(target=decode, args=(pfx,)) for pfx in ('aaaa::', 'bbbb::')]
+        for th in threads:
+            th.start()
+        for th in threads:
+            th.join()
+
+        self.assertEqual(results, {'aaaa::': ['aaaa::1'] * 10, 'bbbb::': ['bbbb::1'] * 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import threading
+import unittest
+
+from ttproto.core.data import Message
+from ttproto.core.port import MessagePort
+from ttproto.core.primitive import BytesValue
+from ttproto.core.snapshot import SnapshotManager, Timer, alt, repeat
+
+NB_PORTS = 60
+NB_UPDATES = 100
+
+
+class CountingMessagePort(MessagePort):
+    """
+    Message port counting the evaluations of its receive branches
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.match_count = 0
+
+    def match_receive(self, data=None):
+        self.match_count += 1
+        return super().match_receive(data)
+
+
+class SnapshotDispatchTestCase(unittest.TestCase):
+    """
+    Test class for the evaluation of the alt blocks by the snapshot manager
+    """
+
+    def setUp(self):
+        self.ports = []
+        for i in range(NB_PORTS):
+            port = CountingMessagePort()
+            self.ports.append(port)
+
+    def run_in_thread(self, func):
+        th = SnapshotManager.Thread(target=func)
+        th.start()
+        return th
+
+    def enqueue(self, i, payload):
+        self.ports[i].enqueue(Message(BytesValue(payload)))
+
+    def alt(self):
+        """Run an alt block having one branch per port, and return the index of the matched port"""
+        result = []
+
+        def handler(i):
+            return lambda: result.append(i)
+
+        t = Timer(10)
+        with alt:
+            for i, port in enumerate(self.ports):
+                port.receive(BytesValue(b'%d' % i))(handler(i))
+
+            @t.timeout()
+            def _():
+                result.append(None)
+        t.stop()
+        return result[0]
+
+    def test_branches_order(self):
+        matched = []
+
+        def consumer():
+            matched.append(self.alt())
+            matched.append(self.alt())
+
+        self.enqueue(42, b'42')
+        self.enqueue(17, b'17')
+        self.run_in_thread(consumer).join(10)
+        self.assertEqual(matched, [17, 42])
+
+    def test_updated_branches_only(self):
+        matched = []
+
+        def feeder():
+            # updates of the ports not matching their branch
+            for i in range(NB_UPDATES):
+                self.enqueue(i % 10, b'mismatch')
+            self.enqueue(NB_PORTS - 1, b'%d' % (NB_PORTS - 1))
+
+        def consumer():
+            started.set()
+            matched.append(self.alt())
+
+        started = threading.Event()
+        th = self.run_in_thread(consumer)
+        started.wait()
+        feeder()
+        th.join(10)
+
+        self.assertEqual(matched, [NB_PORTS - 1])
+
+        # one evaluation of all the branches, then only the ones of the updated ports
+        match_count = sum(port.match_count for port in self.ports)
+        self.assertGreaterEqual(match_count, NB_PORTS)
+        self.assertLessEqual(match_count, NB_PORTS + NB_UPDATES + 1)
+
+    def test_branch_added_on_repeat(self):
+        result = []
+
+        def first_port():
+            # add a branch to the alt block being run
+            result.append(0)
+            self.ports[1].receive(BytesValue(b'1'))(lambda: result.append(1))
+            repeat()
+
+        def consumer():
+            t = Timer(5)
+            with alt:
+                self.ports[0].receive(BytesValue(b'0'))(first_port)
+
+                @t.timeout()
+                def _():
+                    result.append(None)
+            t.stop()
+
+        self.enqueue(0, b'0')
+        self.enqueue(1, b'1')
+        self.run_in_thread(consumer).join(10)
+
+        # the branch added by the handler is evaluated after the repeat
+        self.assertEqual(result, [0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+from ttproto.tat_services import analyze_captures_batch
+
+TEST_DUMPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../test_dumps')
+
+
+class BatchAnalysisTestCase(unittest.TestCase):
+    """
+    Test class for the batch analysis of captures over a process pool
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmp_dir.name, 'analysis.jsonl')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def __read_results(self):
+        with open(self.output) as f:
+            return [json.loads(line) for line in f]
+
+    def test_batch_from_manifest(self):
+        manifest = os.path.join(self.tmp_dir.name, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('# capture protocol testcase\n')
+            f.write('%s coap TD_COAP_CORE_01\n' % os.path.join(TEST_DUMPS_DIR, 'coap_core/TD_COAP_CORE_01_PASS.pcap'))
+            f.write('\n')
+            f.write('%s coap TD_COAP_CORE_02\n' % os.path.join(TEST_DUMPS_DIR, 'coap_core/TD_COAP_CORE_02_PASS.pcap'))
+
+        summary = analyze_captures_batch(manifest, 'coap', output_filename=self.output, processes=2)
+
+        self.assertEqual(summary['jobs'], 2)
+        self.assertEqual(summary['testcases'], 2)
+        self.assertEqual(summary['verdicts'], {'pass': 2})
+        self.assertEqual(len(summary['slowest_jobs']), 2)
+
+        results = self.__read_results()
+        self.assertEqual(
+            sorted(r['testcase_id'] for r in results),
+            ['TD_COAP_CORE_01', 'TD_COAP_CORE_02']
+        )
+
+    def test_batch_from_directory(self):
+        captures_dir = os.path.join(self.tmp_dir.name, 'captures')
+        os.makedirs(os.path.join(captures_dir, 'core'))
+        for name in ('TD_COAP_CORE_01_PASS.pcap', 'TD_COAP_CORE_02_PASS.pcap'):
+            shutil.copy(os.path.join(TEST_DUMPS_DIR, 'coap_core', name), os.path.join(captures_dir, 'core', name))
+
+        summary = analyze_captures_batch(
+            captures_dir,
+            'coap',
+            testcase_ids=['TD_COAP_CORE_01', 'TD_COAP_CORE_02'],
+            output_filename=self.output,
+            processes=2
+        )
+
+        self.assertEqual(summary['jobs'], 2)
+        self.assertEqual(summary['testcases'], 4)
+
+        results = self.__read_results()
+        self.assertEqual(len(results), 4)
+        verdicts = {(os.path.basename(r['file']), r['testcase_id']): r['verdict'] for r in results}
+        self.assertEqual(verdicts[('TD_COAP_CORE_01_PASS.pcap', 'TD_COAP_CORE_01')], 'pass')
+        self.assertEqual(verdicts[('TD_COAP_CORE_02_PASS.pcap', 'TD_COAP_CORE_02')], 'pass')
+
+        # The budgets usage of the test cases run is exported
+        budgets = summary['budgets']['TD_COAP_CORE_01']
+        self.assertGreaterEqual(budgets['runs'], 1)
+        self.assertEqual(budgets['exceeded'], 0)
+        self.assertGreater(budgets['max_match_calls'], 0)
+
+    def test_batch_protocol_from_manifest(self):
+        manifest = os.path.join(self.tmp_dir.name, 'manifest.txt')
+        with open(manifest, 'w') as f:
+            f.write('%s coap TD_COAP_CORE_01\n' % os.path.join(TEST_DUMPS_DIR, 'coap_core/TD_COAP_CORE_01_PASS.pcap'))
+
+        # No default protocol is needed when every job gives its own
+        summary = analyze_captures_batch(manifest, output_filename=self.output, processes=1)
+        self.assertEqual(summary['verdicts'], {'pass': 1})
+
+        with open(manifest, 'a') as f:
+            f.write('%s\n' % os.path.join(TEST_DUMPS_DIR, 'coap_core/TD_COAP_CORE_02_PASS.pcap'))
+        with self.assertRaises(ValueError):
+            analyze_captures_batch(manifest, output_filename=self.output, processes=1)
+
+    def test_batch_unknown_source(self):
+        with self.assertRaises(FileNotFoundError):
+            analyze_captures_batch(os.path.join(self.tmp_dir.name, 'unknown'), 'coap')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 import os
 import unittest
-from ttproto.tat_coap.common import CoAPTestCase
-from ttproto.core.dissector import Capture
+from ttproto.tat_coap.common import CoAPTestCase, CoAPStimulusIndex
+from ttproto.core.dissector import Capture, LiveCapture
+from ttproto.utils import pure_pcapy
 from ttproto.tat_coap.testcases.td_coap_core_04 import TD_COAP_CORE_04
 from ttproto.tat_coap.testcases.td_coap_core_09 import TD_COAP_CORE_09
 from ttproto.tat_coap.testcases.td_coap_obs_07 import TD_COAP_OBS_07
@@ -238,6 +239,89 @@ class TestCommon(unittest.TestCase):
         assert len(conversations_tc_04[1]) == 2,\
             "expected 2 frames , but got %s " % len(conversations_tc_04[1])
 
+    def test_stimulus_index_lookup(self):
+        capture = self.__get_capture('OBS_07_with_other_unrelated_convs.pcap',
+                                     dir_from_test_dumps='preprocess/coap')
+        convs, ignored = CoAPTestCase.extract_all_coap_conversations(capture)
+        index = CoAPStimulusIndex(convs)
+
+        get_obs, delete_obs = TD_COAP_OBS_07.get_stimulis()
+        assert CoAPStimulusIndex.get_stimulus_key(get_obs) == (0, 1, 'obs')
+        assert CoAPStimulusIndex.get_stimulus_key(delete_obs) == (0, 4, 'obs')
+
+        # The index must give the same frames than a full scan of the capture
+        for stimulis in TD_COAP_OBS_07.get_stimulis() + TD_COAP_CORE_04.get_stimulis():
+            expected = set(
+                id(frame) for conv in convs for frame in conv
+                if frame[CoAP] in stimulis
+            )
+            assert index.lookup(stimulis) == expected
+
+        assert len(index.lookup(get_obs)) == 1
+        assert len(index.lookup(delete_obs)) == 1
+
+    def test_stimulus_index_of_live_capture(self):
+        pcap_file = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '../test_dumps/preprocess/coap/OBS_07_with_other_unrelated_convs.pcap')
+        capture = Capture(pcap_file)
+        index, ignored = CoAPTestCase.get_stimulus_index(capture)
+
+        live_capture = LiveCapture()
+        get_obs, delete_obs = TD_COAP_OBS_07.get_stimulis()
+        with open(pcap_file, 'rb') as f:
+            reader = pure_pcapy.Reader(f)
+            header, data = reader.next()
+            while header:
+                ts = header.getts()
+                live_capture.add_frame(ts[0] + ts[1] * 0.000001, data, reader.datalink())
+                # Lookups made before all the frames are received are kept up to date
+                live_index, live_ignored = CoAPTestCase.get_stimulus_index(live_capture)
+                live_index.lookup(get_obs)
+                header, data = reader.next()
+
+        frame_ids = lambda frame_id_set, frames: sorted(f['id'] for f in frames if id(f) in frame_id_set)
+        for stimulis in (get_obs, delete_obs):
+            assert frame_ids(live_index.lookup(stimulis), live_capture.frames) == \
+                frame_ids(index.lookup(stimulis), capture.frames)
+
+        assert [[f['id'] for f in conv] for conv in live_index.conversations] == \
+            [[f['id'] for f in conv] for conv in index.conversations]
+        assert [f['id'] for f in live_ignored] == [f['id'] for f in ignored]
+
+    def test_conv_merge_order_for_multi_stimulis_tc(self):
+        # Frame ids of the conversations correlated for TD_COAP_OBS_07, the
+        # DELETE conversation is inserted whole before the first frame of the
+        # observe conversation which is later than the DELETE request.
+        expected_frame_ids = {
+            'OBS_01_Interrupted_OBS_07.pcap': [
+                [1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 15, 16, 19, 20, 23, 24,
+                 27, 28, 31, 32, 37, 38, 42, 43],
+                [13, 14, 17, 18, 21, 22, 25, 26, 29, 30, 33, 35, 39, 41, 46, 44],
+            ],
+            'OBS_07_with_other_unrelated_convs.pcap': [
+                [1, 2, 7, 8, 9, 12, 10, 11],
+            ],
+            'OBS_09_Followed_By_OBS_07_No_Overlap_Plus_Ignored_Frames.pcap': [
+                [1, 2, 3, 4, 5, 6, 9, 10, 11, 12, 14, 15, 17, 18, 19, 20],
+                [21, 22, 23, 24, 25, 26, 27, 28, 30, 31],
+            ],
+            'OBS_10_Followed_OBS_07_Overlap.pcap': [
+                [1, 2, 3, 4, 7, 8, 11, 12, 17, 18, 21, 22, 25, 26, 29, 30],
+                [5, 6, 9, 10, 13, 14, 19, 20, 23, 24, 27, 28, 31, 32, 33, 34,
+                 35, 38, 36, 37],
+            ],
+        }
+
+        for pcap_file, expected in expected_frame_ids.items():
+            convs, ignored = self.__get_convs(pcap_file)
+            correlated_convs = CoAPTestCase.correlate(
+                convs,
+                TD_COAP_OBS_07.get_stimulis()
+            )
+            frame_ids = [[frame['id'] for frame in conv] for conv in correlated_convs]
+            assert frame_ids == expected, \
+                "%s: expected %s, but got %s" % (pcap_file, expected, frame_ids)
+
     @classmethod
     @typecheck
     def __check_conv_is_tc_09(self, conv: Conversation):
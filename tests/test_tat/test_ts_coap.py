@@ -0,0 +1,121 @@
+import os
+import unittest
+
+from ttproto.core.data import Data, Message
+from ttproto.core.lib.all import *
+from ttproto.core.lib.readers.pcap import PcapReader
+from ttproto.ts_coap.analysis import Frame
+from ttproto.ts_coap.proto_specific import (CoAPTracker, TimeoutTable, extract_coap_conversations,
+                                            GC_PERIOD, MAX_TIMEOUT)
+
+DUMPS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../test_dumps')
+
+
+class TimeoutTableTestCase(unittest.TestCase):
+    """
+    Test class for the table of the expiring states of the CoAP tracker
+    """
+
+    def test_expire(self):
+        table = TimeoutTable()
+        table.set('a', 1, 10)
+        table.set('b', 2, 20)
+
+        table.collect(15)
+        self.assertEqual(dict(table), {'b': 2})
+        table.collect(25)
+        self.assertEqual(dict(table), {})
+
+    def test_refresh(self):
+        table = TimeoutTable()
+        table.set('a', 1, 10)
+        table.set('b', 2, 10)
+
+        # the entry set again with a later timeout does not expire
+        table.set('a', 3, 30)
+        table.collect(15)
+        self.assertEqual(dict(table), {'a': 3})
+
+        # an entry refreshed when collected is kept until its new timeout
+        table.collect(35, lambda value, now: now + 10)
+        self.assertEqual(dict(table), {'a': 3})
+        table.collect(50, lambda value, now: None)
+        self.assertEqual(dict(table), {})
+
+
+class CoAPTrackerTestCase(unittest.TestCase):
+    """
+    Test class for the extraction of the CoAP conversations of ts_coap
+    """
+
+    def setUp(self):
+        self.name_resolution = Data.disable_name_resolution()
+        self.name_resolution.__enter__()
+
+    def tearDown(self):
+        self.name_resolution.__exit__(None, None, None)
+
+    @staticmethod
+    def read_frames(filename):
+        return Frame.create_list(PcapReader(os.path.join(DUMPS_DIR, filename)))
+
+    @staticmethod
+    def make_frames(count, period, ports=100):
+        """Build the frames of count GET exchanges, one every period seconds"""
+        frames = []
+        for i in range(count):
+            # a new message id and token for every exchange
+            client, server = ('fe80::1', 40000 + i % ports), ('fe80::2', 5683)
+            mid, tok = i % 65536, b'%d' % i
+            ts = i * period
+            for src, dst, coap in ((client, server, CoAP(code='get', mid=mid, tok=tok, opt=[CoAPOptionUriPath('test')])),
+                                   (server, client, CoAP(type='ack', code=2.05, mid=mid, tok=tok, pl=b'x'))):
+                msg = Message(IPv6(src=src[0], dst=dst[0], pl=UDP(sport=src[1], dport=dst[1], pl=coap)))
+                frames.append(Frame(len(frames) + 1, (ts, msg, None)))
+                ts += 0.1
+        return frames
+
+    def test_bounded_state(self):
+        frames = self.make_frames(2000, 5.0)
+
+        tracker = CoAPTracker()
+        counts = []
+        for i in range(0, len(frames), 200):
+            tracker.append(frames[i:i + 200])
+            counts.append(tracker.state_count())
+
+        self.assertEqual(len(tracker.conversations), 2000)
+        # only the states of the exchanges of the last GC_PERIOD + MAX_TIMEOUT
+        # seconds are kept
+        self.assertLessEqual(max(counts), 2 * 2 * (GC_PERIOD + MAX_TIMEOUT) / 5 + 2)
+        self.assertLess(max(counts), 2 * 2000 / 10)
+
+        tracker.collect(frames[-1].ts + MAX_TIMEOUT + 1)
+        self.assertEqual(tracker.state_count(), 0)
+
+    def test_extract_coap_conversations(self):
+        for filename in ('coap/CoAP_plus_random_UDP_messages.pcap',
+                         'coap_core/TD_COAP_CORE_01_PASS.pcap',
+                         'coap_block/TD_COAP_BLOCK_01_PASS.pcap',
+                         'coap_block/TD_COAP_BLOCK_06_PASS.pcap'):
+            frames = self.read_frames(filename)
+            conversations, ignored = extract_coap_conversations(frames)
+
+            self.assertEqual([[f.id for f in c] for c in conversations],
+                             [[f.id for f in c] for c in CoAPTracker(frames).conversations], filename)
+            self.assertEqual(sum(len(c) for c in conversations) + len(ignored), len(frames))
+
+    def test_extract_expired_conversations(self):
+        # the exchanges on the same endpoints belong to the same conversation
+        # until it expires
+        for period, expected in ((5.0, 1), (MAX_TIMEOUT + 1, 20)):
+            frames = self.make_frames(20, period, ports=1)
+            conversations, ignored = extract_coap_conversations(frames)
+
+            self.assertEqual(len(conversations), expected)
+            self.assertEqual([c.id for c in conversations], list(range(1, expected + 1)))
+            self.assertEqual(sum(len(c) for c in conversations), len(frames))
+            self.assertEqual(ignored, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,7 +6,9 @@ import os
 import logging
 import argparse
 from ttproto import LOG_LEVEL
-from ttproto.tat_services import dissect_capture, analyze_capture, get_protocols_list, ALLOWED_PROTOCOLS_FOR_ANALYSIS
+from ttproto.core.analyzer import Analyzer
+from ttproto.tat_services import dissect_capture, analyze_capture, analyze_capture_all, analyze_captures_batch, \
+    get_protocols_list, ALLOWED_PROTOCOLS_FOR_ANALYSIS
 from multiprocessing import Process
 
 
@@ -20,6 +22,7 @@ cli_help = '''ttproto <command> [<args>]
 TTProto CLI accepts the following commands:
     dissect         Dissects network traces (.pcap file).
     analyze         Analyses network traces (.pcap file).
+    manifest        Writes the manifest of the test cases of a test suite.
     service_amqp    Launches TTProto as an AMQP service.
     service_http    Launches TTProto as a HTTP service (WIP).
 '''
@@ -38,6 +41,9 @@ ana_help = '''ttproto analyze file [<options>]
 Analyze usage examples:
     analyze ./tests/test_dumps/6lowpan_hc/TD_6LOWPAN_HC_01.pcap -p 6lowpan -tc TD_6LOWPAN_HC_01 
     analyze ./tests/test_dumps/coap_core/TD_COAP_CORE_01_PASS.pcap -p coap -tc TD_COAP_CORE_01
+    analyze ./tests/test_dumps/preprocess/coap/OBS_07_with_other_unrelated_convs.pcap -p coap --all
+    analyze --batch ./tests/test_dumps/coap_core -p coap -o /tmp/analysis.jsonl
+    analyze --batch ./nightly_manifest.txt -j 8 -o /tmp/analysis.jsonl
 '''
 
 # TTPROTO CONSTANTS
@@ -109,6 +115,7 @@ class TTProtoCLI():
         )
 
         parser.add_argument('file',
+                            nargs='?',
                             help="Filename (complete path) to traces file (.pcap file).",
                             )
         parser.add_argument("-p", "--protocol",
@@ -119,9 +126,24 @@ class TTProtoCLI():
         parser.add_argument("-tc", "--test-case",
                             help="Indicate the particular test case ID to check."
                             )
+        parser.add_argument("-a", "--all",
+                            action='store_true',
+                            default=False,
+                            help="Check all the test cases of the test suite (or the ones given as a comma separated "
+                                 "list with -tc), decoding the traces only once."
+                            )
+        parser.add_argument("-b", "--batch",
+                            metavar='DIR_OR_MANIFEST',
+                            help="Analyse all the traces files of a directory, or the ones listed in a manifest file "
+                                 "(one '<pcap file> [<protocol> [<test case ID>]]' per line), over a pool of worker "
+                                 "processes. Results are written as JSON lines."
+                            )
+        parser.add_argument("-j", "--jobs",
+                            type=int,
+                            help="Number of worker processes for --batch (defaults to the number of CPUs)."
+                            )
         parser.add_argument("-o", "--output",
-                            help="Output file name",
-                            default='analysis.json',
+                            help="Output file name (defaults to analysis.json, or analysis.jsonl for --batch)",
                             )
         try:
             args = parser.parse_args(sys.argv[2:])
@@ -130,6 +152,35 @@ class TTProtoCLI():
             parser.print_help()
             exit(1)
 
+        if args.batch:
+            analyze_captures_batch(
+                source=args.batch,
+                protocol=args.protocol,
+                testcase_ids=args.test_case.split(',') if args.test_case else None,
+                output_filename=args.output if args.output else 'analysis.jsonl',
+                processes=args.jobs
+            )
+            return
+
+        if not args.file:
+            parser.print_help()
+            exit(1)
+
+        if not args.output:
+            args.output = 'analysis.json'
+
+        if args.all:
+            analysis_results = analyze_capture_all(
+                filename=args.file,
+                protocol=args.protocol,
+                testcase_ids=args.test_case.split(',') if args.test_case else None,
+                output_filename=args.output
+            )
+
+            for result in analysis_results:
+                logger.info('%s result: %s' % (result[0], result[1]))
+            return
+
         analysis_results = analyze_capture(
             filename=args.file,
             protocol=args.protocol,
@@ -141,6 +192,23 @@ class TTProtoCLI():
             logger.info('result: %s' % analysis_results[1])
             logger.info('details: \n%s' % analysis_results[3])
 
+    def manifest(self):
+        # parse arguments
+        parser = argparse.ArgumentParser(
+            description='Writes the manifest of the test cases of a test suite, so they can be listed without '
+                        'importing them (to be run once ttproto is installed).'
+        )
+        parser.add_argument("-p", "--protocol",
+                            choices=ALLOWED_PROTOCOLS_FOR_ANALYSIS,
+                            help="Choose the protocol of the test suite, all of them if not given.",
+                            )
+        args = parser.parse_args(sys.argv[2:])
+
+        protocols = [args.protocol] if args.protocol else ALLOWED_PROTOCOLS_FOR_ANALYSIS
+        for protocol in protocols:
+            for filename in Analyzer('tat_' + protocol).write_test_cases_manifest():
+                logger.info('Test cases manifest written: %s' % filename)
+
     def service_http(self):
         raise NotImplementedError
 
@@ -187,18 +255,26 @@ class TTProtoCLI():
                             help="Launches a component which listens to data plane in AMQP bus and dumps traces to "
                                  "pcap file. --dissector flag auto enables this mode.")
 
+        parser.add_argument("-l", "--live",
+                            action='store_true',
+                            default=False,
+                            help="Launches the live analysis of the test cases, which analyses the frames of the data "
+                                 "plane while they are received and pushes provisional and final verdicts into the bus")
+
         args = parser.parse_args(sys.argv[2:])
 
         tat_interface = 'AMQP'
         tat_protocol = args.protocol
         dissector_option = args.dissector
         dumps_option = args.dumps
+        live_option = args.live
 
         if dissector_option:  # auto dissection needs the traces in pcap files
             dumps_option = True
 
         logger.info('Configuration: \n\tinterface: %s\n\tprotocol: %s \n\tauto-dissection option: %s'
-                    % (tat_interface, tat_protocol, dissector_option))
+                    '\n\tlive analysis option: %s'
+                    % (tat_interface, tat_protocol, dissector_option, live_option))
 
         # AMQP ENV variables (either get them all from ENV or set them all as default)
         try:
@@ -227,7 +303,7 @@ class TTProtoCLI():
 
         # launch process: TAT
         p_tat = Process(target=launch_tat_amqp_interface,
-                        args=(amqp_url, amqp_exchange, tat_protocol, dissector_option))
+                        args=(amqp_url, amqp_exchange, tat_protocol, dissector_option, live_option))
         p_tat.start()
 
         # launch process: pcap dumper
@@ -37,17 +37,22 @@ interoperability testing
 """
 
 import glob
+import json
+import fnmatch
+import hashlib
 import inspect
 import sys
+import time
 import traceback
 
-from os import path, environ
+from collections import OrderedDict
+from os import path, environ, listdir
 from importlib import import_module
 import logging
 
 from ttproto import PACKAGE_DIR
 from ttproto.core.data import Data, DifferenceList, Value
-from ttproto.core.dissector import Frame, Capture, is_protocol, ProtocolNotFound
+from ttproto.core.dissector import Frame, Capture, LiveCapture, is_protocol, ProtocolNotFound
 from ttproto.core.exceptions import Error
 from ttproto.core.typecheck import typecheck, tuple_of, optional, anything, list_of
 from ttproto.core.lib.all import *
@@ -59,15 +64,29 @@ logger.setLevel(environ.get('LOG_LEVEL', logging.DEBUG))
 
 __all__ = [
     'Verdict',
+    'TestCaseLog',
     'Node',
     'Conversation',
+    'TestCaseTelemetry',
     'TestCase',
-    'Analyzer'
+    'TestCaseRegistry',
+    'AnalysisResultCache',
+    'Analyzer',
+    'LiveAnalyzer'
 ]
 
 TESTCASES_SUBDIR = 'testcases'
 TC_FILE_EXTENSION = '.py'
 EVERY_TC_WILDCARD = 'td_*' + TC_FILE_EXTENSION
+TC_MANIFEST_FILENAME = 'manifest.json'
+TC_COMMON_FILENAME = 'common.py'
+ANALYSIS_CACHE_SIZE = 128
+
+# Default budgets of a test case execution (seconds, frames, match calls),
+# the executions are unbounded unless they are given in the environment
+TC_MAX_DURATION = float(environ['TC_MAX_DURATION']) if environ.get('TC_MAX_DURATION') else None
+TC_MAX_FRAMES = int(environ['TC_MAX_FRAMES']) if environ.get('TC_MAX_FRAMES') else None
+TC_MAX_MATCH_CALLS = int(environ['TC_MAX_MATCH_CALLS']) if environ.get('TC_MAX_MATCH_CALLS') else None
 
 
 @typecheck
@@ -236,6 +255,151 @@ class Verdict:
         return self.__values[self.__value]
 
 
+class TestCaseLog:
+    """
+    The log of a test case, kept as a list of structured entries and only
+    rendered (as text or as dictionaries for json) when asked for.
+
+    Known entry types are:
+     - 'frame': The test case switched to a frame
+     - 'verdict': A partial verdict was set
+     - 'mismatch': A field of a frame didn't match its template
+     - 'message': Any other message
+    """
+
+    FRAME = 'frame'
+    VERDICT = 'verdict'
+    MISMATCH = 'mismatch'
+    MESSAGE = 'message'
+
+    def __init__(self):
+        """
+        Initialize an empty log
+        """
+        self.__entries = []
+        self.__lines = []
+
+    def __len__(self):
+        return len(self.__entries)
+
+    @typecheck
+    def log_frame(self, frame: Frame):
+        """
+        Log the switch to a frame, its summary is computed when rendered
+
+        :param frame: The frame
+        :type frame: Frame
+        """
+        self.__entries.append((self.FRAME, frame))
+
+    @typecheck
+    def log_verdict(self, verdict: str, message: str):
+        """
+        Log a partial verdict
+
+        :param verdict: The verdict value
+        :param message: The message associated to it
+        :type verdict: str
+        :type message: str
+        """
+        self.__entries.append((self.VERDICT, (verdict, message)))
+
+    @typecheck
+    def log_mismatch(self, path: str, mismatch: str, got: str, expected: str):
+        """
+        Log a mismatch between a field of a frame and its template
+
+        :param path: The path of the field
+        :param mismatch: The name of the mismatch type
+        :param got: The description of the value of the field
+        :param expected: The description of the expected value
+        :type path: str
+        :type mismatch: str
+        :type got: str
+        :type expected: str
+        """
+        self.__entries.append((self.MISMATCH, (path, mismatch, got, expected)))
+
+    def log_message(self, msg):
+        """
+        Log any other message, it is converted to a string when rendered
+
+        :param msg: The message to log, can be of any type
+        :type msg: object
+        """
+        self.__entries.append((self.MESSAGE, msg))
+
+    def extend(self, entries):
+        """
+        Append entries taken from another log
+
+        :param entries: The (entry type, entry value) tuples to append
+        :type entries: [(str, object)]
+        """
+        self.__entries.extend(entries)
+
+    def get_entries(self):
+        """
+        Get the structured entries of the log
+
+        :return: The list of (entry type, entry value) tuples
+        :rtype: [(str, object)]
+        """
+        return self.__entries
+
+    @classmethod
+    def __render_entry(cls, entry_type, value) -> str:
+        if entry_type == cls.FRAME:
+            text = str(value)
+        elif entry_type == cls.VERDICT:
+            text = '  [%s] %s' % (format(value[0], "^6s"), value[1])
+        elif entry_type == cls.MISMATCH:
+            return (
+                "             %s: %s\n"
+                "                 got:      %s\n"
+                "                 expected: %s\n"
+            ) % value
+        else:
+            text = str(value)
+        return text if text.endswith('\n') else (text + '\n')
+
+    @typecheck
+    def get_text(self) -> str:
+        """
+        Render the log as text, the entries already rendered by a previous
+        call are not rendered again
+
+        :return: The log as text
+        :rtype: str
+        """
+        for entry_type, value in self.__entries[len(self.__lines):]:
+            self.__lines.append(self.__render_entry(entry_type, value))
+        return ''.join(self.__lines)
+
+    @typecheck
+    def get_dicts(self) -> list_of(OrderedDict):
+        """
+        Render the log as a list of dictionaries, to be serialized into json
+
+        :return: The entries of the log as dictionaries
+        :rtype: [OrderedDict]
+        """
+        dicts = []
+        for entry_type, value in self.__entries:
+            entry = OrderedDict()
+            entry['type'] = entry_type
+            if entry_type == self.FRAME:
+                entry['frame_id'], entry['summary'] = value.summary()
+            elif entry_type == self.VERDICT:
+                entry['verdict'], entry['message'] = value
+            elif entry_type == self.MISMATCH:
+                entry['path'], entry['mismatch'], entry['got'], entry['expected'] = value
+            else:
+                entry['message'] = str(value)
+            dicts.append(entry)
+        return dicts
+
+
 class Node:
     """
     A node object is any communicating entity, taking part
@@ -340,10 +504,79 @@ class Conversation(list):
         return True
 
 
+class TestCaseTelemetry:
+    """
+    Collects the budgets usage of the test cases executions of the process,
+    per test case id, so that their limits can be tuned.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty telemetry
+        """
+        self.__stats = OrderedDict()
+
+    @typecheck
+    def record(self, tc_id: str, duration: float, frames: int, match_calls: int, exceeded: optional(str) = None):
+        """
+        Record the budgets usage of a test case execution
+
+        :param tc_id: The id of the test case
+        :param duration: The duration of the execution, in seconds
+        :param frames: The number of frames processed
+        :param match_calls: The number of calls to match()
+        :param exceeded: The name of the exceeded budget if any
+        """
+        try:
+            stats = self.__stats[tc_id]
+        except KeyError:
+            stats = self.__stats[tc_id] = OrderedDict([
+                ('runs', 0),
+                ('exceeded', 0),
+                ('total_duration', 0.0),
+                ('max_duration', 0.0),
+                ('max_frames', 0),
+                ('max_match_calls', 0),
+            ])
+
+        stats['runs'] += 1
+        stats['exceeded'] += 1 if exceeded else 0
+        stats['total_duration'] += duration
+        stats['max_duration'] = max(stats['max_duration'], duration)
+        stats['max_frames'] = max(stats['max_frames'], frames)
+        stats['max_match_calls'] = max(stats['max_match_calls'], match_calls)
+
+    @typecheck
+    def get_stats(self) -> OrderedDict:
+        """
+        Get the budgets usage recorded per test case id
+
+        :return: For each test case id, its number of runs and of exceeded
+                 budgets, its total and max duration, its max number of
+                 frames and of match calls
+        :rtype: OrderedDict
+        """
+        return OrderedDict((tc_id, OrderedDict(stats)) for tc_id, stats in self.__stats.items())
+
+    def clear(self):
+        """
+        Remove all the recorded usages
+        """
+        self.__stats.clear()
+
+
 class TestCase(object):
     """
     A class handling a test case for an analysis.
     Test cases in ttproto context is a set of checks steps of a test specification
+
+    The execution of a test case can be bounded by budgets of wall clock
+    time, frames processed and calls to match(), checked by next() and
+    match(). A test case exceeding one of them is stopped with an error
+    verdict. The budgets default to TC_MAX_DURATION, TC_MAX_FRAMES and
+    TC_MAX_MATCH_CALLS (which are given as environment variables) and can be
+    overridden by the test cases, None meaning no limit. There is no limit
+    when they are not set.
     """
 
     class Stop(Exception):
@@ -353,6 +586,20 @@ class TestCase(object):
         """
         pass
 
+    class BudgetExceeded(Exception):
+        """
+        Exception thrown when the execution exceeded one of its budgets
+        """
+        pass
+
+    # Budgets of an execution
+    max_duration = TC_MAX_DURATION
+    max_frames = TC_MAX_FRAMES
+    max_match_calls = TC_MAX_MATCH_CALLS
+
+    # The budgets usage of the executions of the process
+    telemetry = TestCaseTelemetry()
+
     @typecheck
     def __init__(self, capture: Capture):
         """
@@ -373,13 +620,39 @@ class TestCase(object):
         self._iter = None
         self._frame = None
 
-        # Prepare the values to return after a TC is finished
-        # TODO keep & use test_stack (structured representation of the logs in an array) and delete self._text (string)
-        self._text = ''
-        self._text_stack = []
+        # Prepare the values to return after a TC is finished, the log is
+        # only rendered as text when the results are asked for
+        self._log = TestCaseLog()
         self._failed_frames = []
         self._exceptions = []
 
+        # Prepare the budgets usage
+        self._start_time = None
+        self._frames_count = 0
+        self._match_calls = 0
+        self._exceeded_budget = None
+
+    def __check_budgets(self):
+        """
+        Check that the execution didn't exceed its budgets
+
+        :raises BudgetExceeded: If one of the budgets is exceeded
+        """
+        duration = time.monotonic() - self._start_time if self._start_time else 0.0
+
+        for budget, value, limit in (
+                ('duration', duration, self.max_duration),
+                ('frames', self._frames_count, self.max_frames),
+                ('match calls', self._match_calls, self.max_match_calls),
+        ):
+            if limit is not None and value > limit:
+                self._exceeded_budget = budget
+                raise self.BudgetExceeded(
+                    '%s exceeded its %s budget (%s): stopped at %s after %.3fs, %d frames and %d match calls'
+                    % (self.__class__.__name__, budget, limit, self._frame, duration,
+                       self._frames_count, self._match_calls)
+                )
+
     @typecheck
     def __not_matching(self, verdict: optional(is_verdict), message: str) -> bool:
 
@@ -418,8 +691,13 @@ class TestCase(object):
         :return: True if the current frame value matched the given template
                  False if not
         :rtype: bool
+
+        :raises BudgetExceeded: If the execution exceeded one of its budgets
         """
 
+        self._match_calls += 1
+        self.__check_budgets()
+
         # If no more frames for this conversation
         if not self._iter:
             return self.__not_matching(
@@ -468,11 +746,12 @@ class TestCase(object):
         else:  # mismatch
             if on_mismatch_verdict is not None:
                 def callback(path, mismatch, describe):
-                    self.log("             %s: %s\n" % (".".join(path), type(mismatch).__name__))
-                    # for i in diff_list:
-                    #     self.log("             List Diff Item: %s\n" % (i))
-                    self.log("                 got:      %s\n" % mismatch.describe_value(describe))
-                    self.log("                 expected: %s\n" % mismatch.describe_expected(describe))
+                    self._log.log_mismatch(
+                        ".".join(path),
+                        type(mismatch).__name__,
+                        mismatch.describe_value(describe),
+                        mismatch.describe_expected(describe)
+                    )
 
                 if on_mismatch_msg != '':
                     partial_verdict_message = on_mismatch_msg
@@ -500,10 +779,14 @@ class TestCase(object):
 
         :param optional: If we have to get a next frame or not
         :type optional: bool
+
+        :raises BudgetExceeded: If the execution exceeded one of its budgets
         """
         try:
             self._frame = next(self._iter)
-            self.log(self._frame)
+            self._log.log_frame(self._frame)
+            self._frames_count += 1
+            self.__check_budgets()
 
         except StopIteration:
             if not optional:
@@ -522,9 +805,20 @@ class TestCase(object):
         :param msg: The message to log, can be of any type
         :type msg: object
         """
-        text = str(msg)
-        self._text_stack.append(msg)
-        self._text += text if text.endswith('\n') else (text + '\n')
+        if isinstance(msg, Frame):
+            self._log.log_frame(msg)
+        else:
+            self._log.log_message(msg)
+
+    @typecheck
+    def get_log(self) -> TestCaseLog:
+        """
+        Get the structured log of the test case
+
+        :return: The log of the test case
+        :rtype: TestCaseLog
+        """
+        return self._log
 
     @typecheck
     def set_verdict(self, verdict: is_verdict, msg):
@@ -540,7 +834,7 @@ class TestCase(object):
             pass
         elif type(msg) is str:
             msg_fix = msg
-            self.log('  [%s] %s' % (format(verdict, "^6s"), msg_fix))
+            self._log.log_verdict(verdict, msg_fix)
         elif type(msg) is list:
             while msg:
                 msg_fix += msg.pop() + '\n'
@@ -548,8 +842,44 @@ class TestCase(object):
         # verdict msg can now log more that one line of messages
         self._verdict.update(verdict, msg_fix)
 
+    def __get_conversation_marks(self) -> tuple:
+        """
+        Get the sizes of the results, for extracting the part of the results
+        given by the run on a conversation (see __get_conversation_result())
+        """
+        return (
+            len(self._verdict.get_traceback()),
+            len(self._failed_frames),
+            len(self._log),
+            len(self._exceptions),
+        )
+
+    def __get_conversation_result(self, marks: tuple) -> tuple:
+        """
+        Get the partial verdicts, failed frames, log entries and exceptions
+        added since the marks were taken
+        """
+        verdicts, failed_frames, entries, exceptions = marks
+        return (
+            self._verdict.get_traceback()[verdicts:],
+            self._failed_frames[failed_frames:],
+            self._log.get_entries()[entries:],
+            self._exceptions[exceptions:],
+        )
+
+    def __replay_conversation_result(self, result: tuple):
+        """
+        Add the result of a previous run on a conversation to the results
+        """
+        verdicts, failed_frames, entries, exceptions = result
+        for verdict, message in verdicts:
+            self._verdict.update(verdict, message)
+        self._failed_frames.extend(failed_frames)
+        self._log.extend(entries)
+        self._exceptions.extend(exceptions)
+
     @typecheck
-    def run_test_case(self) -> (
+    def run_test_case(self, conversation_results: optional(dict) = None) -> (
             str,
             list_of(int),
             str,
@@ -559,6 +889,16 @@ class TestCase(object):
         """
         Run the test case
 
+        The results of the runs on each conversation can be kept between
+        successive runs on a growing capture (see LiveAnalyzer). The
+        conversations whose frames didn't change since the previous run are
+        then not run again, their results are replayed instead.
+
+        :param conversation_results: The results of the previous run by
+                                     conversation, updated with the ones of
+                                     this run
+        :type conversation_results: optional(dict)
+
         :return: A tuple with the informations about the test results which are
                  - The verdict as a string
                  - The list of the result important frames
@@ -571,6 +911,9 @@ class TestCase(object):
         # is not generic.
         TestCase.get_nodes_identification_templates = self.get_nodes_identification_templates
 
+        # Start the clock of the duration budget
+        self._start_time = time.monotonic()
+
         # Pre-process / filter conversations corresponding to the TC
 
         self._conversations, self._ignored = self.preprocess(
@@ -591,10 +934,21 @@ class TestCase(object):
             )
 
         else:
+            # The results of the conversations run, by ids of their frames
+            results = {}
+
             # Run the test case for every conversations
             for conv in self._conversations:
+                key = tuple(map(id, conv))
+                if conversation_results is not None and key in conversation_results:
+                    # Unchanged since the previous run
+                    results[key] = conversation_results[key]
+                    self.__replay_conversation_result(results[key])
+                    continue
+
                 if logger.getEffectiveLevel() == logging.DEBUG:
                     for frame in conv: logger.debug(frame)
+                marks = self.__get_conversation_marks()
                 try:
                     # Get an iterator on the current conversation frames
                     # and its list of nodes
@@ -614,6 +968,15 @@ class TestCase(object):
                     )):
                         self.set_verdict('none', 'no match')
 
+                except self.BudgetExceeded as e:
+                    logger.warning(e)
+
+                    # Keep the diagnostics into the exceptions, and don't run
+                    # the remaining conversations
+                    self._exceptions.append(sys.exc_info())
+                    self.set_verdict('error', str(e))
+                    break
+
                 except Exception as e:
                     # Get the execution information, it's a tuple with
                     #     - The type of the exception being handled
@@ -635,11 +998,56 @@ class TestCase(object):
                     self.set_verdict('error', 'unhandled exception')
                     self.log(_exception_value)
 
+                results[key] = self.__get_conversation_result(marks)
+
+            if conversation_results is not None:
+                conversation_results.clear()
+                conversation_results.update(results)
+
+        # Export the budgets usage
+        usage = self.get_budgets_usage()
+        self.telemetry.record(self.__class__.__name__, **usage)
+        logger.debug('%s budgets usage: %s' % (self.__class__.__name__, dict(usage)))
+
         # Return the results
+        return self.get_results()
+
+    @typecheck
+    def get_budgets_usage(self) -> OrderedDict:
+        """
+        Get the budgets usage of the execution of the test case
+
+        :return: The duration (in seconds), the number of frames processed,
+                 the number of match calls and the name of the exceeded
+                 budget (None if none was)
+        :rtype: OrderedDict
+        """
+        return OrderedDict([
+            ('duration', time.monotonic() - self._start_time if self._start_time else 0.0),
+            ('frames', self._frames_count),
+            ('match_calls', self._match_calls),
+            ('exceeded', self._exceeded_budget),
+        ])
+
+    @typecheck
+    def get_results(self) -> (
+            str,
+            list_of(int),
+            str,
+            list_of((str, str)),
+            list_of((type, Exception, is_traceback))
+    ):
+        """
+        Get the results of the test case, in the format returned by
+        run_test_case()
+
+        :return: A tuple with the informations about the test results
+        :rtype: (str, [int], str,[(str,str)], [(type, Exception, traceback)])
+        """
         return (
             self._verdict.get_value(),
             self._failed_frames,
-            self._text,
+            self._log.get_text(),
             self._verdict.get_traceback(),
             self._exceptions,
         )
@@ -721,6 +1129,46 @@ class TestCase(object):
         """
         raise NotImplementedError()
 
+    @classmethod
+    @typecheck
+    def is_stimulated(cls, capture: Capture) -> bool:
+        """
+        Check if the capture contains frames matching the stimulis of this
+        test case. Test cases which are not stimulated are not run by
+        Analyzer.analyse_all().
+
+        This may be reimplemented into the protocol's common test case class
+        when it can be checked cheaply, by default every test case is run.
+
+        :param capture: The capture to check
+        :type capture: Capture
+
+        :return: True if the test case may be stimulated by the capture
+        :rtype: bool
+        """
+        return True
+
+    @classmethod
+    @typecheck
+    def is_related_frame(cls, capture: Capture, frame: Frame) -> bool:
+        """
+        Check if a frame of the capture may change the result of this test
+        case. LiveAnalyzer only runs the test cases again for the frames
+        which are related to them.
+
+        This may be reimplemented into the protocol's common test case class
+        when it can be checked cheaply, by default every frame is related.
+
+        :param capture: The capture containing the frame
+        :param frame: The frame
+        :type capture: Capture
+        :type frame: Frame
+
+        :return: True if the frame may change the result of the test case
+        :rtype: bool
+        """
+        return True
+
     @classmethod
     @typecheck
     def get_stimulis(cls) -> list_of(Value):
@@ -746,6 +1194,400 @@ class TestCase(object):
         raise NotImplementedError()
 
 
+class TestCaseRegistry:
+    """
+        Registry of the test cases of a test environment.
+
+        It maps each test case id to the module and class implementing it, its
+        purpose and its stimulis. The testcases directories are listed once
+        per process and each test case module is imported at most once, when
+        its class is asked for.
+
+        If a testcases directory contains a manifest (see write_manifests())
+        describing the same test case files than the directory, with the same
+        content (the manifest keeps the hash of each of them), the entries
+        are loaded from it, so the test cases can be listed with their purpose
+        without importing any of them.
+    """
+
+    __registries = {}
+
+    @typecheck
+    def __init__(self, testcases_dir: str):
+        """
+        Build the registry of the test cases found into testcases_dir
+
+        :param testcases_dir: The testcases directory, may be a glob pattern
+                              for several test environments
+        :type testcases_dir: str
+        """
+        self.__testcases_dir = testcases_dir
+
+        # The entries ordered by module, and indexed by lower case test case id
+        self.__entries = []
+        self.__entries_by_id = {}
+
+        # The test cases classes already imported, by module
+        self.__classes = {}
+
+        for directory in sorted(glob.glob(testcases_dir)):
+            entries = self.__read_manifest(directory)
+            if entries is None:
+                entries = self.__scan_directory(directory)
+
+            for entry in entries:
+                self.__entries.append(entry)
+                self.__entries_by_id.setdefault(entry['id'].lower(), []).append(entry)
+
+    @classmethod
+    @typecheck
+    def get_registry(cls, testcases_dir: str):
+        """
+        Get the registry of testcases_dir, it is built once per process
+
+        :param testcases_dir: The testcases directory, may be a glob pattern
+        :type testcases_dir: str
+
+        :return: The registry of the test cases of testcases_dir
+        :rtype: TestCaseRegistry
+        """
+        try:
+            return cls.__registries[testcases_dir]
+        except KeyError:
+            registry = cls(testcases_dir)
+            cls.__registries[testcases_dir] = registry
+            return registry
+
+    @staticmethod
+    def __list_modules(directory: str) -> list_of(str):
+        """
+        List the names of the test case modules of a testcases directory
+        """
+        return sorted(
+            filename[:-len(TC_FILE_EXTENSION)]
+            for filename in fnmatch.filter(listdir(directory), EVERY_TC_WILDCARD)
+        )
+
+    @staticmethod
+    def __hash_module(directory: str, module: str) -> str:
+        """
+        Hash the source file of a test case module of a testcases directory
+        """
+        filename = path.join(directory, module.rpartition('.')[2] + TC_FILE_EXTENSION)
+        return AnalysisResultCache.hash_file(filename)
+
+    @staticmethod
+    def __get_package(directory: str) -> str:
+        """
+        Get the package name of a testcases directory, for example we need to
+        build ttproto.tat_coap.testcases from ttproto/tat_coap/testcases
+        """
+        return '.'.join(['ttproto'] + path.normpath(directory).split(path.sep)[-2:])
+
+    def __scan_directory(self, directory: str) -> list:
+        """
+        Build the entries of the test cases of a directory from its files
+        """
+        package = self.__get_package(directory)
+
+        # Note that the module is always lower case and the plugin (class)
+        # is upper case (ETSI naming convention)
+        return [
+            OrderedDict([
+                ('id', modname.upper()),
+                ('module', '.'.join([package, modname])),
+                ('class', modname.upper()),
+                ('purpose', None),
+                ('stimulis', None),
+            ])
+            for modname in self.__list_modules(directory)
+        ]
+
+    def __read_manifest(self, directory: str) -> optional(list):
+        """
+        Read the entries of the test cases of a directory from its manifest,
+        None if there is none or if it is out of date
+        """
+        manifest_filename = path.join(directory, TC_MANIFEST_FILENAME)
+
+        try:
+            with open(manifest_filename) as manifest_file:
+                entries = json.load(manifest_file, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return None
+
+        # The manifest must describe the test case files of the directory
+        package = self.__get_package(directory)
+        modules = ['.'.join([package, modname]) for modname in self.__list_modules(directory)]
+        if [entry.get('module') for entry in entries] != modules or any(
+                entry.get('sha1') != self.__hash_module(directory, entry['module'])
+                for entry in entries
+        ):
+            logger.warning('Ignoring out of date test cases manifest %s' % manifest_filename)
+            return None
+
+        return entries
+
+    @typecheck
+    def get_entries(self, testcases: optional(list_of(str)) = None) -> list:
+        """
+        Get the entries of the wanted test cases
+
+        :param testcases: The wanted test cases ids, all of them if None
+        :type testcases: optional([str])
+
+        :return: The entries, in the same order than the param list
+        :rtype: [OrderedDict]
+
+        :raises FileNotFoundError: If one of the test cases isn't found
+        """
+        if not testcases:
+            if not self.__entries:
+                raise FileNotFoundError(
+                    'No test case found for: "%s"' % path.join(self.__testcases_dir, EVERY_TC_WILDCARD)
+                )
+            return list(self.__entries)
+
+        entries = []
+        for test_case_name in testcases:
+            try:
+                entries += self.__entries_by_id[test_case_name.lower()]
+            except KeyError:
+                raise FileNotFoundError(
+                    'No test case found for: "%s"' % path.join(
+                        self.__testcases_dir,
+                        test_case_name.lower() + TC_FILE_EXTENSION
+                    )
+                )
+        return entries
+
+    def get_class(self, entry):
+        """
+        Get the test case class of an entry, its module is imported the first
+        time only
+
+        :param entry: The entry of the test case
+        :type entry: OrderedDict
+
+        :return: The test case class
+        """
+        try:
+            return self.__classes[entry['module']]
+        except KeyError:
+            tc = getattr(import_module(entry['module']), entry['class'])
+            self.__classes[entry['module']] = tc
+            return tc
+
+    @typecheck
+    def get_purpose(self, entry: OrderedDict) -> str:
+        """
+        Get the purpose of the test case of an entry
+
+        :param entry: The entry of the test case
+        :type entry: OrderedDict
+
+        :return: The purpose of the test case
+        :rtype: str
+        """
+        if entry['purpose'] is None:
+            entry['purpose'] = self.get_class(entry).get_test_purpose()
+        return entry['purpose']
+
+    @typecheck
+    def get_stimulis(self, entry: OrderedDict) -> list_of(str):
+        """
+        Get the text representation of the stimulis of the test case of an
+        entry, the list is empty if the test case doesn't define them
+
+        :param entry: The entry of the test case
+        :type entry: OrderedDict
+
+        :return: The stimulis of the test case
+        :rtype: [str]
+        """
+        if entry['stimulis'] is None:
+            try:
+                entry['stimulis'] = [repr(stimuli) for stimuli in self.get_class(entry).get_stimulis()]
+            except NotImplementedError:
+                entry['stimulis'] = []
+        return entry['stimulis']
+
+    @typecheck
+    def write_manifests(self) -> list_of(str):
+        """
+        Write the manifest of each testcases directory of the registry, all
+        the test cases are imported for this
+
+        :return: The filenames of the written manifests
+        :rtype: [str]
+        """
+        filenames = []
+        for directory in sorted(glob.glob(self.__testcases_dir)):
+            package = self.__get_package(directory)
+            entries = [
+                entry for entry in self.__entries
+                if entry['module'].rpartition('.')[0] == package
+            ]
+            for entry in entries:
+                self.get_purpose(entry)
+                self.get_stimulis(entry)
+                entry['sha1'] = self.__hash_module(directory, entry['module'])
+
+            filename = path.join(directory, TC_MANIFEST_FILENAME)
+            with open(filename, 'w') as manifest_file:
+                json.dump(entries, manifest_file, indent=4)
+            filenames.append(filename)
+
+        return filenames
+
+
+class AnalysisResultCache:
+    """
+    A bounded cache of the results of analyse(), so that an analysis asked
+    again (retries, reloads of the web pages, re-sent analysis requests) is
+    answered without decoding the capture again.
+
+    Results are keyed by the hash of the capture content, the test case id
+    and the hash of the test case sources (its module and the common.py of
+    its test environment), so that a modified capture or test case is
+    analysed again. When full, the least recently used result is evicted.
+    """
+
+    __BLOCK_SIZE = 1 << 16
+
+    @typecheck
+    def __init__(self, max_size: int = ANALYSIS_CACHE_SIZE):
+        """
+        Initialize an empty cache
+
+        :param max_size: The maximum number of results kept
+        :type max_size: int
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.__results = OrderedDict()
+        self.__sources_hashes = {}
+
+    def __len__(self):
+        return len(self.__results)
+
+    @classmethod
+    @typecheck
+    def hash_file(cls, filename: str, hash_object=None) -> str:
+        """
+        Hash the content of a file
+
+        :param filename: The name of the file to hash
+        :param hash_object: The hashlib object to update, a new sha1 if None
+        :type filename: str
+
+        :return: The hex digest of the hash object
+        :rtype: str
+
+        :raises FileNotFoundError: If the file doesn't exist
+        """
+        if hash_object is None:
+            hash_object = hashlib.sha1()
+        with open(filename, 'rb') as f:
+            for block in iter(lambda: f.read(cls.__BLOCK_SIZE), b''):
+                hash_object.update(block)
+        return hash_object.hexdigest()
+
+    @typecheck
+    def hash_test_case(self, test_case_class: is_tc_subclass) -> str:
+        """
+        Hash the sources of a test case, which are its module and the
+        common.py of its test environment if any. The hash is computed once
+        per test case class, as its code can't change once imported.
+
+        :param test_case_class: The class of the test case
+        :return: The hex digest of the sources hash
+        :rtype: str
+        """
+        try:
+            return self.__sources_hashes[test_case_class]
+        except KeyError:
+            pass
+
+        hash_object = hashlib.sha1()
+        source_file = inspect.getsourcefile(test_case_class)
+        common_file = path.join(path.dirname(path.dirname(source_file)), TC_COMMON_FILENAME)
+        for filename in (source_file, common_file):
+            if path.isfile(filename):
+                self.hash_file(filename, hash_object)
+
+        self.__sources_hashes[test_case_class] = hash_object.hexdigest()
+        return self.__sources_hashes[test_case_class]
+
+    @typecheck
+    def get_key(self, filename: str, test_case_class: is_tc_subclass) -> (str, str, str):
+        """
+        Get the key of the results of a test case on a capture file
+
+        :param filename: The name of the capture file
+        :param test_case_class: The class of the test case
+        :type filename: str
+
+        :return: The capture hash, the test case id and the test case hash
+        :rtype: (str, str, str)
+
+        :raises FileNotFoundError: If the capture file doesn't exist
+        """
+        return (
+            self.hash_file(filename),
+            test_case_class.__name__,
+            self.hash_test_case(test_case_class)
+        )
+
+    @typecheck
+    def get(self, key: (str, str, str)) -> optional((str, list_of(int), str, list_of((str, str)))):
+        """
+        Get the results stored for a key, and mark them as the most recently
+        used ones
+
+        :param key: The key returned by get_key()
+        :return: A copy of the verdict, review frames, log and partial
+                 verdicts stored, None if not found
+        :rtype: (str, [int], str, [(str, str)])
+        """
+        try:
+            verdict, rev_frames, log, partial_verdicts = self.__results[key]
+        except KeyError:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.__results.move_to_end(key)
+        return verdict, list(rev_frames), log, list(partial_verdicts)
+
+    @typecheck
+    def put(self, key: (str, str, str), verdict: str, rev_frames: list_of(int), log: str,
+            partial_verdicts: list_of((str, str))):
+        """
+        Store the results of a test case on a capture, evicting the least
+        recently used ones if the cache is full
+
+        :param key: The key returned by get_key()
+        :param verdict: The verdict
+        :param rev_frames: The review frames
+        :param log: The log of the test case
+        :param partial_verdicts: The partial verdicts
+        """
+        self.__results[key] = (verdict, tuple(rev_frames), log, tuple(partial_verdicts))
+        self.__results.move_to_end(key)
+        while len(self.__results) > self.max_size:
+            self.__results.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all the stored results
+        """
+        self.__results.clear()
+        self.hits = 0
+        self.misses = 0
+
+
 class Analyzer:
     """
         Class for the analyzer tool.
@@ -757,6 +1599,9 @@ class Analyzer:
 
     """
 
+    # The results of analyse(), shared by all the analyzers of the process
+    results_cache = AnalysisResultCache()
+
     @typecheck
     def __init__(self, test_env: str = 'tat_*'):
         """
@@ -779,73 +1624,20 @@ class Analyzer:
         if test_env != 'tat_*' and not path.isdir(self.testcases_dir):
             raise NotADirectoryError("Not a valid test environment: %s" % test_env)
 
-    @typecheck
-    def __get_testcase_object_from_pathname(self, testcase_path: str):
-        if len(testcase_path.split(path.sep)) < 3:
-            raise FileNotFoundError('Impossible to get testcase object from %s' % testcase_path)
-
-        # we need to build a ttproto.tat_coap.testcases.td_coap_core_01 from ttproto/tat_coap/testcases/td_coap_core_01
-
-        # Get the name of the file
-        filename = testcase_path.split(path.sep)[-1]
-        superdir = testcase_path.split(path.sep)[-2]
-        test_environment = testcase_path.split(path.sep)[-3]
-
-        # Get the name of the module
-        modname = filename[:(-1 * len(TC_FILE_EXTENSION))]
-
-        # Build the module relative name
-        mod_rel_name = '.'.join([
-            'ttproto',
-            test_environment,
-            superdir,
-            modname
-        ])
-
-        # Note that the module is always lower case and the plugin (class)
-        # is upper case (ETSI naming convention)
-
-        return getattr(import_module(mod_rel_name), modname.upper())
+        self.registry = TestCaseRegistry.get_registry(self.testcases_dir)
 
     @typecheck
-    def __get_testcases_from_pathname(self, search: str):
+    def write_test_cases_manifest(self) -> list_of(str):
         """
-        Get list of test cases objects from the right test suite search
+        Write the manifest of the test cases of the test environment, so that
+        the next processes don't need to import them for listing them (see
+        TestCaseRegistry). This is meant to be run once the package is
+        installed, eg. with "python3 -m ttproto manifest -p coap".
 
-        :param testcases: List in which we will add the test cases
-        :param search: The research query, can be a single TC or the wildcard
-                       to select all the test cases
-        :type testcases: [type]
-        :type search: str
+        :return: The filenames of the written manifests
+        :rtype: [str]
         """
-        testcases = []
-
-        # Build the search query
-        search_query = path.join(
-            self.testcases_dir,
-            search
-        )
-
-        # Fetch files using the search query
-        result = glob.glob(search_query)
-
-        # If no test case found
-        if len(result) == 0:
-            raise FileNotFoundError(
-                'No test case found for: "%s"' % search_query
-            )
-
-        # If the search query is the wildcard, sort the list
-        elif search == EVERY_TC_WILDCARD:
-            result.sort()
-
-        # For every file found
-        for filepath in result:
-            tc = self.__get_testcase_object_from_pathname(filepath)
-            if tc:
-                testcases.append(tc)
-
-        return testcases
+        return self.registry.write_manifests()
 
     @typecheck
     def import_test_cases(self, testcases: optional(list_of(str)) = None) -> list:
@@ -865,24 +1657,13 @@ class Analyzer:
                 - All test cases are contained into ttproto/[env]/testcases
                 - Filenames corresponds to the TC id in lower case
                 - Class names corresponds to the TC id
-        """
-
-        # The return values
-        tc_fetched = []
-
-        # If no TCs provided, fetch all the test cases found
-        if not testcases:
-            tc_fetched = self.__get_testcases_from_pathname(EVERY_TC_WILDCARD)
 
-        # If testcases list are provided, fetch those
-        else:
-            # For every test case given
-            for test_case_name in testcases:
-                tc_name_query = test_case_name.lower() + TC_FILE_EXTENSION
-                tc_fetched += self.__get_testcases_from_pathname(tc_name_query)
-
-        # Return the test cases classes
-        return tc_fetched
+        .. note::
+            The test cases are looked up into the TestCaseRegistry of the test
+            environment, so the testcases directory is listed once per process
+            and each test case module is imported only once.
+        """
+        return [self.registry.get_class(entry) for entry in self.registry.get_entries(testcases)]
 
     @typecheck
     def get_implemented_testcases(
@@ -911,22 +1692,21 @@ class Analyzer:
         # The return value
         ret = []
 
-        # Get the tc classes
-        tc_classes = self.import_test_cases(testcases)
-
-        # Add the infos of each of them to the return value
-        for tc in tc_classes:
+        # Add the infos of each test case to the return value, the registry
+        # only imports them if their purpose isn't known from its manifest
+        for entry in self.registry.get_entries(testcases):
 
             # If verbose is asked, we provide the source code and doc too
             source_code = ''
             source_doc = ''
             if verbose:
+                tc = self.registry.get_class(entry)
                 source_code = inspect.getsource(tc)
                 source_doc = inspect.getdoc(tc)
 
             # Add the tuple to the return value
             ret.append(
-                (tc.__name__, tc.get_test_purpose(), source_code, source_doc)
+                (entry['id'], self.registry.get_purpose(entry), source_code, source_doc)
             )
 
         # Return the list of tuples
@@ -968,6 +1748,12 @@ class Analyzer:
                 - inconclusive: if all occurrences returned a inconclusive verdict
                 - pass: all occurrences are inconclusive or at least one is PASS and
                         the rest is inconclusive
+
+        .. note::
+            Results are kept into the results_cache of the analyzers, so
+            analysing the same capture content with the same test case code
+            again returns them without running the test case. Results with
+            exceptions aren't cached.
         """
 
         # Get the test case class
@@ -975,6 +1761,13 @@ class Analyzer:
         assert len(test_case_class) == 1
         test_case_class = test_case_class[0]
 
+        # Look for the results of a previous analysis
+        cache_key = self.results_cache.get_key(filename, test_case_class)
+        cached_results = self.results_cache.get(cache_key)
+        if cached_results is not None:
+            logger.debug('Results of %s for %s found in cache' % (tc_id, filename))
+            return (tc_id,) + cached_results + ([],)
+
         # Disable name resolution for performance improvements
         with Data.disable_name_resolution():
             # Get the capture from the file
@@ -983,6 +1776,9 @@ class Analyzer:
             test_case = test_case_class(capture)
             verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case()
 
+            if not exceps:
+                self.results_cache.put(cache_key, verdict, rev_frames, log, partial_verdicts)
+
             # print('##### capture')
             # print(capture)
             # print('#####')
@@ -1004,6 +1800,245 @@ class Analyzer:
 
             return tc_id, verdict, rev_frames, log, partial_verdicts, exceps
 
+    @typecheck
+    def analyse_all(
+            self,
+            filename: str,
+            tc_ids: optional(list_of(str)) = None
+    ) -> list_of((str, str, list_of(int), str, list_of((str, str)), list_of((type, Exception, is_traceback)))):
+        """
+        Analyse a dump file against several test cases in a single pass
+
+        The capture is decoded once and shared by all the test cases, so the
+        protocol specific pre-processing (eg. the extraction and indexing of
+        the CoAP conversations) is done once too. Test cases whose stimulis
+        are not found in the capture (see TestCase.is_stimulated()) are not
+        run and get an inconclusive verdict.
+
+        :param filename: The name of the file to analyse
+        :param tc_ids: The ids of the test cases to confront the given file,
+                       all the test cases of the test environment if None
+        :type filename: str
+        :type tc_ids: optional([str])
+
+        :return: A list with one tuple per test case, in the format returned
+                 by analyse()
+        :rtype: [(str, str, [int], str,[(str, str)], [(type, Exception, traceback)])]
+
+        :raises FileNotFoundError: If one of the test cases is not found
+        :raises ReaderError: If the capture didn't manage to read and decode
+
+        .. note::
+            Contrary to analyse(), an exception raised while analysing a test
+            case doesn't stop the analysis, it is reported as an error
+            verdict for this test case only.
+        """
+
+        test_case_classes = self.import_test_cases(tc_ids)
+
+        # Disable name resolution for performance improvements
+        with Data.disable_name_resolution():
+            # Get the capture from the file, once for all the test cases
+            capture = Capture(filename)
+
+            return [
+                self.run_test_case(test_case_class, capture)
+                for test_case_class in test_case_classes
+            ]
+
+    @staticmethod
+    @typecheck
+    def run_test_case(
+            test_case_class: is_tc_subclass,
+            capture: Capture,
+            conversation_results: optional(dict) = None
+    ) -> (str, str, list_of(int), str, list_of((str, str)), list_of((type, Exception, is_traceback))):
+        """
+        Run a test case on a capture already decoded, the way analyse_all()
+        does for each of its test cases
+
+        :param test_case_class: The class of the test case to run
+        :param capture: The capture to confront the test case with
+        :param conversation_results: The results by conversation of the
+                                     previous run on the capture (see
+                                     TestCase.run_test_case())
+        :type capture: Capture
+        :type conversation_results: optional(dict)
+
+        :return: A tuple in the format returned by analyse()
+        :rtype: (str, str, [int], str,[(str, str)], [(type, Exception, traceback)])
+        """
+        tc_id = test_case_class.__name__
+        test_case = test_case_class(capture)
+
+        try:
+            try:
+                stimulated = test_case_class.is_stimulated(capture)
+            except NotImplementedError:
+                # No stimulis declared, the test case can't be dispatched any
+                # conversation (analyse() fails on it as well)
+                test_case.set_verdict('error', '%s declares no stimulis' % tc_id)
+                verdict, rev_frames, log, partial_verdicts, exceps = test_case.get_results()
+                exceps.append(sys.exc_info())
+                return tc_id, verdict, rev_frames, log, partial_verdicts, exceps
+
+            if stimulated:
+                verdict, rev_frames, log, partial_verdicts, exceps = test_case.run_test_case(conversation_results)
+            else:
+                test_case.set_verdict(
+                    'inconclusive',
+                    'Capture doesnt contain any frame matching the stimulis of %s' % tc_id
+                )
+                verdict, rev_frames, log, partial_verdicts, exceps = test_case.get_results()
+
+        except Exception as e:
+            logger.error('%s: %s' % (tc_id, e))
+            test_case.set_verdict('error', 'unhandled exception')
+            test_case.log(e)
+            verdict, rev_frames, log, partial_verdicts, exceps = test_case.get_results()
+            exceps.append(sys.exc_info())
+
+        return tc_id, verdict, rev_frames, log, partial_verdicts, exceps
+
+
+class LiveAnalyzer:
+    """
+        Class for the analysis of the frames of a live session, while they
+        are received.
+
+        The frames are added one by one to a LiveCapture. Each of them is
+        decoded once, and the protocol specific pre-processing (eg. the CoAP
+        conversations) is updated incrementally. After a frame is added,
+        update() runs again the test cases to which the frames received since
+        the previous update are related (see TestCase.is_related_frame()),
+        which gives their provisional results. finish() gives the final ones.
+
+        The results of each test case on each of its conversations are kept,
+        so that a test case is only run again on the conversations which
+        received new frames.
+    """
+
+    @typecheck
+    def __init__(
+            self,
+            test_env: str,
+            tc_ids: optional(list_of(str)) = None,
+            name: str = 'live'
+    ):
+        """
+        Initialize the live analysis of a session
+
+        :param test_env: The test environment which is the TAT package name
+        :param tc_ids: The ids of the test cases to run, all the test cases of
+                       the test environment if None
+        :param name: The name of the live capture
+        :type test_env: str
+        :type tc_ids: optional([str])
+        :type name: str
+
+        :raises NotADirectoryError: If the test environemnt isn't found
+        :raises FileNotFoundError: If one of the test cases is not found
+        """
+        self.__test_case_classes = Analyzer(test_env).import_test_cases(tc_ids)
+        self.__capture = LiveCapture(name)
+
+        # The latest result of each test case already run
+        self.__results = OrderedDict()
+
+        # The results of each test case by conversation
+        self.__conversation_results = {}
+
+        # The test cases to run again on the next update
+        self.__outdated = set()
+
+    @property
+    def capture(self):
+        return self.__capture
+
+    @typecheck
+    def add_frame(self, timestamp: float, data: bytes, datalink: int) -> Frame:
+        """
+        Add a frame received from the session
+
+        :param timestamp: The timestamp of the frame
+        :param data: The bytes of the frame
+        :param datalink: The pcap link type of the frame (eg. pure_pcapy.DLT_RAW)
+        :type timestamp: float
+        :type data: bytes
+        :type datalink: int
+
+        :return: The frame added
+        :rtype: Frame
+        """
+        with Data.disable_name_resolution():
+            frame = self.__capture.add_frame(timestamp, data, datalink)
+
+            for test_case_class in self.__test_case_classes:
+                try:
+                    related = test_case_class.is_related_frame(self.__capture, frame)
+                except Exception:
+                    # The error is reported by running the test case
+                    related = True
+
+                if related:
+                    self.__outdated.add(test_case_class)
+
+        return frame
+
+    @typecheck
+    def update(self) -> list_of((str, str, list_of(int), str, list_of((str, str)), list_of((type, Exception, is_traceback)))):
+        """
+        Run again the test cases related to the frames added since the
+        previous update
+
+        :return: The provisional results of the test cases whose verdict,
+                 review frames or partial verdicts changed, in the format
+                 returned by Analyzer.analyse()
+        :rtype: [(str, str, [int], str,[(str, str)], [(type, Exception, traceback)])]
+        """
+        updated = []
+
+        with Data.disable_name_resolution():
+            for test_case_class in self.__test_case_classes:
+                if test_case_class not in self.__outdated:
+                    continue
+
+                result = Analyzer.run_test_case(
+                    test_case_class,
+                    self.__capture,
+                    self.__conversation_results.setdefault(test_case_class, {})
+                )
+                previous = self.__results.get(result[0])
+                self.__results[result[0]] = result
+
+                if previous is None or (previous[1], previous[2], previous[4]) != (result[1], result[2], result[4]):
+                    updated.append(result)
+
+        self.__outdated.clear()
+        return updated
+
+    @typecheck
+    def finish(self) -> list_of((str, str, list_of(int), str, list_of((str, str)), list_of((type, Exception, is_traceback)))):
+        """
+        Get the final results of the test cases on all the frames received
+
+        :return: A list with one tuple per test case, in the format returned
+                 by Analyzer.analyse()
+        :rtype: [(str, str, [int], str,[(str, str)], [(type, Exception, traceback)])]
+        """
+        self.update()
+
+        results = []
+        with Data.disable_name_resolution():
+            for test_case_class in self.__test_case_classes:
+                try:
+                    results.append(self.__results[test_case_class.__name__])
+                except KeyError:
+                    # Never run, no frame was related to it
+                    results.append(Analyzer.run_test_case(test_case_class, self.__capture))
+
+        return results
+
 
 if __name__ == "__main__":
     from os import getcwd, path
@@ -30,7 +30,7 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
-import numbers, threading, time, types
+import asyncio, heapq, itertools, numbers, threading, time, types
 from	ttproto.core.typecheck	import *
 
 from ttproto.core import exceptions
@@ -38,9 +38,11 @@ from ttproto.core import exceptions
 # TODO: split into several modules
 _all__ = [
 	'Clock',
+	'ScheduledEvent',
 	'EventQueueClock',
 	'SystemClock',
 	'SimulatedClock',
+	'AsyncioClock',
 ]
 
 class Clock:
@@ -125,40 +127,90 @@ def _Condition (lock):
 	return cond
 
 
+class ScheduledEvent:
+	"""Handle of an event scheduled in an EventQueueClock
+
+	It is returned by schedule_event_relative() and schedule_event_absolute()
+	and allows cancelling the event.
+	"""
+
+	__slots__ = ("time", "callback", "pending", "_clock")
+
+	def __init__ (self, clock, time, callback):
+		self.time	= time
+		self.callback	= callback
+		self.pending	= True	# neither reported nor cancelled yet
+		self._clock	= clock
+
+	def cancel (self):
+		"""Cancel the event (nothing is done if it was already reported or
+		cancelled)"""
+		self._clock._cancel_event (self)
+
+	def __repr__ (self):
+		return "<ScheduledEvent %s at %s%s>" % (self.callback, self.time, "" if self.pending else " (done)")
+
+
 class EventQueueClock (Clock):
-	"""An event is stored as a tuple (timestamp, time) and are ordered chronologically in the queue"""
+	"""Events are stored into a heap of (timestamp, sequence number, event),
+	so that they are ordered chronologically and events having the same
+	timestamp are reported in the order they were scheduled.
+
+	Cancelled events are only marked as such, they are removed from the heap
+	when reaching its top (or when the heap is compacted because they
+	outnumber the pending events).
+	"""
 
 	def __init__ (self):
 		Clock.__init__ (self)
 
 		self.__queue = []
+		self.__sequence = itertools.count()
+		self.__cancelled = 0
+
+		# callback -> {pending events}  (for unschedule_events())
+		self.__events_by_callback = {}
+
 		self._lock = threading.Lock()
 		self._cond = _Condition(self._lock)
 
 	@typecheck
-	def schedule_event_relative (self, time: numbers.Number, callback: callable):
+	def schedule_event_relative (self, time: numbers.Number, callback: callable) -> ScheduledEvent:
 		with self._lock:
-			self.__new_event (self._time() + time, callback)
+			return self.__new_event (self._time() + time, callback)
 
 	@typecheck
-	def schedule_event_absolute (self, time: numbers.Number, callback: callable):
+	def schedule_event_absolute (self, time: numbers.Number, callback: callable) -> ScheduledEvent:
 		with self._lock:
-			self.__new_event (time, callback)
+			return self.__new_event (time, callback)
 
 	def unschedule_events (self, callback):
 		with self._lock:
-			q = self.__queue
-			i = len (q) - 1
-			while i>=0:
-				if q[i][1] == callback:
-					q.pop(i)
-				i-=1
+			for ev in self.__events_by_callback.pop (callback, ()):
+				ev.pending = False
+				self.__cancelled += 1
+
+			self.__compact()
+			self._cond.notify()
+
+	def _cancel_event (self, ev):
+		with self._lock:
+			if not ev.pending:
+				return
+
+			self.__forget (ev)
+			self.__cancelled += 1
 
+			self.__compact()
 			self._cond.notify()
 
 	def reset (self):
 		with self._lock:
+			for entry in self.__queue:
+				entry[2].pending = False
 			self.__queue[:] = ()
+			self.__events_by_callback.clear()
+			self.__cancelled = 0
 
 			self._cond.notify()
 
@@ -170,26 +222,53 @@ class EventQueueClock (Clock):
 			print ("WARNING: setting an event in the past (%e seconds in the past)" % diff)
 			#TODO: allow a jitter margin, raise an exception if over the threshold
 
-		for i in range (0, len (self.__queue)):
-			if time < self.__queue[i][0]:
-				self.__queue.insert (i, (time, callback))
-				break
-		else:
-			self.__queue.append ((time, callback))
+		ev = ScheduledEvent (self, time, callback)
+		heapq.heappush (self.__queue, (time, next (self.__sequence), ev))
+		self.__events_by_callback.setdefault (callback, set()).add (ev)
 
 		self._cond.notify()
 
+		return ev
+
+	def __forget (self, ev):
+		"""Mark an event as no longer pending"""
+		assert self._lock.locked()
+
+		ev.pending = False
+
+		events = self.__events_by_callback[ev.callback]
+		events.discard (ev)
+		if not events:
+			del self.__events_by_callback[ev.callback]
+
+	def __compact (self):
+		"""Remove the cancelled events from the heap if they are the majority"""
+		assert self._lock.locked()
+
+		if self.__cancelled * 2 > len (self.__queue):
+			self.__queue[:] = [entry for entry in self.__queue if entry[2].pending]
+			heapq.heapify (self.__queue)
+			self.__cancelled = 0
+
 	@typecheck
 	def _get_first_event (self) -> optional (tuple):
 		assert self._lock.locked()
 
-		return self.__queue[0] if len (self.__queue) else None
+		q = self.__queue
+		while q and not q[0][2].pending:
+			# cancelled event
+			heapq.heappop (q)
+			self.__cancelled -= 1
+
+		return (q[0][0], q[0][2].callback) if q else None
 
 	def _shift (self):
 		assert self._lock.locked()
-		assert len (self.__queue)
 
-		self.__queue.pop(0)
+		ev = self._get_first_event()
+		assert ev
+
+		self.__forget (heapq.heappop (self.__queue)[2])
 
 	def time (self):
 		with self._lock:
@@ -237,7 +316,10 @@ class SystemClock (EventQueueClock):
 				if ev:
 					remaining_time = ev[0] - self._time()
 					if remaining_time > 0:
-						self._cond.wait (remaining_time)
+						# events may be scheduled at sys.maxsize
+						# (never), which is beyond what wait()
+						# accepts
+						self._cond.wait (min (remaining_time, threading.TIMEOUT_MAX))
 						continue
 				else:
 					self._cond.wait()
@@ -287,11 +369,13 @@ class SimulatedClock (EventQueueClock):
 
 			self.__current_time = ev[0] if ev else 0
 
+			self._cond.notify()
+
 	def __thread_func (self):
 		from ttproto.core import snapshot
 
 		with self._lock:
-			while True:
+			while not self.__killed:
 				self._cond.wait()
 
 				if self.__killed:
@@ -305,47 +389,122 @@ class SimulatedClock (EventQueueClock):
 				# clock is running
 
 				while True:
+					if not snapshot.SnapshotManager.all_tracked_threads_blocked():
+						# other threads are running
+						# -> wait
+						#
+						# (events are reported one at a time, once
+						# all threads are in waiting state, so that
+						# the order of events is deterministic)
+						break
+
 					ev = self._get_first_event()
 					if not ev:
 						# no events in the queue
-						if snapshot.SnapshotManager.all_tracked_threads_blocked():
-							# TODO: stop the execution
-							print ("Error: deadlock detected")
+						# TODO: stop the execution
+						print ("Error: deadlock detected")
 						break
 
-					if (ev[0] <= self.__current_time):
-						# the event is due
-						# -> remove it from the list and report it
-						self._shift()
-
-						try:
-							self._lock.release()
-							ev[1]()
-						finally:
-							self._lock.acquire()
-
-						if self.__current_time is None:
-							break
-
-					elif snapshot.SnapshotManager.all_tracked_threads_blocked():
+					if ev[0] > self.__current_time:
 						# all threads are in waiting state
-						if ev:
-							if ev[0] > self.__current_time:
-								# -> advance the clock to the time of the next event
-								self.__current_time = ev[0]
-					else:
-						# other threads are running
-						# -> wait
-						break
+						# -> advance the clock to the time of the next event
+						self.__current_time = ev[0]
 
+					# the event is due
+					# -> remove it from the list and report it
+					self._shift()
 
+					try:
+						self._lock.release()
+						ev[1]()
+					finally:
+						self._lock.acquire()
 
+					if self.__current_time is None:
+						break
 
 	def all_threads_blocked (self):
 		with self._lock:
 			self._cond.notify()
 
 
+class AsyncioClock (Clock):
+	"""Clock driven by an asyncio event loop
+
+	Events are scheduled with loop.call_at(), thus they are reported by
+	the loop itself and no additional thread is needed. The time is the
+	one of the loop (loop.time()).
+
+	NOTE: this clock is not thread-safe, it must be used from the thread
+	running the loop
+	"""
+
+	def __init__ (self, loop = None):
+		Clock.__init__ (self)
+
+		self.__loop = loop if loop is not None else asyncio.get_event_loop()
+
+		# pending event -> asyncio.TimerHandle
+		self.__handles = {}
+
+		# callback -> {pending events}  (for unschedule_events())
+		self.__events_by_callback = {}
+
+	def get_loop (self):
+		return self.__loop
+
+	@typecheck
+	def schedule_event_relative (self, time: numbers.Number, callback: callable) -> ScheduledEvent:
+		return self.__new_event (self.__loop.time() + time, callback)
+
+	@typecheck
+	def schedule_event_absolute (self, time: numbers.Number, callback: callable) -> ScheduledEvent:
+		return self.__new_event (time, callback)
+
+	def unschedule_events (self, callback):
+		for ev in self.__events_by_callback.pop (callback, ()):
+			ev.pending = False
+			self.__handles.pop (ev).cancel()
+
+	def _cancel_event (self, ev):
+		if ev.pending:
+			self.__forget (ev).cancel()
+
+	def reset (self):
+		for ev, handle in self.__handles.items():
+			ev.pending = False
+			handle.cancel()
+		self.__handles.clear()
+		self.__events_by_callback.clear()
+
+	def kill (self):
+		self.reset()
+
+	def time (self):
+		return self.__loop.time()
+
+	def __new_event (self, time, callback):
+		ev = ScheduledEvent (self, time, callback)
+		self.__handles[ev] = self.__loop.call_at (time, self.__report, ev)
+		self.__events_by_callback.setdefault (callback, set()).add (ev)
+		return ev
+
+	def __forget (self, ev):
+		"""Mark an event as no longer pending and return its timer handle"""
+		ev.pending = False
+
+		events = self.__events_by_callback[ev.callback]
+		events.discard (ev)
+		if not events:
+			del self.__events_by_callback[ev.callback]
+
+		return self.__handles.pop (ev)
+
+	def __report (self, ev):
+		self.__forget (ev)
+		ev.callback()
+
+
 Clock.set_instance (SystemClock())
 
 
@@ -220,6 +220,10 @@ class Config:
 	"""
 	#TODO: use a metaclass to do some typechecking on the parameters and on the testcase parameters (like in LogEvents)
 
+	# True if this configuration can be used by several testcases at the
+	# same time (see TestSession max_parallel)
+	parallel = False
+
 	@typecheck
 	def __init__ (self, dict_init_value: iterable = ()):
 		"""Initialise the configuration
@@ -338,6 +342,22 @@ class Testcase (snapshot.EventSource):
 		"""Return the type of config required by this testcase"""
 		return self.__config_type
 
+	def start (self, config, log: optional (logger.Logger) = None):
+		"""Start the testcase in a new thread and return this thread
+
+		The events of the testcase are sent to the logger 'log' (by
+		default to the default logger). Once the thread is terminated,
+		the final verdict is available in its 'verdict' attribute.
+		"""
+		assert isinstance (config, self.__config_type)
+
+		th = snapshot.SnapshotManager.Thread (target = self.__thread_func, args = (config,))
+		if log is not None:
+			th.set_logger (log)
+
+		th.start()
+		return th
+
 	def run (self, config):
 		"""Runs the testcase.
 
@@ -347,11 +367,7 @@ class Testcase (snapshot.EventSource):
 		It also generate log events EventTestcaseStarted and
 		EventTestcaseTerminated.
 		"""
-		assert isinstance (config, self.__config_type)
-
-		th = snapshot.SnapshotManager.Thread (target = self.__thread_func, args = (config,))
-
-		th.start()
+		th = self.start (config)
 
 		#FIXME: what happens if we are not the main thread (we'll not catch the SIGINT signals)
 		self.terminated()
@@ -414,16 +430,21 @@ class TestSession (logger.LoggedObject):
 	configurations for these testcases.
 	"""
 	@typecheck
-	def __init__ (self, testcase_list: optional (list_of (Testcase)) = None, description: str = ""):
+	def __init__ (self, testcase_list: optional (list_of (Testcase)) = None, description: str = "", max_parallel: int = 1):
 		"""Initialise the test session
 
 		Parameters:
 		- testcase_list (opt)	list of testcases to be run (by default, all testcases are run)
 		- description (opt)	description of the test session
-
+		- max_parallel (opt)	maximum number of testcases run at the same time
+					(only the testcases whose configuration is
+					parallel are run concurrently)
 
 		"""
+		assert max_parallel >= 1
+
 		logger.LoggedObject.__init__(self)
+		self.__max_parallel = max_parallel
 		if testcase_list is None:
 			self.__tc_list = list (all_testcases)
 			self.__description = "all testcases"
@@ -463,7 +484,7 @@ class TestSession (logger.LoggedObject):
 
 		#FIXME: join() w/o any timeout will not catch ^C interrupts (maybe a bug in python)
 		#FIXME: what happens if we are not the main thread (we'll not catch the SIGINT signals)
-		th.join(1231322222246514)
+		th.join(threading.TIMEOUT_MAX)
 
 	@staticmethod
 	def interrupt (thread):
@@ -503,14 +524,60 @@ class TestSession (logger.LoggedObject):
 
 		return verdict
 
+	def __execute_parallel (self, summary):
+		"""Execute the testcases of this session concurrently
+
+		Up to 'max_parallel' testcases having a parallel configuration are
+		run at the same time, the other testcases are run alone.
+
+		The events of each testcase are buffered, and they are logged when
+		the testcase is terminated. The testcases are logged and reported in
+		the summary in the order of the session (as if they were run
+		sequentially).
+		"""
+		running = collections.deque()
+
+		def collect():
+			tc, th, buf = running.popleft()
+			th.join()
+			buf.replay()
+			summary.update (tc, th.verdict.get_value())
+
+		try:
+			for tc in self.__tc_list:
+				cfg = self.__configs.get (tc.get_config_type())
+
+				if cfg is None or not cfg.parallel:
+					while running:
+						collect()
+					self.execute (tc, summary)
+					continue
+
+				if len (running) == self.__max_parallel:
+					collect()
+					if threading.current_thread().__interrupted:
+						raise exceptions.UserInterrupt()
+
+				buf = logger.BufferLogger()
+				running.append ((tc, tc.start (cfg, buf), buf))
+		finally:
+			while running:
+				collect()
+
+		if threading.current_thread().__interrupted:
+			raise exceptions.UserInterrupt()
+
 	def __thread_func (self):
 
 		summary = VerdictSummary()
 
 		self.log (EventTestSessionStarted)
 		try:
-			for tc in self.__tc_list:
-				self.execute (tc, summary)
+			if self.__max_parallel > 1:
+				self.__execute_parallel (summary)
+			else:
+				for tc in self.__tc_list:
+					self.execute (tc, summary)
 
 		except exceptions.UserInterrupt:
 			self.log (EventTestSessionAborted)
@@ -588,7 +655,7 @@ def testcase (arg: either (types.FunctionType, type)):
 		all_testcases.append (tc)
 		return tc
 @typecheck
-def run_all_testcases (configs: dict_of(type, Config) = {}):
+def run_all_testcases (configs: dict_of(type, Config) = {}, max_parallel: int = 1):
 	"""Run all the known testcases
 
 	This function instantiates a TestSession with all the known testcases,
@@ -596,8 +663,11 @@ def run_all_testcases (configs: dict_of(type, Config) = {}):
 
 	The 'configs' parameter may contain a dict of the configuration objects
 	to be used for each type of configuration used in the testcases.
+
+	The 'max_parallel' parameter is the maximum number of testcases run
+	at the same time (see TestSession).
 	"""
-	ts = TestSession()
+	ts = TestSession (max_parallel = max_parallel)
 	for k,v in configs.items():
 		ts.set_config (k, v)
 	ts.run()
@@ -314,7 +314,7 @@ There are two ways to build a message:
 """
 
 from contextlib import contextmanager
-import re, sys
+import re, sys, threading
 
 from ttproto.core.typecheck import typecheck, optional, iterable, this_class, either, with_attr
 from ttproto.core import named, exceptions
@@ -761,7 +761,10 @@ class BinarySlice:
         significant bits of the last byte will be padded with undefined
         values.
         """
-        # TODO: optimise this
+        if not (self.__left % 8 or self.__right % 8):
+            # byte-aligned
+            return self.__str[self.__left // 8:self.__right // 8]
+
         return bytes([self.get_byte(i) for i in range(0, self.__right - self.__left, 8)])
 
     @typecheck
@@ -804,7 +807,9 @@ class Data(named.NamedObject):
     see help(core.data) for more details
     """
 
-    __default_name = None
+    # default name of the objects created in the current thread (None to
+    # resolve it, see disable_name_resolution())
+    __thread_local = threading.local()
 
     @typecheck
     def __init__(self, parent: optional(is_data) = None):
@@ -814,7 +819,7 @@ class Data(named.NamedObject):
         compatible with self.get_type() (see store_data())
         """
 
-        named.NamedObject.__init__(self, Data.__default_name)
+        named.NamedObject.__init__(self, getattr(Data.__thread_local, "default_name", None))
         self.__frozen = False
         self.__parent = None
 
@@ -838,8 +843,8 @@ class Data(named.NamedObject):
         encoding/decoding messages).
 
         This function returns a context that disables the name
-        resolution. It is automatically during the execution of a
-        testcase.
+        resolution in the current thread. It is automatically during the
+        execution of a testcase.
 
             >>> IntValue(12).__name__
             '(anon)'
@@ -858,12 +863,12 @@ class Data(named.NamedObject):
             ...
             (anon)
         """
-        previous_value = Data.__default_name
-        Data.__default_name = "(anon)"
+        previous_value = getattr(Data.__thread_local, "default_name", None)
+        Data.__thread_local.default_name = "(anon)"
         try:
             yield
         finally:
-            Data.__default_name = previous_value
+            Data.__thread_local.default_name = previous_value
 
     @typecheck
     def set_parent(self, parent: is_data):
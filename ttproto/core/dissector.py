@@ -44,7 +44,7 @@ from ttproto.core.packet import Value, PacketValue
 from ttproto.core.typecheck import typecheck, list_of, optional, anything, either
 from ttproto.core.lib.all import *
 from ttproto.core.lib.inet.meta import InetPacketValue
-from ttproto.core.lib.readers.pcap import PcapReader
+from ttproto.core.lib.readers.pcap import PcapReader, get_link_type_decoder, decode_frame
 
 log = logging.getLogger('[dissection]')
 log.propagate = True  # so AMQP handler (if attached by ancestor) emits logs into the bus
@@ -58,6 +58,7 @@ __all__ = [
     'Frame',
     'Dissector',
     'Capture',
+    'LiveCapture',
 ]
 
 
@@ -139,15 +140,21 @@ class Frame:
     def __init__(
             self,
             id: int,
-            pcap_frame: (float, Message, optional(Exception))
+            pcap_frame: (float, Message, optional(Exception)),
+            fragments: optional(list_of(int)) = None
     ):
         """
         The init function of the Frame object
 
         :param id: The id of the current frame
         :param pcap_frame: The frame tuple got from reading the PcapReader
+        :param fragments: The ids of the fragments of a reassembled frame
         :type id: int
         :type pcap_frame: (float, Message, Exception)
+        :type fragments: [int]
+
+        .. note:: A reassembled frame has its own id, following the ids of
+                  the frames read from the capture
         """
 
         # Put the different variables of it
@@ -159,6 +166,7 @@ class Frame:
         # msg: Its message read directly from bytes (can be decoded)
         # exc: Exception if one occured
         self.__timestamp, self.__msg, self.__error = pcap_frame
+        self.__fragments = fragments
 
         # Put its dictionnary representation and its summary as not done yet
         self.__dict = None
@@ -213,7 +221,7 @@ class Frame:
         :return: A string representing this frame object
         :rtype: str
         """
-        return "<Frame %3d: %s>" % (self.__id, self.__msg.summary())
+        return "<Frame %3d: %s>" % self.summary()
 
     @property
     def timestamp(self):
@@ -227,6 +235,10 @@ class Frame:
     def error(self):
         return self.__error
 
+    @property
+    def fragments(self):
+        return self.__fragments
+
     # @typecheck
     def __value_to_list(
             self,
@@ -614,6 +626,7 @@ class Capture:
         - filename  => Name of the file from which the Capture was generated
         - frames  => The frame list generated
         - malformed  => The malformed frames that we didn't manage to decode
+        - contexts  => The 6LoWPAN-HC contexts learned from the capture
 
     .. note::
         The Capture object has a dictionnary of Readers in function of their
@@ -637,6 +650,8 @@ class Capture:
         self._filename = filename
         self._frames = None
         self._malformed = None
+        self._reassembler = None
+        self._contexts = None
 
         # dissect pcap capture
         self.__process_file()
@@ -657,6 +672,10 @@ class Capture:
             self.__process_file()
         return self._malformed
 
+    @property
+    def contexts(self):
+        return self._contexts
+
     def __process_file(self):
         """
         The Capture function to decode the file into a list of frames
@@ -689,22 +708,98 @@ class Capture:
         # Initialize the list attributes
         self._frames = []
         self._malformed = []
+        self._reassembler = SixLowpanReassembler()
+        self._contexts = SixLowpanContextTable()
+
+        # Iterate over those tuples to generate the frames (the frames are
+        # decoded while iterating, with the 6LoWPAN contexts of the capture)
+        with SixLowpanIPHC.context_table(self._contexts):
+            for count, ternary_tuple in enumerate(iterable_reader, 1):
+
+                # The format of ternary tuple is the following:
+                #   - Timestamp represented as a float
+                #   - The Message object associated to the frame
+                #   - An Exception if one occured, None if everything went fine
+
+                # If not malformed (ie no exception)
+                if not ternary_tuple[2]:
+                    frame = Frame(count, ternary_tuple)
+                    self._frames.append(frame)
+                    self._process_frame(frame)
+
+                # If malformed
+                else:
+                    self._frames.append(Frame(count, ternary_tuple))
+
+        self.__number_reassembled_frames()
 
-        # Iterate over those tuples to generate the frames
-        for count, ternary_tuple in enumerate(iterable_reader, 1):
+    def __number_reassembled_frames(self):
+        """
+        Give the reassembled frames their ids, after the id of the last frame
+        of the file (their number is not known while the file is read)
+        """
+        next_id = len(self._frames) - sum(1 for f in self._frames if f.fragments is not None) + 1
+        numbered = {}
+        for i, frame in enumerate(self._frames):
+            if frame.fragments is not None:
+                self._frames[i] = Frame(next_id, (frame.timestamp, frame.message, frame.error), frame.fragments)
+                numbered[id(frame)] = self._frames[i]
+                next_id += 1
+
+        if numbered:
+            self._malformed = [numbered.get(id(f), f) for f in self._malformed]
+
+    def _get_reassembled_frame_id(self):
+        """
+        Get the id of the next reassembled frame
 
-            # The format of ternary tuple is the following:
-            #   - Timestamp represented as a float
-            #   - The Message object associated to the frame
-            #   - An Exception if one occured, None if everything went fine
+        :return: The id of the frame (0 while the file is read, the frames are
+                 numbered once it is read)
+        :rtype: int
+        """
+        return 0
 
-            # If not malformed (ie no exception)
-            if not ternary_tuple[2]:
-                self._frames.append(Frame(count, ternary_tuple))
+    def _process_frame(self, frame):
+        """
+        Update the decoding state of the capture with a frame just added: the
+        6LoWPAN contexts it advertises and the fragmented datagrams
 
-            # If malformed
-            else:
-                self._frames.append(Frame(count, ternary_tuple))
+        .. note:: Must be called within the context table of the capture
+
+        :param frame: The frame just added to the capture
+        :type frame: Frame
+        """
+        self._contexts.learn(frame['value'])
+
+        reassembled = self._reassemble(frame)
+        if reassembled is not None and not reassembled.error:
+            self._contexts.learn(reassembled['value'])
+
+    def _reassemble(self, frame):
+        """
+        Pass a frame to the 6LoWPAN reassembly stage, and append the
+        reassembled frame if it was the last fragment of a datagram
+
+        :param frame: The frame just added to the capture
+        :type frame: Frame
+
+        :return: The reassembled frame, None if the datagram is not complete
+        :rtype: Frame
+        """
+        if Ieee802154 not in frame:
+            return None
+
+        result = self._reassembler.add(frame[Ieee802154], frame.timestamp, frame['id'])
+        if result is None:
+            return None
+
+        data, fragments = result
+        message, error = decode_frame(data, Ieee802154)
+        reassembled = Frame(self._get_reassembled_frame_id(), (frame.timestamp, message, error), fragments)
+        self._frames.append(reassembled)
+        if error:
+            self._malformed.append(reassembled)
+        return reassembled
 
     @typecheck
     def get_dissection(
@@ -868,6 +963,83 @@ class Capture:
         return [frame.summary() for frame in fs]
 
 
+class LiveCapture(Capture):
+    """
+    Class representing a Capture which frames are added one by one while they
+    are received (eg. from the data plane of a live session), instead of being
+    read from a file.
+
+    The frames already added are never changed, so the analysis state derived
+    from them (eg. the CoAP conversations) can be updated incrementally.
+    """
+
+    @typecheck
+    def __init__(self, name: str = 'live'):
+        """
+        Initialize an empty live capture
+
+        :param name: The name of the capture, used as its filename
+        :type name: str
+        """
+        self._filename = name
+        self._frames = []
+        self._malformed = []
+        self._reassembler = SixLowpanReassembler()
+        self._contexts = SixLowpanContextTable()
+        self.__count = 0
+
+        # The decoding types of the link types, got once per link type
+        self.__decoders = {}
+
+    @property
+    def frames(self):
+        return self._frames
+
+    @property
+    def malformed(self):
+        return self._malformed
+
+    def _get_reassembled_frame_id(self):
+        # the reassembled frames are numbered along with the frames received
+        self.__count += 1
+        return self.__count
+
+    @typecheck
+    def add_frame(self, timestamp: float, data: bytes, datalink: int) -> Frame:
+        """
+        Decode and add a frame to the capture (followed by the reassembled
+        frame if it completes a fragmented 6LoWPAN datagram)
+
+        :param timestamp: The timestamp of the frame
+        :param data: The bytes of the frame
+        :param datalink: The pcap link type of the frame (eg. pure_pcapy.DLT_RAW)
+        :type timestamp: float
+        :type data: bytes
+        :type datalink: int
+
+        :return: The frame added
+        :rtype: Frame
+        """
+        try:
+            decode_type = self.__decoders[datalink]
+        except KeyError:
+            decode_type = get_link_type_decoder(datalink)
+            self.__decoders[datalink] = decode_type
+
+        with SixLowpanIPHC.context_table(self._contexts):
+            message, error = decode_frame(data, decode_type)
+
+            self.__count += 1
+            frame = Frame(self.__count, (timestamp, message, error))
+            self._frames.append(frame)
+            if error:
+                self._malformed.append(frame)
+            else:
+                self._process_frame(frame)
+
+        return frame
+
+
 if __name__ == "__main__":
     import json
     import logging
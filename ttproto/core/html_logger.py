@@ -46,6 +46,16 @@ __all__ = [
 # TODO: should be configurable
 ROOT_DIR = "reports"
 
+# limits of the rendering of the values in the message dumps
+MAX_VALUE_DEPTH = 16
+MAX_LIST_ITEMS = 64
+MAX_HEXDUMP_SIZE = 4096
+
+# messages whose dump is larger are written in a separate page (loaded only
+# when following the link)
+INLINE_DUMP_ROWS = 64
+INLINE_DUMP_SIZE = 1024
+
 
 def _gen_dir(root_dir):
     assert os.path.exists(root_dir)
@@ -326,22 +336,23 @@ class HTMLLogger(logger.Logger):
                             nb, "sent" if type(e) == port.EventMessageSent else "received",
                             e.port.__name__,
                             time.ctime(e.get_timestamp()), e.get_timestamp()))
-                        with g.p:
-                            m = e.message
-                            g.pre(str(m.get_description()) + "\n\n")
-
-                            self.display_value(g, m.get_value())
-
-                            with g.pre:
-                                g("\n\n")
-                                b = m.get_binary()
-                                for offset in range(0, len(b), 16):
-                                    values = ["%02x" % v for v in b[offset:offset + 16]]
-                                    if len(values) > 8:
-                                        values.insert(8, " ")
 
-                                    g("%04x   %s" % (offset, " ".join(values)))
+                        m = e.message
+                        rows, cols = self.calc_output_size(m.get_value(), True)
+                        size = len(m.get_binary())
+                        if rows <= INLINE_DUMP_ROWS and size <= INLINE_DUMP_SIZE:
+                            self.__dump_message(g, m, (rows, cols))
+                        else:
+                            # heavy dump -> separate page
+                            fragment = "tc-%03d-message-%04d.html" % (self.__tc_count, nb)
+                            with g.p:
+                                g.pre(str(m.get_description()))
+                                g.a(href=fragment)("Full dump (%d rows, %d bytes)" % (rows, size))
 
+                            with xmlgen.XHTML10Generator(output=os.path.join(self.__dir, fragment),
+                                                         indented=True) as fg:
+                                fg.head.title("Message #%d - %s" % (nb, title))
+                                self.__dump_message(fg, m, (rows, cols))
 
                 except self.__Exit:
                     pass
@@ -350,6 +361,24 @@ class HTMLLogger(logger.Logger):
         while True:
             yield
 
+    def __dump_message(self, g, m, output_size=None):
+        with g.p:
+            g.pre(str(m.get_description()) + "\n\n")
+
+            self.display_value(g, m.get_value(), output_size=output_size)
+
+            with g.pre:
+                g("\n\n")
+                b = m.get_binary()
+                for offset in range(0, min(len(b), MAX_HEXDUMP_SIZE), 16):
+                    values = ["%02x" % v for v in b[offset:offset + 16]]
+                    if len(values) > 8:
+                        values.insert(8, " ")
+
+                    g("%04x   %s" % (offset, " ".join(values)))
+                if len(b) > MAX_HEXDUMP_SIZE:
+                    g("...    (%d bytes not displayed)" % (len(b) - MAX_HEXDUMP_SIZE))
+
     class __ExtraColumnMatchResult:
         def __init__(self, value, pattern, mismatches: tuple_of(data.Mismatch)):
             self.__iter_diff = iter(mismatches)
@@ -502,13 +531,22 @@ class HTMLLogger(logger.Logger):
             yield
 
     @typecheck
-    def calc_output_size(self, value: data.Value):
-        if isinstance(value, PacketValue):
+    def calc_output_size(self, value: data.Value, truncate: bool = False, depth: int = 0):
+        """Compute the number of rows and columns of the table displaying a value
+
+        If 'truncate' is true, then the values nested deeper than
+        MAX_VALUE_DEPTH and the items of a list beyond MAX_LIST_ITEMS are
+        not displayed.
+        """
+        if truncate and depth >= MAX_VALUE_DEPTH and isinstance(value, (PacketValue, ListValue)):
+            result = (1, 1)
+
+        elif isinstance(value, PacketValue):
             c_lines = 0
             c_cols = 1
             pid = value.get_variant().get_payload_id()
             for i in range(0, len(value)):
-                l, c = self.calc_output_size(value[i])
+                l, c = self.calc_output_size(value[i], truncate, depth + 1)
                 if i == pid:
                     c -= 1
                 c_lines += l
@@ -519,8 +557,13 @@ class HTMLLogger(logger.Logger):
         elif isinstance(value, ListValue):
             c_lines = 0
             c_cols = 1
-            for i in range(0, len(value)):
-                l, c = self.calc_output_size(value[i])
+            nb = len(value)
+            if truncate and nb > MAX_LIST_ITEMS:
+                # one line for the items not displayed
+                nb = MAX_LIST_ITEMS
+                c_lines = 1
+            for i in range(0, nb):
+                l, c = self.calc_output_size(value[i], truncate, depth + 1)
                 c_lines += l
                 if c > c_cols:
                     c_cols = c
@@ -533,15 +576,27 @@ class HTMLLogger(logger.Logger):
         return result
 
     @typecheck
-    def display_value(self, g: xmlgen.XMLGenerator, value: data.Value, col_add: optional(callable) = None):
-        l, c = self.calc_output_size(value)
+    def display_value(self, g: xmlgen.XMLGenerator, value: data.Value, col_add: optional(callable) = None,
+                      output_size: optional((int, int)) = None):
+        """Display a value as a table
+
+        'output_size' is the size of the value returned by
+        calc_output_size(), if the caller already computed it (with the
+        same truncation), so that the value is not walked again.
+        """
+        # the size of the value is limited, except when reporting the
+        # mismatches (the extra column has to match every value)
+        truncate = col_add is None
+
+        if output_size is None:
+            self.calc_output_size(value, truncate)
         with g.table(border=1, cellspacing=0, cellpadding=2, width=("800px" if col_add else "640px")):
-            self.__display_value_internal(g, value, col_add)
+            self.__display_value_internal(g, value, col_add, truncate=truncate)
 
 
 
     def __display_value_internal(self, g: xmlgen.XMLGenerator, value: data.Value, col_add: optional(callable),
-                                 prefix=None, data_span=1, description=None):
+                                 prefix=None, data_span=1, description=None, truncate=False, depth=0):
 
         l, c = value.__output_size
         col_style = "border-left-width: medium; border-top-width: medium; border-right: none"
@@ -552,55 +607,70 @@ class HTMLLogger(logger.Logger):
         else:
             rowspan = {}
 
-        if isinstance(value, PacketValue):
+        if truncate and depth >= MAX_VALUE_DEPTH and isinstance(value, (PacketValue, ListValue)):
+            name = value.get_variant().__name__ if isinstance(value, PacketValue) else value.get_type().__name__
+            self.__display_text(g, "%s (not displayed)" % name, col_add, value, prefix, data_span)
+
+        elif isinstance(value, PacketValue):
             with g.tr:
                 if prefix:
                     g.td(style=prefix_style, **rowspan)(prefix)
-                g.td(style=col_style, **rowspan)(" ")
+                g.td(style=col_style, **rowspan)("\u00a0")
                 g.th(colspan=c - 1, align="left", style=headline_style)(value.get_variant().__name__)
                 if col_add:
                     col_add(g, value)
             i = 0
             for f in value.get_variant().fields():
                 self.__display_value_internal(g, value[i], col_add, f.name if f.name != "Payload" else None, c - 2,
-                                              value.get_description(i))
+                                              value.get_description(i), truncate, depth + 1)
                 i += 1
 
         elif isinstance(value, ListValue):
             with g.tr:
                 if prefix:
                     g.td(style=prefix_style, **rowspan)(prefix)
-                g.td(rowspan=l, style=col_style)(" ")
+                g.td(rowspan=l, style=col_style)("\u00a0")
                 g.th(colspan=c - 1, align="left", style=headline_style)(value.get_type().__name__)
 
                 if col_add:
                     col_add(g, value)
 
-            for i in range(0, len(value)):
-                self.__display_value_internal(g, value[i], col_add, None, c - 1)
+            nb = len(value)
+            if truncate and nb > MAX_LIST_ITEMS:
+                nb = MAX_LIST_ITEMS
+            for i in range(0, nb):
+                self.__display_value_internal(g, value[i], col_add, None, c - 1, None, truncate, depth + 1)
+            if nb != len(value):
+                with g.tr:
+                    g.td(colspan=c - 1)("... (%d items not displayed)" % (len(value) - nb))
 
 
         else:
-            with g.tr:
-                if prefix:
-                    if data_span != 1:
-                        g.td(colspan=data_span, style=prefix_style)(prefix)
-                        data_span = 1
-                    else:
-                        g.td(style=prefix_style)(prefix)
-                else:
-                    data_span += 1
+            txt = str(value)
+
+            if description is not None:
+                txt = "%s (%s)" % (txt, description)
 
-                txt = str(value)
+            self.__display_text(g, txt, col_add, value, prefix, data_span)
 
-                if description is not None:
-                    txt = "%s (%s)" % (txt, description)
+    def __display_text(self, g, txt, col_add, value, prefix, data_span):
+        prefix_style = "padding-left: 10pt; border-left: none"
 
+        with g.tr:
+            if prefix:
                 if data_span != 1:
-                    g.td(colspan=data_span)(txt)
+                    g.td(colspan=data_span, style=prefix_style)(prefix)
+                    data_span = 1
                 else:
-                    g.td(txt)
+                    g.td(style=prefix_style)(prefix)
+            else:
+                data_span += 1
 
-                if col_add:
-                    col_add(g, value)
+            if data_span != 1:
+                g.td(colspan=data_span)(txt)
+            else:
+                g.td(txt)
+
+            if col_add:
+                col_add(g, value)
 
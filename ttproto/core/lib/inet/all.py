@@ -34,13 +34,16 @@
 from ttproto.core.lib.inet.basics import *
 from ttproto.core.lib.inet.zigbee import *
 from ttproto.core.lib.inet.coap import *
+from ttproto.core.lib.inet.coap_blockwise import *
 from ttproto.core.lib.inet.coap_link_format import *
 from ttproto.core.lib.inet.icmpv6 import *
 from ttproto.core.lib.inet.ip import *
 from ttproto.core.lib.inet.ipv4 import *
 from ttproto.core.lib.inet.ipv6 import *
 from ttproto.core.lib.inet.meta import *
+from ttproto.core.lib.inet.reassembly import *
 from ttproto.core.lib.inet.sixlowpan import *
+from ttproto.core.lib.inet.sixlowpan_frag import *
 from ttproto.core.lib.inet.sixlowpan_hc import *
 from ttproto.core.lib.inet.sixlowpan_nd import *
 from ttproto.core.lib.inet.sixlowpan_port import *
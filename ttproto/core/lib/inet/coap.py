@@ -278,6 +278,9 @@ class CoAPOption (
         return cls (*values), remaining_slice
 
 
+# size of the extended delta/length field for each 4-bit delta/length value
+_ext_size = (0,) * 13 + (1, 2, 0)
+
 class CoAPOptionList (
     metaclass = InetOrderedListClass,
     content_type = CoAPOption):
@@ -285,21 +288,63 @@ class CoAPOptionList (
     @classmethod
     def _decode_message (cls, bin_slice, count = None):
 
+        # the options are parsed directly from the raw buffer and their
+        # values are decoded according to _get_option_decoder()
+        #
+        # (this is equivalent to calling CoAPOption._decode_message() for
+        # each option, but avoids slicing the BinarySlice at each step)
+        buff = bin_slice.raw()
+        end  = len (bin_slice)
+        pos  = 0
+
         values = []
         current = 0
 
         try:
-            while bin_slice and bin_slice[0] != 0xff:
-                opt, bin_slice = CoAPOption._decode_message (bin_slice, current)
-
-                current += opt["Delta"]
+            while pos < end and buff[pos] != 0xff:
+
+                # decode the delta & length
+                d = buff[pos] >> 4
+                l = buff[pos] &  0xf
+                pos += 1
+
+                if pos + _ext_size[d] + _ext_size[l] > end:
+                    raise Exception ("CoAP Option truncated: option header is incomplete")
+
+                if d == 13:
+                    d = 13 + buff[pos]
+                    pos += 1
+                elif d == 14:
+                    d = 269 + (buff[pos] << 8 | buff[pos+1])
+                    pos += 2
+
+                if l == 13:
+                    l = 13 + buff[pos]
+                    pos += 1
+                elif l == 14:
+                    l = 269 + (buff[pos] << 8 | buff[pos+1])
+                    pos += 2
+
+                if pos + l > end:
+                    raise Exception ("CoAP Option truncated: %d bytes expected, %d bytes left in the buffer" % (l, end - pos))
+
+                current += d
+                opt_cls, decode = _get_option_decoder (current)
+
+                try:
+                    opt = opt_cls (d, l, *decode (buff[pos:pos+l]))
+                except Exception as e:
+                    exceptions.push_location (e, opt_cls, "Value")
+                    raise
+
+                pos += l
                 values.append (opt)
 
         except Exception as e:
             exceptions.push_location (e, cls, str(len(values)))
             raise
 
-        return cls (values), bin_slice
+        return cls (values), bin_slice[pos:]
 
     def _build_message (self):
 
@@ -711,6 +756,50 @@ def _max_age_description (v):
 
     return ", ".join (reversed (result))
 
+def _decode_opaque_option (value):
+    return value,
+
+def _decode_empty_option (value):
+    if value:
+        raise Exception ("CoAP Option not fully decoded: %d bytes left in the buffer" % len(value))
+    return ()
+
+def _decode_uint_option (value):
+    return int.from_bytes (value, "big"),
+
+def _decode_string_option (value):
+    return str (value, "utf-8"),
+
+def _decode_block_option (value):
+    v = int.from_bytes (value, "big")
+    return v >> 4, (v & 8) >> 3, v & 7
+
+# option number -> (option class, value decoder)
+#
+# filled for all the options defined in this module, other option numbers
+# are resolved with CoAPOption.get_variant_type() on first use
+_option_decoders = {}
+
+def _get_option_decoder (number):
+    try:
+        return _option_decoders[number]
+    except KeyError:
+        pass
+
+    opt_cls = CoAPOption.get_variant_type (number)
+    for base, decode in (
+            (CoAPOptionBlock,	_decode_block_option),
+            (CoAPOptionUInt,	_decode_uint_option),
+            (CoAPOptionString,	_decode_string_option),
+            (CoAPOptionEmpty,	_decode_empty_option),
+            (CoAPOption,	_decode_opaque_option),
+        ):
+        if issubclass (opt_cls, base):
+            break
+
+    _option_decoders[number] = opt_cls, decode
+    return opt_cls, decode
+
 @classmethod
 def _coap_option_decode_message (cls, bin_slice):
 
@@ -776,6 +865,7 @@ class CoAPOption%s (
     _min_max_length = %r
     _decode_message = _coap_option_decode_message
 """ % (n, t, i, l))
+    _get_option_decoder (i)
 
 
 ##Aliases
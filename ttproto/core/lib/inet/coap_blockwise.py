@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+#
+#   (c) 2012  Universite de Rennes 1
+#
+# Contact address: <t3devkit@irisa.fr>
+#
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+#
+
+#
+# Reassembly of the CoAP blockwise transfers based on:
+#	- draft-ietf-core-block-14
+#
+
+from	collections			import OrderedDict
+
+from	ttproto.core.lib.inet.coap	import *
+from	ttproto.core.lib.inet.reassembly	import ReassemblyBuffer
+
+__all__ = [
+    'CoAPBlockwiseTransfer',
+    'CoAPBlockReassembler',
+]
+
+# maximal size of a reassembled representation
+MAX_BLOCKWISE_SIZE = 1 << 22
+
+# maximal number of requests remembered for resolving the uri of the
+# responses (by token)
+MAX_PENDING_REQUESTS = 1024
+
+
+class CoAPBlockwiseTransfer:
+    """The transfer of a representation in several blocks
+
+    A transfer is identified by its key: (client, server, option type, uri)
+    where the option type is CoAPOptionBlock1 (representation sent in the
+    requests) or CoAPOptionBlock2 (representation sent in the responses).
+    """
+
+    def __init__ (self, key, size_hint = None, max_size = MAX_BLOCKWISE_SIZE):
+        self.key         = key
+        self.frames      = []
+        self.blocks      = []    # (num, m, szx, payload length) in the order received
+        self.first_ts    = None
+        self.last_ts     = None
+        self.error       = None
+
+        self.__buffer    = ReassemblyBuffer (max_size = max_size)
+        self.__first_mid = None
+
+        if size_hint:
+            self.__buffer.reserve (size_hint)
+
+    @property
+    def client (self):
+        return self.key[0]
+
+    @property
+    def server (self):
+        return self.key[1]
+
+    @property
+    def option_type (self):
+        return self.key[2]
+
+    @property
+    def uri (self):
+        return self.key[3]
+
+    @property
+    def size (self):
+        """Size of the representation (None if the last block was not received)"""
+        return self.__buffer.size
+
+    @property
+    def duration (self):
+        """Time elapsed between the first and the last block received"""
+        return None if self.first_ts is None else self.last_ts - self.first_ts
+
+    def is_restarted_by (self, coap, block):
+        """Return True if the message restarts the transfer (a first block
+        which is not a retransmission of the one already received)"""
+        return block["num"] == 0 and self.__first_mid not in (None, coap["mid"])
+
+    def add_block (self, coap, block, ts = None, frame = None):
+        """Store the payload of a CoAP message carrying a block of the representation"""
+
+        payload = coap["pl"]
+        offset  = block["num"] * 2**(block["szx"]+4)
+
+        try:
+            self.__buffer.add (offset, payload)
+            if not block["m"]:
+                self.__buffer.set_size (offset + len (payload))
+        except ValueError as e:
+            self.error = "block %d: %s" % (block["num"], e)
+
+        if self.first_ts is None:
+            self.first_ts = ts
+        self.last_ts    = ts
+        if block["num"] == 0:
+            self.__first_mid = coap["mid"]
+        self.blocks.append ((block["num"], block["m"], block["szx"], len (payload)))
+        if frame is not None:
+            self.frames.append (frame)
+
+    def is_complete (self):
+        """Return True if all the blocks of the representation were received"""
+        return self.error is None and self.__buffer.is_complete()
+
+    def missing (self):
+        """Return the missing ranges (start, end) of the representation
+
+        The ranges following the last block received are reported only
+        once the last block is known.
+        """
+        return self.__buffer.missing()
+
+    def check_blocks (self, szx = None):
+        """Check the sequence of the blocks received
+
+        The blocks (retransmissions apart) must follow each other in the
+        representation (they may overlap when the block size is
+        renegotiated), all the blocks but the last one must be full and have
+        the M flag set and no block may follow the last one. If szx is
+        given, the blocks following the first one must use this block size.
+
+        Returns the list of the errors found (empty if the sequence is valid)
+        """
+        errors   = []
+        received = set()
+        end      = 0
+        last     = None
+        for num, m, b_szx, length in self.blocks:
+            if (num, b_szx) in received:
+                continue
+            first = not received
+            received.add ((num, b_szx))
+
+            b_size = 2**(b_szx+4)
+            offset = num * b_size
+
+            if last is not None:
+                errors.append ("block %d received after the last block (%d)" % (num, last))
+            if not first and szx is not None and b_szx != szx:
+                errors.append ("block %d: szx %d instead of %d" % (num, b_szx, szx))
+            if offset > end:
+                errors.append ("block %d: bytes [%d:%d] skipped" % (num, end, offset))
+            if m:
+                if length != b_size:
+                    errors.append ("block %d: %d bytes instead of %d" % (num, length, b_size))
+            else:
+                if not 0 < length <= b_size:
+                    errors.append ("last block %d: %d bytes (expected 1 to %d)" % (num, length, b_size))
+                last = num
+            end = max (end, offset + length)
+
+        return errors
+
+    def get_body (self):
+        """Return the reassembled representation (None if not complete)"""
+        return self.__buffer.get_data() if self.error is None else None
+
+    def __repr__ (self):
+        if self.error is not None:
+            state = self.error
+        elif self.is_complete():
+            state = "complete (%d bytes)" % self.size
+        else:
+            state = "missing %s%s" % (self.missing(), "" if self.size is not None else " and the last block")
+
+        return "<%s %s %s %s>" % (type (self).__name__, self.option_type.__name__, self.uri, state)
+
+
+class CoAPBlockReassembler:
+    """Reassembly of the representations transferred with the Block1 and
+    Block2 options
+
+    The CoAP messages are added in the order of the capture with add(). The
+    requests carrying a Block1 option and the responses carrying a Block2
+    option are stored into the transfer of their (client, server, option,
+    uri), the uri of a response is the uri of the last request with the same
+    token. A block 0 which is not a retransmission of the first block of the
+    current transfer starts a new transfer.
+    """
+
+    def __init__ (self, max_size = MAX_BLOCKWISE_SIZE):
+        self.__max_size = max_size
+
+        # transfers, in the order of their first block
+        self.transfers  = []
+
+        # key -> current transfer
+        self.__current  = {}
+
+        # (client, server, token) -> uri of the last requests
+        self.__requests = OrderedDict()
+
+        # id (frame) -> transfer
+        self.__by_frame = {}
+
+    def add (self, coap, src, dst, ts = None, frame = None):
+        """Add a CoAP message sent from src to dst
+
+        src and dst may be any hashable identifying the endpoints (eg. the
+        address/port tuples). Returns the transfer the message belongs to (if
+        any).
+        """
+        opt = coap["opt"]
+
+        if coap.is_request():
+            uri = coap.get_uri()
+            key = src, dst, coap["tok"]
+            self.__requests.pop (key, None)
+            self.__requests[key] = uri
+            if len (self.__requests) > MAX_PENDING_REQUESTS:
+                self.__requests.popitem (last = False)
+
+            option_type = CoAPOptionBlock1
+            client, server = src, dst
+
+        elif coap.is_response():
+            uri = self.__requests.get ((dst, src, coap["tok"]))
+            if uri is None:
+                return None
+
+            option_type = CoAPOptionBlock2
+            client, server = dst, src
+        else:
+            return None
+
+        try:
+            block = opt[option_type]
+        except KeyError:
+            return None
+
+        key = client, server, option_type, uri
+        tr  = self.__current.get (key)
+
+        if tr is None or tr.is_restarted_by (coap, block):
+            # new transfer (the Size1/Size2 option gives an estimate of the
+            # size of the representation)
+            size_type = CoAPOptionSize1 if option_type is CoAPOptionBlock1 else CoAPOptionSize2
+            try:
+                size = opt[size_type]["val"]
+            except KeyError:
+                size = None
+
+            tr = CoAPBlockwiseTransfer (key, size, self.__max_size)
+            self.__current[key] = tr
+            self.transfers.append (tr)
+
+        tr.add_block (coap, block, ts, frame)
+        if frame is not None:
+            self.__by_frame[id (frame)] = tr
+        return tr
+
+    def get_transfer (self, frame):
+        """Return the transfer a frame belongs to (None if none)"""
+        return self.__by_frame.get (id (frame))
+
+    def completed (self):
+        """Return the transfers whose representation is fully reassembled"""
+        return [tr for tr in self.transfers if tr.is_complete()]
+
+    def incomplete (self):
+        """Return the transfers with missing blocks"""
+        return [tr for tr in self.transfers if not tr.is_complete()]
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+#
+#   (c) 2012  Universite de Rennes 1
+#
+# Contact address: <t3devkit@irisa.fr>
+#
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+#
+
+#
+# Reassembly of a payload transferred in several chunks
+#
+
+import bisect
+
+__all__ = [
+    'ReassemblyBuffer',
+]
+
+
+class ReassemblyBuffer:
+    """A buffer reassembling a payload from chunks received at arbitrary offsets
+
+    The buffer is preallocated when the total size of the payload is known
+    in advance (or estimated with reserve()), otherwise it grows with the
+    chunks received until its size is fixed by set_size(). The received
+    ranges are kept merged and sorted, so that the gaps can be reported at
+    any time.
+
+    max_size, if given, bounds the size of the payload: a chunk or a size
+    beyond it raises a ValueError and leaves the buffer unchanged.
+    """
+
+    def __init__ (self, size = None, max_size = None):
+        self.__size     = None
+        self.__max_size = max_size
+
+        # received ranges [start, end[ (sorted and merged)
+        self.__starts = []
+        self.__ends   = []
+
+        self.__buffer = bytearray()
+        if size is not None:
+            self.set_size (size)
+
+    @property
+    def size (self):
+        """Total size of the payload (None if not known yet)"""
+        return self.__size
+
+    @property
+    def received (self):
+        """Number of bytes received"""
+        return sum (e - s for s, e in zip (self.__starts, self.__ends))
+
+    @property
+    def end (self):
+        """Offset of the end of the last byte received"""
+        return self.__ends[-1] if self.__ends else 0
+
+    def set_size (self, size):
+        """Fix the total size of the payload"""
+
+        if size < self.end or (self.__size is not None and size != self.__size):
+            raise ValueError ("inconsistent payload size %d" % size)
+        self.__check_size (size)
+
+        self.__size = size
+        if len (self.__buffer) < size:
+            self.__buffer.extend (bytes (size - len (self.__buffer)))
+        else:
+            del self.__buffer[size:]
+
+    def reserve (self, size):
+        """Preallocate the buffer for a payload of the given size (if possible)"""
+        if self.__max_size is not None:
+            size = min (size, self.__max_size)
+        if self.__size is None and len (self.__buffer) < size:
+            self.__buffer.extend (bytes (size - len (self.__buffer)))
+
+    def add (self, offset, data):
+        """Store a chunk of the payload
+
+        Overlapping chunks (eg. retransmissions) overwrite the bytes
+        previously received.
+        """
+        end = offset + len (data)
+        if offset < 0 or (self.__size is not None and end > self.__size):
+            raise ValueError ("chunk [%d:%d] is out of the payload" % (offset, end))
+        self.__check_size (end)
+
+        buff = self.__buffer
+        if end > len (buff):
+            # grow the buffer (at least twice as large to amortise the copies)
+            new_size = max (end, 2 * len (buff))
+            if self.__max_size is not None:
+                new_size = min (new_size, self.__max_size)
+            buff.extend (bytes (new_size - len (buff)))
+
+        buff[offset:end] = data
+
+        if not data:
+            return
+
+        # merge [offset, end[ with the ranges it overlaps or touches
+        starts, ends = self.__starts, self.__ends
+        i = bisect.bisect_left (ends, offset)
+        j = bisect.bisect_right (starts, end)
+        if i < j:
+            offset = min (offset, starts[i])
+            end    = max (end, ends[j-1])
+        starts[i:j] = offset,
+        ends[i:j]   = end,
+
+    def __check_size (self, size):
+        if self.__max_size is not None and size > self.__max_size:
+            raise ValueError ("payload size %d exceeds the limit (%d bytes)" % (size, self.__max_size))
+
+    def is_complete (self):
+        """Return True if the whole payload has been received"""
+        if self.__size is None:
+            return False
+        if not self.__size:
+            return True
+        return self.__starts == [0] and self.__ends == [self.__size]
+
+    def missing (self):
+        """Return the list of the missing ranges (start, end)
+
+        If the size of the payload is not known yet, the ranges after the last
+        byte received are not reported.
+        """
+        result = []
+        prev = 0
+        for s, e in zip (self.__starts, self.__ends):
+            if s > prev:
+                result.append ((prev, s))
+            prev = e
+
+        if self.__size is not None and self.__size > prev:
+            result.append ((prev, self.__size))
+        return result
+
+    def get_data (self, start = 0):
+        """Return the reassembled payload from start (None if some bytes are
+        missing after start)"""
+        if self.__size is None:
+            return None
+        if start < self.__size:
+            i = bisect.bisect_right (self.__starts, start) - 1
+            if i < 0 or i != len (self.__starts) - 1 or self.__ends[i] != self.__size:
+                return None
+        return bytes (self.__buffer[start:self.__size])
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+#
+#   (c) 2012  Universite de Rennes 1
+#
+# Contact address: <t3devkit@irisa.fr>
+#
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+#
+
+#
+# Reassembly of the fragmented 6LoWPAN datagrams based on:
+#	- RFC 4944 (section 5.3)
+#
+
+import struct
+from	collections			import OrderedDict
+
+from	ttproto.core.lib.ieee802154	import Ieee802154
+from	ttproto.core.lib.inet.reassembly	import ReassemblyBuffer
+from	ttproto.core.lib.inet.sixlowpan	import SixLowpanFRAG1, SixLowpanFRAGN
+
+__all__ = [
+    'SixLowpanReassembler',
+]
+
+# time after which an incomplete datagram is discarded (RFC 4944)
+REASSEMBLY_TIMEOUT = 60
+
+# maximal number of datagrams reassembled concurrently
+MAX_PENDING_DATAGRAMS = 64
+
+
+def _crc16 (data):
+    """CRC-16 of the 802.15.4 frames (ITU-T, reflected)"""
+    crc = 0
+    for c in data:
+        crc ^= c
+        for _ in range (8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+    return crc
+
+
+class _Datagram:
+    """A datagram being reassembled"""
+
+    def __init__ (self, size, ts):
+        self.first_ts = ts
+        self.first    = None
+        self.buffer   = ReassemblyBuffer (size)
+        self.header   = None
+        self.refs     = []
+
+    def get_data (self):
+        """Return the compressed datagram (None if some fragments are missing)
+
+        The offsets of the fragments are expressed in the uncompressed
+        datagram, hence the FRAG1 payload is stored apart and the only
+        range missing in the buffer must be the one it covers.
+        """
+        if self.first is None:
+            return None
+        missing = self.buffer.missing()
+        if len (missing) != 1 or missing[0][0] != 0 or missing[0][1] == self.buffer.size:
+            return None
+        return self.first + self.buffer.get_data (missing[0][1])
+
+
+class SixLowpanReassembler:
+    """Reassembly of the 6LoWPAN datagrams fragmented over IEEE 802.15.4
+
+    The 802.15.4 frames are added in the order of the capture with add().
+    The fragments are gathered by (src, dst, datagram tag, datagram size)
+    and once the last one is received, add() returns the 802.15.4 frame that
+    would have carried the whole datagram (the header of the last fragment
+    followed by the datagram) so that it can be decoded as usual.
+
+    The datagrams not completed within timeout seconds after their first
+    fragment are discarded, as well as the oldest ones when more than
+    max_datagrams are pending. The size of a datagram is bounded by the
+    datagram_size field (2047 bytes).
+
+    The 802.15.4 decoder cannot tell the FCS from the payload, so the last
+    two bytes of a fragment are removed if they are a valid FCS.
+    """
+
+    def __init__ (self, timeout = REASSEMBLY_TIMEOUT, max_datagrams = MAX_PENDING_DATAGRAMS):
+        self.__timeout       = timeout
+        self.__max_datagrams = max_datagrams
+
+        # key -> datagram (in the order of their first fragment)
+        self.__datagrams     = OrderedDict()
+
+        # number of the datagrams discarded
+        self.discarded       = 0
+
+    def add (self, ieee, ts, ref = None):
+        """Add an 802.15.4 frame received at ts
+
+        ref is an identifier of the frame (eg. its number in the capture).
+        Returns a tuple (frame, refs) if the frame completes a datagram
+        where frame contains the bytes of the reassembled 802.15.4 frame and
+        refs the identifiers of its fragments, otherwise returns None.
+        """
+        frag = ieee["pl"]
+        if not isinstance (frag, (SixLowpanFRAG1, SixLowpanFRAGN)):
+            return None
+
+        self.__expire (ts)
+
+        size = frag["size"]
+        key  = ieee["src"], ieee["dst"], int (frag["tag"]), size
+        dgm  = self.__datagrams.get (key)
+        if dgm is None:
+            dgm = _Datagram (size, ts)
+            self.__datagrams[key] = dgm
+            if len (self.__datagrams) > self.__max_datagrams:
+                self.__datagrams.popitem (last = False)
+                self.discarded += 1
+
+        header  = self.__build_header (ieee)
+        payload = bytes (frag["pl"])
+        if isinstance (frag, SixLowpanFRAG1):
+            frag_header = struct.pack ("!HH", 0xc000 | size, frag["tag"])
+        else:
+            frag_header = struct.pack ("!HHB", 0xe000 | size, frag["tag"], frag["ofs"])
+        if len (payload) >= 2 and not _crc16 (header + frag_header + payload):
+            payload = payload[:-2]
+
+        try:
+            if isinstance (frag, SixLowpanFRAG1):
+                dgm.first = payload
+            else:
+                dgm.buffer.add (frag["ofs"] * 8, payload)
+        except ValueError:
+            # inconsistent fragment
+            del self.__datagrams[key]
+            self.discarded += 1
+            return None
+
+        dgm.header = header
+        dgm.refs.append (ref)
+
+        data = dgm.get_data()
+        if data is None:
+            return None
+
+        del self.__datagrams[key]
+        return dgm.header + data, dgm.refs
+
+    def __expire (self, ts):
+        datagrams = self.__datagrams
+        while datagrams:
+            dgm = next (iter (datagrams.values()))
+            if ts - dgm.first_ts <= self.__timeout:
+                break
+            datagrams.popitem (last = False)
+            self.discarded += 1
+
+    @staticmethod
+    def __build_header (ieee):
+        values = {f.alias: ieee[f.alias] for f in Ieee802154.fields() if f.alias not in ("pl", "fcs")}
+        return Ieee802154 (pl = b"", **values).build_message()[1]
+
+    def pending (self):
+        """Return the number of datagrams being reassembled"""
+        return len (self.__datagrams)
@@ -37,19 +37,22 @@ from    contextlib import contextmanager
 from    ttproto.core.data import Value
 from    ttproto.core.union import *
 from    ttproto.core.packet import *
-from    ttproto.core.exceptions import Error
+from    ttproto.core.exceptions import Error, UnknownField
 from    ttproto.core.typecheck import *
 from    ttproto.core.lib.inet.meta import *
 from    ttproto.core.lib.inet.basics import *
 from    ttproto.core.lib.inet.ipv6 import *
 from    ttproto.core.lib.inet.udp import *
+from    ttproto.core.lib.inet.icmpv6 import ICMPv6RouterAdvertisement
 from    ttproto.core.lib.inet.sixlowpan import *
 from    ttproto.core.lib.inet.sixlowpan import sixlowpan_dispatch_bidict
+from    ttproto.core.lib.inet.sixlowpan_nd import SixLowpanContextOption
 
 # TODO: some factorisation of the compress() & decompress() functions
 # FIXME: do not compress beyond the first frame (127 bytes) in case of fragmentation
 
 __all__ = [
+    "SixLowpanContextTable",
     "SixLowpanIPHC",
     "SixLowpanNHC",
     "SixLowpanNHC_IPExt",
@@ -152,6 +155,135 @@ sixlowpan_nhc_id_bidict = BidictValueType(0, SixLowpanNHC)
 SixLowpanNHC.get_field(0).tag._set_bidict(sixlowpan_nhc_id_bidict)
 
 
+class SixLowpanContextTable:
+    """The 16 compression contexts of 6LoWPAN-HC
+
+    Each context is a (prefix, length) tuple, the unused ones being (::, 128).
+    A table is attached to a decoding session (eg. a Capture) with
+    SixLowpanIPHC.context_table() and it may learn the contexts from the
+    6LoWPAN Context Options of the Router Advertisements seen in the session.
+
+    The entries are replaced as a whole on every update, so they are read
+    without any lock. The lookup tables of find() are compiled from the
+    entries on every update, so that the addresses are looked up as integers
+    (without creating IPv6Prefix objects).
+    """
+
+    __unused = IPV6_UNSPECIFIED_ADDRESS, 128
+
+    def __init__(self, *k):
+        """k is a list of tuples (id, prefix, length) (see update())"""
+
+        self.__entries = (self.__unused,) * 16
+
+        # contexts valid for the compression (RFC 6775: a context advertised
+        # with the C flag unset is used only for the decompression)
+        self.__compression = (True,) * 16
+        self.__lookup = self.__compile(self.__entries, self.__compression)
+
+        self.update(*k)
+
+    def __getitem__(self, id):
+        return self.__entries[id]
+
+    def __iter__(self):
+        return iter(self.__entries)
+
+    def __len__(self):
+        return 16
+
+    def copy(self):
+        table = type(self)()
+        table.__entries, table.__compression = self.__entries, self.__compression
+        table.__lookup = self.__lookup
+        return table
+
+    def update(self, *k, compression=True):
+        """k is a list of tuples (id, prefix, length)
+
+            eg:	((1,  "aaaa::", 64),
+                 (12,b"1234560000000000", 48))
+
+        a prefix set to None removes the context
+        """
+        entries = list(self.__entries)
+        flags = list(self.__compression)
+        for id, pfx, length in k:
+            assert 0 <= id <= 15
+            assert 0 <= length <= 128
+            entries[id] = self.__unused if pfx is None else (store_data(pfx, IPv6Address), length)
+            flags[id] = compression
+        entries, flags = tuple(entries), tuple(flags)
+
+        if (entries, flags) != (self.__entries, self.__compression):
+            self.__entries, self.__compression = entries, flags
+            self.__lookup = self.__compile(entries, flags)
+
+    @staticmethod
+    def __compile(entries, flags):
+        """Build the lookup tables of find()
+
+        An address matches a context (pfx, length) if its first "length" bits
+        are equal to the prefix and if the context gives its whole 64-bit
+        prefix, ie. its bits between "length" and 64 are null. Thus the
+        contexts are indexed by their 64 first bits, the longest ones first
+        (those longer than 64 bits also require the following bits of the
+        address to be null).
+        """
+        by_address = {}
+        by_prefix = {}
+        for id, (pfx, length) in enumerate(entries):
+            if not flags[id]:
+                continue
+            value = int.from_bytes(pfx, "big")
+            by_prefix.setdefault((value, length), id)
+
+            value &= ~((1 << (128 - length)) - 1)
+            if value & ((1 << 64) - 1):
+                # bits beyond 64 in the prefix -> never matches
+                continue
+            by_address.setdefault(value >> 64, []).append((128 - length, id))
+
+        # (128 - length, id) sorted -> longest prefix first
+        return {high: tuple(sorted(contexts)) for high, contexts in by_address.items()}, by_prefix
+
+    def learn(self, value) -> bool:
+        """Update the table with the 6LoWPAN Context Options of a message (if
+        it contains a Router Advertisement)
+
+        A context advertised with a null lifetime is removed. Returns True if
+        the table was changed.
+        """
+        while not isinstance(value, ICMPv6RouterAdvertisement):
+            try:
+                value = value["pl"]
+            except (KeyError, TypeError, UnknownField):
+                return False
+
+        entries = self.__entries, self.__compression
+        for opt in value["opt"]:
+            if isinstance(opt, SixLowpanContextOption):
+                pfx = opt["pf"] if opt["lt"] else None
+                self.update((opt["cid"], pfx, opt["clen"]), compression=bool(opt["c"]))
+        return entries != (self.__entries, self.__compression)
+
+    def find(self, addr, length=None):
+        """Return the id of the context to be used for compressing an address
+        (or a prefix if length is given), None if there is none"""
+        by_address, by_prefix = self.__lookup
+        value = int.from_bytes(addr, "big")
+        if length is None:
+            # address lookup (longest prefix first)
+            for shift, id in by_address.get(value >> 64, ()):
+                # shift = 128 - length
+                if shift >= 64 or not (value & ((1 << 64) - 1)) >> shift:
+                    return id
+            return None
+        else:
+            # prefix lookup
+            return by_prefix.get((value, length))
+
+
 class SixLowpanIPHC(
     metaclass=InetPacketClass,
     variant_of=SixLowpan,
@@ -775,9 +907,26 @@ class SixLowpanIPHC(
         l = SixLowpanIPHC.__local
         return l.iids if hasattr(l, "iids") else (None, None)
 
-    __contextes_lock = threading.Lock()
-    __contextes_stack = []
-    __contextes = tuple((IPV6_UNSPECIFIED_ADDRESS, 128) for i in range(0, 16))
+    __default_contextes = SixLowpanContextTable()
+
+    @classmethod
+    @contextmanager
+    def context_table(cls, table: SixLowpanContextTable):
+        """Use a context table in the current thread (eg. while decoding a capture)"""
+        l = SixLowpanIPHC.__local
+        backup = l.contextes if hasattr(l, "contextes") else None
+
+        l.contextes = table
+        try:
+            yield table
+        finally:
+            l.contextes = backup
+
+    @classmethod
+    def get_context_table(cls) -> SixLowpanContextTable:
+        l = SixLowpanIPHC.__local
+        table = l.contextes if hasattr(l, "contextes") else None
+        return cls.__default_contextes if table is None else table
 
     @classmethod
     @contextmanager
@@ -787,64 +936,28 @@ class SixLowpanIPHC(
             eg:	((1,  "aaaa::", 64),
                  (12,b"1234560000000000", 48))
 
+        the contexts are updated only in the current thread
         """
-
-        with cls.__contextes_lock:
-            # copy the current context
-            contextes = list(cls.__contextes)
-            # push it into the stack
-            cls.__contextes_stack.append(cls.__contextes)
-            # update the new context
-            for id, pfx, length in k:
-                assert 0 <= id <= 15
-                assert 0 <= length <= 128
-                contextes[id] = store_data(pfx, IPv6Address), length
-            # use it as the current context
-            cls.__contextes = contextes
-
-        try:
+        table = cls.get_context_table().copy()
+        table.update(*k)
+        with cls.context_table(table):
             yield
-        finally:
-            with cls.__contextes_lock:
-                if cls.__contextes is contextes:
-                    # restore the previous from the stack
-                    cls.__contextes = cls.__contextes_stack.pop()
-                else:
-                    # may happen if the contextes are modified by multiple threads
-                    # -> remove the corresponding entry in the stack
-                    cls.__contextes_stack.remove(contextes)
 
     @classmethod
     @typecheck
     def get_context(cls, id: int) -> (IPv6Address, id):
         assert 0 <= id <= 15
-        with cls.__contextes_lock:
-            return cls.__contextes[id]
+        return cls.get_context_table()[id]
 
     @classmethod
     @typecheck
     def find_context(cls, addr: IPv6Address, length=None) -> optional(int):
-        with cls.__contextes_lock:
-            if length is None:
-                # address lookup
-                i = 0
-                for pfx, length in cls.__contextes:
-                    if IPv6Prefix(pfx, length).match(addr) \
-                            and IPv6Prefix(addr, length).get_address() == IPv6Prefix(addr, 64).get_address():
-                        return i
-                    i += 1
-                return None
-            else:
-                # prefix lookup
-                try:
-                    return cls.__contextes.index((addr, length))
-                except ValueError:
-                    return None
+        return cls.get_context_table().find(addr, length)
 
     @classmethod
     def print_contextes(cls):
         print("IPHC contextes")
-        for i, ctx in zip(range(0, 16), cls.__contextes):
+        for i, ctx in enumerate(cls.get_context_table()):
             print("  %02d -> %s/%d" % (i, ctx[0], ctx[1]))
 
 
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+#
+#   (c) 2012  Universite de Rennes 1
+#
+# Contact address: <t3devkit@irisa.fr>
+#
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+
+
+"""Native datagram ports (UDP and Unix domain sockets)
+
+These ports bind their socket directly (no external process is needed). The
+datagrams are received by a single thread waiting on a selector, that drains
+all the pending datagrams at each wakeup.
+"""
+
+import atexit, os, selectors, socket, tempfile, threading, traceback
+
+from ttproto.core.typecheck	import *
+from ttproto.core.data		import *
+from ttproto.core		import exceptions, port
+
+__all__ = [
+	'DatagramSocketPort',
+	'UdpMessagePort',
+	'UnixDatagramPort',
+]
+
+class DatagramSocketPort (port.RawMessagePort):
+	"""Raw message port bound to a datagram socket
+
+	If 'remote_addr' is given, then the socket is connected to this address.
+	Otherwise the messages are sent to the peer of the last datagram
+	received.
+	"""
+
+	RECV_SIZE = 65535
+
+	# size requested for the receive buffer of the socket (the datagrams
+	# received while the previous ones are decoded are kept in this buffer)
+	RECV_BUFFER_SIZE = 1 << 20
+
+	def __init__ (self, family, local_addr = None, remote_addr = None, decode_type: is_type = bytes, endpoint: optional (port.BaseMessagePort) = None):
+		port.RawMessagePort.__init__ (self, decode_type, endpoint)
+
+		self.__lock = threading.Lock()
+		self.__kill_event = threading.Event()
+		self.__connected = remote_addr is not None
+		self.__peer = None
+
+		# create the socket
+		self.__sock = socket.socket (family, socket.SOCK_DGRAM)
+		try:
+			self.__sock.setsockopt (socket.SOL_SOCKET, socket.SO_RCVBUF, self.RECV_BUFFER_SIZE)
+			if local_addr is not None:
+				self.__sock.bind (local_addr)
+			if remote_addr is not None:
+				self.__sock.connect (remote_addr)
+		except:
+			self.__sock.close()
+			raise
+
+		# socket pair used to wake up the receiving thread when killing the port
+		self.__wakeup_r, self.__wakeup_w = socket.socketpair()
+
+		self.__selector = selectors.DefaultSelector()
+		self.__selector.register (self.__sock, selectors.EVENT_READ)
+		self.__selector.register (self.__wakeup_r, selectors.EVENT_READ)
+
+		# launch a listening thread
+		self.__thread = threading.Thread (target = self.__thread_func)
+		# this is a daemon thread (will not block at exit)
+		self.__thread.daemon = True
+		self.__thread.start()
+
+		# register an exit handler to free the resources when leaving
+		atexit.register (self.kill)
+
+	def get_sockname (self):
+		return self.__sock.getsockname()
+
+	def get_peer (self):
+		with self.__lock:
+			return self.__peer
+
+	@typecheck
+	def enqueue (self, msg: Message):
+		assert isinstance (msg.get_binary(), bytes) # supports only byte-aligned data
+
+		if self.__kill_event.is_set():
+			raise exceptions.PortNotConnected()
+
+		try:
+			if self.__connected:
+				self.__sock.send (msg.get_binary())
+			else:
+				peer = self.get_peer()
+				if peer is None:
+					print ("%s: warning: ignored (no known peer yet)" % type(self).__name__)
+					return
+				self.__sock.sendto (msg.get_binary(), peer)
+		except Exception as e:
+			if not self.__kill_event.is_set():
+				print("Cannot send the message")
+				traceback.print_exc()
+				#FIXME: should have an error handler that reports an error verdict
+
+	def __thread_func (self):
+		try:
+			while True:
+				for key, mask in self.__selector.select():
+					if key.fileobj is self.__wakeup_r:
+						# the port is being killed -> just return silently
+						return
+					self.__drain()
+
+		except Exception as e:
+			if not self.__kill_event.is_set():
+				print("Error in receiving thread")
+				traceback.print_exc()
+
+			#TODO: report the error to the tester
+
+	def __drain (self):
+		"""Forward all the datagrams pending in the socket"""
+
+		# empty the socket buffer before decoding the datagrams
+		datagrams = []
+		while True:
+			try:
+				datagrams.append (self.__sock.recvfrom (self.RECV_SIZE, socket.MSG_DONTWAIT))
+			except BlockingIOError:
+				break
+			except ConnectionRefusedError:
+				# ICMP error following a previous send -> the remote port is not open (yet)
+				continue
+
+		for buff, peer in datagrams:
+			if not self.__connected and peer and peer != self.__peer:
+				with self.__lock:
+					print ("Using new endpoint:", peer)
+					self.__peer = peer
+
+			# forward it
+			self._forward (buff)
+			#TODO: warning if there is no endpoint ?
+
+	def kill (self):
+		if self.__kill_event.is_set():
+			return
+
+		# set the kill event (to notify other threads)
+		self.__kill_event.set()
+
+		# wake up the listening thread and wait for its termination
+		self.__wakeup_w.send (b"\0")
+		if threading.current_thread() is not self.__thread:
+			self.__thread.join()
+
+		self.__selector.close()
+		for sock in self.__sock, self.__wakeup_r, self.__wakeup_w:
+			sock.close()
+
+		# unregister our exit handler
+		atexit.unregister (self.kill)
+
+
+class UdpMessagePort (DatagramSocketPort):
+	"""Message port exchanging UDP datagrams
+
+	The addresses are (host, port) tuples, the address family (IPv4 or
+	IPv6) is the one of the first address resolved.
+
+	Example:
+		link = MessagePort()
+		udp = UdpMessagePort (remote_addr = ("localhost", 13000), decode_type = Ieee802154, endpoint = link)
+	"""
+
+	@typecheck
+	def __init__ (self, local_addr: optional (tuple) = None, remote_addr: optional (tuple) = None, decode_type: is_type = bytes, endpoint: optional (port.BaseMessagePort) = None):
+		assert local_addr or remote_addr
+
+		family, local_addr, remote_addr = self.__resolve (local_addr, remote_addr)
+
+		DatagramSocketPort.__init__ (self, family, local_addr, remote_addr, decode_type, endpoint)
+
+	@staticmethod
+	def __resolve (local_addr, remote_addr):
+		family = 0
+		result = []
+		for addr in remote_addr, local_addr:
+			if addr is None:
+				result.append (None)
+				continue
+
+			host, port_number = addr
+			family, type_, proto, canonname, sockaddr = socket.getaddrinfo (
+				host or None, port_number, family, socket.SOCK_DGRAM, 0, socket.AI_PASSIVE)[0]
+			result.append (sockaddr)
+
+		return family, result[1], result[0]
+
+
+class UnixDatagramPort (DatagramSocketPort):
+	"""Message port exchanging datagrams over Unix domain sockets
+
+	If 'path' is not given, then the socket is bound to a temporary path
+	(so that the remote socket can send datagrams back).
+	"""
+
+	@typecheck
+	def __init__ (self, path: optional (str) = None, remote_path: optional (str) = None, decode_type: is_type = bytes, endpoint: optional (port.BaseMessagePort) = None):
+		self.__tmpdir = None
+		if path is None:
+			self.__tmpdir = tempfile.mkdtemp()
+			path = os.path.join (self.__tmpdir, "sock")
+		self.__path = path
+
+		DatagramSocketPort.__init__ (self, socket.AF_UNIX, path, remote_path, decode_type, endpoint)
+
+	def get_path (self):
+		return self.__path
+
+	def kill (self):
+		DatagramSocketPort.kill (self)
+
+		# remove the socket file
+		if os.path.exists (self.__path):
+			os.unlink (self.__path)
+		if self.__tmpdir:
+			os.rmdir (self.__tmpdir)
+			self.__tmpdir = None
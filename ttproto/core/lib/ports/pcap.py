@@ -31,44 +31,130 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
+import logging
+import queue
+import threading
+
 from ttproto.core.data import *
 from ttproto.core.typecheck import *
 from ttproto.core import port, clock
+from ttproto.core.lib.readers.pcap import get_link_type_decoder, decode_frame
 from ttproto.utils import pure_pcapy
 
+log = logging.getLogger(__name__)
+
+# Maximum number of frames decoded in advance by the background stage of a PcapPort
+PREDECODE_QUEUE_SIZE = 1024
+
 
 class PcapPort(port.RawMessagePort):
+    """
+    Receive-only port replaying the frames of a pcap file
+
+    Each frame is forwarded to the endpoint at the time of its timestamp on
+    the clock of the port. On a SimulatedClock the replay runs at max speed
+    with a deterministic order of events: the clock jumps to the timestamp
+    of the next frame (or timer) as soon as all the snapshot threads are
+    waiting for events.
+
+    The frames are decoded ahead of time by a background thread (unless
+    predecode is False), so that the clock does not wait for the decoder.
+    The replay stops at the end of the file, or at the first error reading
+    it (reported in the log).
+
+    Example:
+        clock.Clock.set_instance(clock.SimulatedClock())
+        link = MessagePort(PcapPort('session.pcap'))
+        ... (start the snapshot threads)
+        clock.Clock.get_instance().start()
+    """
+
     @typecheck
     def __init__(self, file: str, decode_type: optional(is_type) = None, clock_: optional(clock.Clock) = None,
-                 endpoint: optional(port.BaseMessagePort) = None):
+                 endpoint: optional(port.BaseMessagePort) = None, predecode: bool = True):
 
-        self.__reader = pure_pcapy.Reader(open(file, "rb"))
+        self.__file = open(file, "rb")
+        self.__reader = pure_pcapy.Reader(self.__file)
         self.__clock = clock_ if clock_ else clock.Clock.get_instance()
 
-        if not decode_type:
-            try:
-                decode_type = _map_link_type[self.__reader.datalink()]
-            except KeyError:
-                decode_type = bytes
+        if decode_type:
+            self.__decode_type = get_type(decode_type)
+        else:
+            self.__decode_type = get_link_type_decoder(self.__reader.datalink())
+
+        port.RawMessagePort.__init__(self, self.__decode_type, endpoint)
+
+        if predecode:
+            self.__frames = queue.Queue(PREDECODE_QUEUE_SIZE)
+            self.__next_frame = self.__frames.get
 
-        port.RawMessagePort.__init__(self, decode_type, endpoint)
+            self.__decoder = threading.Thread(target=self.__decoder_func)
+            # this is a daemon thread (will not block at exit)
+            self.__decoder.daemon = True
+            self.__decoder.start()
+        else:
+            self.__next_frame = self.__read_frame
 
         self.__schedule_next()
 
+    def __read_frame(self):
+        """
+        Read and decode the next frame of the file
+
+        :return: The timestamp and the message of the frame, None at the end of the file
+        """
+        h, b = self.__reader.next()
+
+        if not h:
+            self.__file.close()
+            return None
+
+        # timestamp
+        ts = h.getts()
+        ts = ts[0] + ts[1] * 0.000001
+
+        # decode the packet (the name resolution is disabled only in the
+        # current thread)
+        with Data.disable_name_resolution():
+            msg, exc = decode_frame(b, self.__decode_type)
+        if exc:
+            log.warning("Decoding error in %s -> %s", self.__file.name, exc)
+
+        return ts, msg
+
+    def __decoder_func(self):
+        try:
+            while True:
+                frame = self.__read_frame()
+                self.__frames.put(frame)
+
+                if frame is None:
+                    return
+        except Exception as e:
+            # hand over the error to the clock thread, which would
+            # otherwise wait forever for the next frame
+            self.__file.close()
+            self.__frames.put(e)
+
     def __schedule_next(self):
 
-        h, self.__next_packet = self.__reader.next()
+        try:
+            frame = self.__next_frame()
+        except Exception as e:
+            frame = e
+
+        if isinstance(frame, Exception):
+            log.error("Replay of %s aborted", self.__file.name, exc_info=frame)
 
-        if h:
-            # timestamp
-            ts = h.getts()
-            ts = ts[0] + ts[1] * 0.000001
+        elif frame:
+            ts, self.__next_message = frame
 
             # schedule
             self.__clock.schedule_event_absolute(ts, self.__callback)
 
     def __callback(self):
-        self._forward(self.__next_packet)
+        # the message is already decoded
+        port.BaseMessagePort._forward(self, self.__next_message)
 
         self.__schedule_next()
 
@@ -57,6 +57,42 @@ _map_link_type = {
 }
 
 
+@typecheck
+def get_link_type_decoder(datalink: int):
+    """
+    Get the type used to decode the frames of a link type
+
+    :param datalink: The pcap link type (eg. pure_pcapy.DLT_RAW)
+    :type datalink: int
+
+    :return: The type decoding the frames, bytes if the link type is unknown
+    """
+    try:
+        decode_type = _map_link_type[datalink]
+    except KeyError:
+        decode_type = bytes
+
+    return get_type(decode_type)
+
+
+def decode_frame(data: bytes, decode_type) -> (Message, optional(Exception)):
+    """
+    Decode the bytes of a frame
+
+    :param data: The bytes of the frame
+    :param decode_type: The type used to decode it (see get_link_type_decoder)
+    :type data: bytes
+
+    :return: The message of the frame and the exception raised while decoding
+             it, None if it was decoded
+    """
+    try:
+        log.debug('Decoding bytes as %s: %s ' % (repr(data), decode_type))
+        return Message(data, decode_type), None
+    except Exception as e:
+        return Message(data), e
+
+
 class PcapReader(CaptureReader):
     """
     Reader class for pcap capture files
@@ -79,12 +115,7 @@ class PcapReader(CaptureReader):
             raise e
         log.debug("datalink: %d" % self.__reader.datalink())
 
-        try:
-            decode_type = _map_link_type[self.__reader.datalink()]
-        except KeyError:
-            decode_type = bytes
-
-        self.__decode_type = get_type(decode_type)
+        self.__decode_type = get_link_type_decoder(self.__reader.datalink())
 
     def __del__(self):
         # Close the file only if it was opened before
@@ -105,14 +136,7 @@ class PcapReader(CaptureReader):
         ts = ts[0] + ts[1] * 0.000001
 
         # decode the packet
-        try:
-            log.debug('Decoding bytes as %s: %s ' % (repr(b), self.__decode_type))
-            m = Message(b, self.__decode_type)
-            #log.debug(m.display())
-            exc = None
-        except Exception as e:
-            m = Message(b)
-            exc = e
+        m, exc = decode_frame(b, self.__decode_type)
 
         return ts, m, exc
 
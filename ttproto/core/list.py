@@ -189,22 +189,43 @@ class ListValue (Value):
 
 	@staticmethod
 	@typecheck
-	# NOTE: the content of 'values' and 'patterns' is altered by this function
-	def __try_all_matches (values: list_of (is_value), patterns: list_of (is_data)):
-#		assert len(values) == len(patterns)
-
-		for i in range (0, len(values)):
-			for j in range (0, len (patterns)):
-				if patterns[j].match (values[i]):
-					v = values.pop(i)
-					p = patterns.pop(j)
-					if ListValue.__try_all_matches (values, patterns):
+	def __find_assignment (values: list_of (is_value), patterns: list_of (is_data)) -> bool:
+		"""Return True if each value can be paired with a distinct pattern matching it
+
+		This is solved as a bipartite matching problem: the compatibility
+		matrix is filled with one match() call per (value, pattern) pair,
+		then each value is assigned a pattern by searching for augmenting
+		paths (Kuhn's algorithm). The cost is bounded by O(n^2) calls to
+		match() and O(n^3) steps for the assignment.
+		"""
+		if len (values) != len (patterns):
+			return False
+
+		# compatible[i] -> indexes of the patterns matching values[i]
+		compatible = []
+		for v in values:
+			candidates = [j for j, p in enumerate (patterns) if p.match (v)]
+			if not candidates:
+				# this value cannot be paired at all
+				return False
+			compatible.append (candidates)
+
+		# owner[j] -> index of the value currently assigned to patterns[j]
+		owner = [None] * len (patterns)
+
+		def augment (i, visited):
+			for j in compatible[i]:
+				if j not in visited:
+					visited.add (j)
+					if owner[j] is None or augment (owner[j], visited):
+						owner[j] = i
 						return True
-					values.insert (i, v)
-					patterns.insert (j, p)
+			return False
 
-		# if the lists are empty then it is a success
-		return not (values or patterns)
+		for i in range (len (values)):
+			if not augment (i, set()):
+				return False
+		return True
 
 	@typecheck
 	def _match (self, value: this_class, mismatch_list: optional(list)) -> bool:
@@ -233,8 +254,7 @@ class ListValue (Value):
 		else:
 			# Unordered list
 
-			# FIXME: computationally intensive -> O(n!)
-			if not self.__try_all_matches (list (value.get_datas()), list(self.get_datas())):
+			if not self.__find_assignment (list (value.get_datas()), list(self.get_datas())):
 
 				result = False
 
@@ -33,7 +33,7 @@
 
 """Logging module"""
 
-import sys, threading, time
+import queue, sys, threading, time, traceback
 
 from ttproto.core.typecheck	import *
 from ttproto.core.exceptions	import Error
@@ -45,6 +45,8 @@ __all__ = [
 	'Logger',
 	'ConsoleLogger',
 	'LoggerGroup',
+	'QueueLoggerGroup',
+	'BufferLogger',
 	'LoggedObject',
 	'EventText',
 	'EventStep',
@@ -132,6 +134,9 @@ class Logger:
 	def get_default (cls):
 		return cls.__default_logger
 
+	def flush (self):
+		pass
+
 	def __enter__ (self):
 		return self
 
@@ -162,6 +167,10 @@ class ConsoleLogger (Logger):
 				for line in event.traceback.split("\n"):
 					print ("             " + line, file = self.__file)
 
+	def flush (self):
+		with self.__lock:
+			self.__file.flush()
+
 
 Logger.set_default (ConsoleLogger())
 
@@ -173,12 +182,16 @@ class LoggerGroup (Logger):
 
 	@typecheck
 	def add_logger (self, logger: Logger):
-		self.__loggers.push (logger)
+		self.__loggers.append (logger)
 
 	def log_event (self, event):
 		for l in self.__loggers:
 			l.log_event (event)
 
+	def flush (self):
+		for l in self.__loggers:
+			l.flush()
+
 	def __enter__ (self):
 		for l in self.__loggers:
 			l.__enter__()
@@ -188,6 +201,103 @@ class LoggerGroup (Logger):
 		for l in self.__loggers:
 			l.__exit__(a, b, c)
 
+
+class QueueLoggerGroup (LoggerGroup):
+	"""Logger group dispatching the events from a background thread
+
+	log_event() only appends the event to a bounded queue, the events are
+	formatted and written by a daemon thread, in batches of at most
+	'batch_size' events (the loggers are flushed after each batch).
+
+	When the queue is full, log_event() blocks until the consumer has caught
+	up (the events are never dropped). flush() and __exit__() wait until all
+	the queued events are dispatched.
+
+	Note: the events are formatted after log_event() returns, the values they
+	refer to must not be modified afterwards.
+	"""
+
+	QUEUE_SIZE = 4096
+	BATCH_SIZE = 64
+
+	@typecheck
+	def __init__ (self, loggers: list_of (Logger) = [], queue_size: int = QUEUE_SIZE, batch_size: int = BATCH_SIZE):
+		assert queue_size > 0 and batch_size > 0
+
+		LoggerGroup.__init__ (self, loggers)
+
+		self.__queue = queue.Queue (queue_size)
+		self.__batch_size = batch_size
+
+		self.__thread = threading.Thread (target = self.__consumer, name = "QueueLoggerGroup")
+		self.__thread.daemon = True
+		self.__thread.start()
+
+	def log_event (self, event):
+		self.__queue.put (event)
+
+	def __consumer (self):
+		q = self.__queue
+		while True:
+			batch = [q.get()]
+			try:
+				while len (batch) < self.__batch_size:
+					batch.append (q.get_nowait())
+			except queue.Empty:
+				pass
+
+			for event in batch:
+				try:
+					LoggerGroup.log_event (self, event)
+				except Exception:
+					# a failing logger must not stop the dispatch of the next events
+					traceback.print_exc()
+			try:
+				LoggerGroup.flush (self)
+			except Exception:
+				traceback.print_exc()
+
+			for event in batch:
+				q.task_done()
+
+	def flush (self):
+		self.__queue.join()
+
+	def __exit__ (self, a, b, c):
+		self.flush()
+		LoggerGroup.__exit__ (self, a, b, c)
+
+
+class BufferLogger (Logger):
+	"""Logger keeping the events in memory
+
+	The events are logged later by calling replay().
+	"""
+	def __init__ (self):
+		self.__lock = threading.Lock()
+		self.__events = []
+
+	def log_event (self, event):
+		with self.__lock:
+			self.__events.append (event)
+
+	def replay (self, logger = None):
+		"""Log the buffered events (and clear the buffer)
+
+		The events are sent to 'logger' (by default to the logger of the
+		current thread).
+		"""
+		with self.__lock:
+			events = self.__events
+			self.__events = []
+
+		for ev in events:
+			if logger is None:
+				log_event (ev)
+			else:
+				logger.log_event (ev)
+
+
 class LoggedObject:
 
 	def __init__ (self):
@@ -226,7 +336,13 @@ class EventStep (metaclass = LogEventClass):
 
 @typecheck
 def log_event (event: LogEvent):
-	threading.current_thread().log_event(event) # FIXME: will raise an error if the thread is not derived from snapshot.Thread
+	thread = threading.current_thread()
+	if hasattr (thread, "log_event"):
+		thread.log_event(event)
+	else:
+		# asyncio task
+		from ttproto.core import snapshot
+		snapshot.AsyncSnapshotManager().log_event(event) # FIXME: will raise an error if not run from an asyncio task
 
 def log (*k):
 	log_event (EventText (" ".join(str (v) for v in k)))
@@ -31,18 +31,22 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
-import threading, traceback
+import asyncio, logging, threading, traceback
 from contextlib import contextmanager
 
 from ttproto.core.typecheck	import *
 from ttproto.core.data		import *
 from ttproto.core		import exceptions, logger, named, snapshot, primitive
+from ttproto.core.packet	import PacketValue
+
+log = logging.getLogger (__name__)
 
 __all__ = [
 	'Port',
 	'BaseMessagePort',
 	'RawMessagePort',
 	'MessagePort',
+	'DatagramMessagePort',
 	'EventMessageSent',
 	'EventMessageReceived',
 	'EventMessageMismatch',
@@ -205,17 +209,41 @@ class RawMessagePort (BaseMessagePort):
 	def _forward (self, bin_msg: bytes):
 
 		# decode the message
-		try:
-			msg = Message (bin_msg, self.__decode_type)
-		except Exception as e:
-			# TODO: log this
-			print("Decoding error ->", e)
-#			traceback.print_exc()
-			msg = Message (bin_msg, primitive.BytesValue)
+		# (the messages are received in the thread of the port, which is not
+		# covered by the name resolution switch of the testcase)
+		with Data.disable_name_resolution():
+			try:
+				msg = Message (bin_msg, self.__decode_type)
+			except Exception as e:
+				# TODO: log this
+				print("Decoding error ->", e)
+#				traceback.print_exc()
+				msg = Message (bin_msg, primitive.BytesValue)
 
 		return super()._forward (msg)
 
 
+def _variant_chain (data):
+	"""Return the variants of a packet and of its successive payloads
+
+	The chain stops at the first payload that is not a packet (or that is
+	a derived template). A top-level packet template can only match a
+	value having the same variant, thus a template can only match the
+	messages whose chain starts with the chain of the template.
+	"""
+	chain = []
+	while isinstance (data, PacketValue) and data.get_parent() is None:
+		variant = data.get_variant()
+		chain.append (variant)
+
+		pid = variant.get_payload_id()
+		if pid is None:
+			break
+		# (iterating is cheaper than the type-checked __getitem__)
+		data = tuple (data)[pid]
+	return tuple (chain)
+
+
 class MessagePort (snapshot.EventSource, BaseMessagePort):
 	"""Message port that can interact with the test
 
@@ -262,8 +290,18 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 			@t.timeout()
 			def _():
 				set_verdict (fail)
+
+	The receive() templates are first compared with the variants of the
+	packet at the head of the queue (and of its payloads), the full match
+	is only done if they are compatible.
+
+	If 'log_mismatches' is True, then an EventMessageMismatch is logged
+	when the message at the head of the queue does not match a receive()
+	template (by default MessagePort.log_mismatches is used).
 	"""
 
+	log_mismatches = False
+
 	class ReceiveMatch (snapshot.EventMatch):
 		@typecheck
 		def __init__ (self, source: snapshot.Event, message: Message, data: optional(is_data)):
@@ -284,7 +322,7 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 			return self.__data
 
 
-	def __init__ (self, endpoint = None):
+	def __init__ (self, endpoint = None, log_mismatches: optional (bool) = None):
 		snapshot.EventSource.__init__ (self)
 		BaseMessagePort.__init__ (self, endpoint)
 
@@ -292,6 +330,10 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 
 		self.__queue_in = []
 		self.__failed_matches = []
+		self.__head_chain = None
+
+		if log_mismatches is not None:
+			self.log_mismatches = log_mismatches
 
 	@typecheck
 	def enqueue (self, msg: Message):
@@ -310,6 +352,14 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 	def evaluate_snapshot (self):
 		self.__snapshot_msg = bool (self.__queue_in)
 
+	def __is_candidate (self, msg, data):
+		"""Return False if the template 'data' cannot match the message 'msg'"""
+		if self.__head_chain is None or self.__head_chain[0] is not msg:
+			self.__head_chain = msg, _variant_chain (msg.get_value())
+
+		chain = _variant_chain (data)
+		return self.__head_chain[1][:len (chain)] == chain
+
 	@typecheck
 	def match_receive (self, data: optional (is_data) = None):
 		if self.__snapshot_msg:
@@ -318,13 +368,16 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 			# TODO: match the template
 			msg = self.__queue_in[0]
 
-			mismatch_list = []
-			if data is not None and not as_data(data).match(msg.get_value(), mismatch_list):
-				if data not in self.__failed_matches:
-#					print "%s: mismatch  ->  got: %s, expected: %s" % (self.__name__, msg, data)
-					self.__failed_matches.append (data)
-					self.log (EventMessageMismatch, msg, data, tuple (mismatch_list))
-				return None
+			if data is not None:
+				data = as_data (data)
+				if not self.__is_candidate (msg, data) or not data.match (msg.get_value()):
+					if self.log_mismatches and data not in self.__failed_matches:
+#						print "%s: mismatch  ->  got: %s, expected: %s" % (self.__name__, msg, data)
+						mismatch_list = []
+						data.match (msg.get_value(), mismatch_list)
+						self.__failed_matches.append (data)
+						self.log (EventMessageMismatch, msg, data, tuple (mismatch_list))
+					return None
 
 #			print("%s: receive message -> %s, expected: %s" % (self.__name__, msg, data))
 #			display (msg.get_value())
@@ -333,6 +386,7 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 			# TODO: lock the object ??? (is it safe to touch the list now)
 			self.__queue_in.pop(0)
 			self.__failed_matches[:] = ()
+			self.__head_chain = None
 
 			self.log (EventMessageReceived, msg, data)
 
@@ -340,6 +394,71 @@ class MessagePort (snapshot.EventSource, BaseMessagePort):
 
 		return None
 
+class DatagramMessagePort (RawMessagePort, asyncio.DatagramProtocol):
+	"""Message port exchanging datagrams through an asyncio event loop
+
+	The messages enqueued in this port are sent as datagrams, the
+	datagrams received are decoded and forwarded to the endpoint. The
+	socket is served by the loop, thus no thread is needed for receiving.
+
+	Example:
+		link1 = MessagePort()
+		udp = DatagramMessagePort (CoAP, link1)
+		await udp.open (local_addr = ("::1", 5683), remote_addr = ("::1", 5684))
+		...
+		udp.close()
+	"""
+
+	def __init__ (self, decode_type: is_type = bytes, endpoint = None):
+		RawMessagePort.__init__ (self, decode_type, endpoint)
+
+		self.__transport = None
+
+	async def open (self, loop = None, **kw):
+		"""Create the datagram endpoint of this port
+
+		The keyword parameters (local_addr, remote_addr, family, sock...)
+		are the ones of loop.create_datagram_endpoint()
+		"""
+		if loop is None:
+			loop = asyncio.get_event_loop()
+
+		await loop.create_datagram_endpoint (lambda: self, **kw)
+
+	def close (self):
+		if self.__transport:
+			self.__transport.close()
+
+	def get_extra_info (self, name, default = None):
+		if self.__transport is None:
+			return default
+		return self.__transport.get_extra_info (name, default)
+
+	def connection_made (self, transport):
+		self.__transport = transport
+
+	def connection_lost (self, exc):
+		self.__transport = None
+
+	def datagram_received (self, data, addr):
+		# forward it
+		if not self._forward (data):
+			log.warning ("Datagram port %s: message from %s dropped (port not connected)", self.__name__, addr)
+
+	def error_received (self, exc):
+		# called by the event loop (outside of any testcase) -> cannot
+		# be logged as an event of the testcase
+		log.error ("Error in datagram port %s: %s", self.__name__, exc)
+
+	@typecheck
+	def enqueue (self, msg: Message):
+		assert isinstance (msg.get_binary(), bytes) # supports only byte-aligned data
+
+		if self.__transport is None:
+			raise exceptions.PortNotConnected()
+
+		self.__transport.sendto (msg.get_binary())
+
 class EventMessageSent (metaclass = logger.LogEventClass):
 	fields = (("port", BaseMessagePort),
 		  ("message", Message),
@@ -36,7 +36,7 @@
 
 """
 
-import numbers, threading, types
+import asyncio, numbers, threading, types, weakref
 
 from	ttproto.core.typecheck	import *
 from	ttproto.core		import clock, exceptions, logger, named
@@ -48,9 +48,11 @@ _all__ = [
 	'SnapshotBlock',
 	'AltBlock',
 	'SnapshotManager',
+	'AsyncSnapshotManager',
 	'repeat',
 	'SnapshotContext',
 	'alt',
+	'async_alt',
 	'EventSource',
 	'Event',
 	'EventMatch',
@@ -148,6 +150,59 @@ class AltBlock (SnapshotBlock):
 #		print "leave alt match"
 		return None
 
+class BranchIndex:
+	"""Index of the branches of a stack of snapshot blocks by event source
+
+	The branches are listed in the order they are evaluated by
+	AltBlock.match(). For each event source, the index keeps the
+	positions of the branches listening to this source, so that after
+	the first snapshot only the branches whose sources were updated
+	need to be evaluated again.
+	"""
+
+	@typecheck
+	def __init__ (self, block: SnapshotBlock):
+		self.__branches = []
+		self.__positions = {}	# source -> [positions of its branches]
+		sources = set()
+
+		for b in block.stack():
+			indexed = isinstance (b, AltBlock)
+			for g in b.branch_list:
+				for s in g.event.get_sources():
+					sources.add (s)
+					if indexed:
+						self.__positions.setdefault (s, []).append (len (self.__branches))
+				if indexed:
+					self.__branches.append (g)
+
+		self.__sources = frozenset (sources)
+
+	def get_sources (self) -> frozenset:
+		return self.__sources
+
+	def match (self, sources = None) -> "optional (EventMatch)":
+		"""Evaluate the branches in order
+
+		If 'sources' is given, only the branches listening to one of
+		these sources are evaluated.
+		"""
+		if sources is None:
+			branches = self.__branches
+		else:
+			positions = set()
+			for s in sources:
+				positions.update (self.__positions.get (s, ()))
+			branches = [self.__branches[p] for p in sorted (positions)]
+
+		for g in branches:
+			em = g.match()
+			if em:
+				# matched the event!
+				em.set_branch (g)
+				return em
+		return None
+
 #TODO: the 'editable' concept is not very clear -> document clearly when a block is no longer editable and what are the implications
 class SnapshotManager:
 	"""SnapshotManager is the main class controling the snapshot semantics.
@@ -203,11 +258,8 @@ class SnapshotManager:
 		def __iter__ (self):
 			return self.__set.__iter__()
 
-		@typecheck
-		def update (self, block: SnapshotBlock):
-			new_set = set()
-			for s in block.get_sources():
-				new_set.add (s)
+		def update (self, sources):
+			new_set = set (sources)
 
 			# grab the new sources
 			for s in new_set.difference (self.__set):
@@ -277,6 +329,11 @@ class SnapshotManager:
 			assert self.handler is None
 			self.handler = func
 
+		def __await__ (self):
+			# awaiting a branch evaluates it alone in an alt block
+			# (from an asyncio task)
+			return async_alt (self).__await__()
+
 	class Thread (threading.Thread):
 		"""A thread tied to the local snapshot manager.
 
@@ -308,6 +365,10 @@ class SnapshotManager:
 			with sm.track():
 				self.__target(*k, **kw)
 
+		def set_logger (self, l: logger.Logger):
+			"""Set the logger of this thread (instead of the default logger)"""
+			self.__logger = l
+
 		def log_event (self, event: logger.LogEvent):
 			self.__logger.log_event (event)
 
@@ -319,6 +380,7 @@ class SnapshotManager:
 			self.__thread = threading.currentThread()
 
 			self.__sources = SnapshotManager.Sources (self)
+			self.__updated = set()	# sources updated since the last snapshot
 			self.__block = None
 			self.__interrupted = False
 
@@ -333,6 +395,7 @@ class SnapshotManager:
 
 	def reset (self):
 		self.__sources.clear()
+		self.__updated.clear()
 		self.__block = None
 		self.__interrupted = False
 
@@ -355,6 +418,13 @@ class SnapshotManager:
 				assert self in self.__tracked_managers
 				del self.__tracked_managers[self]
 
+				blocked = not any (self.__tracked_managers.values())
+
+			# the remaining threads may all be waiting already
+			# -> notify the clock (nobody else will)
+			if blocked:
+				clock.Clock.get_instance().all_threads_blocked()
+
 	def __track_wake_up (self):
 		with self.__tracked_lock:
 			if self in self.__tracked_managers:
@@ -381,19 +451,25 @@ class SnapshotManager:
 
 	def run (self) -> "optional(EventMatch)":
 
-		self.__obsolete = True # FIXME: not very clean to touch it when not locked
+		index = BranchIndex (self.__block)
+
+		# the first snapshot (and the ones following a repeat) cover
+		# all the sources, the next ones only the updated sources
+		full = True
+		first = True
 
 		try:
+			with self.__lock:
+				# grab the sources
+				self.__sources.update (index.get_sources())
+
 			while True:
 				with self.__lock:
 					if self.__interrupted:
 						raise exceptions.UserInterrupt()
 
-					# update the list of sources
-					self.__sources.update (self.__block)
-
 					# possibly wait for new events
-					if not self.__obsolete:
+					if not (first or self.__updated):
 
 						self.__track_wait()
 
@@ -404,22 +480,31 @@ class SnapshotManager:
 							raise exceptions.UserInterrupt()
 
 					# make the snapshot
-					for s in self.__sources:
-						s.evaluate_snapshot()
+					updated = set (self.__sources) if full else self.__updated
+					self.__updated = set()
 
-					self.__obsolete = False
+					for s in updated:
+						s.evaluate_snapshot()
 
 				try:
-					event_match = self.__block.match()
-					if event_match:
-						# force the reevaluation of the snapshot (we may have received 2 events at once)
-						self.__obsolete = True # FIXME: not very clean to touch it when not locked
+					event_match = index.match (None if full else updated)
+					full = first = False
 
+					if event_match:
 						event_match.call_handler()
 						return event_match
 				except SnapshotManager.Repeat:
 #					print "repeat"
-					pass
+					# the handler may have changed the blocks (eg.
+					# activated an altstep) -> index them again
+					index = BranchIndex (self.__block)
+					with self.__lock:
+						self.__sources.update (index.get_sources())
+
+					# take the next snapshot without waiting (as the
+					# first one)
+					full = True
+					first = True
 		finally:
 			# clear the source list
 			self.__sources.clear()
@@ -461,8 +546,9 @@ class SnapshotManager:
 	def lock (self):
 		self.__lock.acquire()
 
-	def unlock (self):
-		self.__obsolete = True
+	def unlock (self, source: "optional (EventSource)" = None):
+		if source is not None:
+			self.__updated.add (source)
 		self.__cond_update.notify()
 		self.__track_wake_up()
 		self.__lock.release()
@@ -489,6 +575,162 @@ class SnapshotManager:
 
 		if self.__block and not keep_editable:
 			self.__block.__editable = False
+
+try:
+	_current_task = asyncio.current_task
+except AttributeError:
+	_current_task = asyncio.Task.current_task	# python < 3.7
+
+class AsyncSnapshotManager:
+	"""Snapshot manager of an asyncio task
+
+	This is the asyncio counterpart of SnapshotManager: there is one
+	AsyncSnapshotManager object associated to each task performing
+	snapshot operations, created the first time it is needed by the task.
+
+	Instead of blocking the thread on a condition variable, run() is a
+	coroutine that awaits the events of its sources, so that many
+	components can be run concurrently by a single event loop.
+
+	The branches are created with Event.branch() and evaluated with
+	async_alt() (or by awaiting a single branch).
+
+	Example:
+		t = Timer (10)
+		await link1.receive.branch (ping_reply_msg)
+
+		em = await async_alt (link1.receive.branch(), t.timeout.branch())
+		if em.get_event() is t.timeout:
+			set_verdict (fail)
+
+	NOTE: the sources are expected to be updated from the thread running
+	the loop (eg. by an AsyncioClock and DatagramMessagePort objects),
+	updates from other threads are forwarded to the loop.
+	"""
+
+	# Key:   asyncio.Task object
+	# Value: AsyncSnapshotManager of the task
+	__task_managers = weakref.WeakKeyDictionary()
+
+	def __new__ (cls):
+		try:
+			task = _current_task()
+		except RuntimeError:
+			task = None
+		if task is None:
+			raise exceptions.Error ("AsyncSnapshotManager must be used from an asyncio task")
+
+		self = cls.__task_managers.get (task)
+		if self is None:
+			self = super (AsyncSnapshotManager, cls).__new__(cls)
+
+			self.__task = weakref.ref (task)
+			self.__loop = asyncio.get_event_loop()
+			self.__thread_id = threading.get_ident()
+
+			self.__sources = SnapshotManager.Sources (self)
+			self.__interrupted = False
+			self.__updated = set()	# sources updated since the last snapshot
+			self.__wake_up = asyncio.Event()
+
+			self.__logger = logger.Logger.get_default()
+
+			cls.__task_managers[task] = self
+		return self
+
+	def __repr__ (self):
+		return "<AsyncSnapshotManager %s>" % repr (self.__task())
+
+	def reset (self):
+		self.__sources.clear()
+		self.__updated.clear()
+		self.__interrupted = False
+
+	def interrupt (self):
+		self.__interrupted = True
+		self.unlock()
+
+	async def run (self, block: SnapshotBlock) -> "optional(EventMatch)":
+		index = BranchIndex (block)
+
+		# see SnapshotManager.run()
+		full = True
+		first = True
+
+		try:
+			# grab the sources
+			self.__sources.update (index.get_sources())
+
+			while True:
+				if self.__interrupted:
+					raise exceptions.UserInterrupt()
+
+				# possibly wait for new events
+				if not (first or self.__updated):
+					self.__wake_up.clear()
+					await self.__wake_up.wait()
+
+					if self.__interrupted:
+						raise exceptions.UserInterrupt()
+
+				# make the snapshot
+				updated = set (self.__sources) if full else self.__updated
+				self.__updated = set()
+
+				for s in updated:
+					s.evaluate_snapshot()
+
+				try:
+					event_match = index.match (None if full else updated)
+					full = first = False
+
+					if event_match:
+						event_match.call_handler()
+						return event_match
+				except SnapshotManager.Repeat:
+					# see SnapshotManager.run()
+					index = BranchIndex (block)
+					self.__sources.update (index.get_sources())
+
+					full = True
+					first = True
+		finally:
+			# clear the source list
+			self.__sources.clear()
+
+	async def alt (self, *branches) -> "optional(EventMatch)":
+		"""Evaluate a list of branches (created with Event.branch())
+		in an alt block"""
+		block = AltBlock()
+		block.branch_list.extend (branches)
+
+		return await self.run (block)
+
+	def lock (self):
+		pass
+
+	def unlock (self, source = None):
+		if threading.get_ident() == self.__thread_id:
+			self.__notify (source)
+		else:
+			self.__loop.call_soon_threadsafe (self.__notify, source)
+
+	def __notify (self, source):
+		if source is not None:
+			self.__updated.add (source)
+		self.__wake_up.set()
+
+	def log_event (self, event: logger.LogEvent):
+		self.__logger.log_event (event)
+
+async def async_alt (*branches) -> "optional(EventMatch)":
+	"""Evaluate a list of branches in an alt block from an asyncio task
+
+	The branches are created with Event.branch(), the alt block is
+	evaluated by the AsyncSnapshotManager of the current task.
+	"""
+	return await AsyncSnapshotManager().alt (*branches)
+
 def repeat():
 	raise SnapshotManager.Repeat()
 
@@ -525,14 +767,14 @@ class EventSource:
 		self.lock	= EventSource.Lock (self)
 
 	@typecheck
-	def set_listener (self, listener: SnapshotManager):
+	def set_listener (self, listener: either (SnapshotManager, AsyncSnapshotManager)):
 		with self.__lock:
 			assert self.__listener is None  # TODO: report an error if not
 
 			self.__listener = listener
 
 	@typecheck
-	def clear_listener (self, listener: SnapshotManager):
+	def clear_listener (self, listener: either (SnapshotManager, AsyncSnapshotManager)):
 		with self.__lock:
 			assert self.__listener == listener
 
@@ -545,7 +787,7 @@ class EventSource:
 
 	def _unlock (self):
 		if self.__listener:
-			self.__listener.unlock()
+			self.__listener.unlock (self)
 		self.__lock.release()
 
 class Event:
@@ -567,6 +809,14 @@ class Event:
 			# FIXME: might not be a good idea (because this function would not be called if it is not a tag)
 			return SnapshotManager().push_event (self) (*k, **kw)
 
+	def branch (self, *k, **kw) -> "SnapshotManager.Branch":
+		"""Create a branch on this event without pushing it into the
+		current snapshot block
+
+		This is used by the asyncio tasks (see AsyncSnapshotManager)
+		"""
+		return SnapshotManager.Branch (self, *k, **kw)
+
 	@typecheck
 	def get_sources (self) -> iterable:
 		yield self.__source
@@ -636,6 +886,7 @@ class Timer (EventSource, logger.LoggedObject, named.NamedObject):
 		self.timeout = Event (self, "timeout")
 
 		self.__clock = None
+		self.__scheduled = None
 		self.__running = False
 
 		if duration is not None:
@@ -647,14 +898,14 @@ class Timer (EventSource, logger.LoggedObject, named.NamedObject):
 	def start (self, duration):
 		with self.lock:
 			# cancel the previous timer if any
-			if self.__clock:
-				self.__clock.unschedule_events (self.__callback)
+			if self.__scheduled:
+				self.__scheduled.cancel()
 
 			# start a new timer
 			self.__running = True
 			self.__clock   = clock.Clock.get_instance()
 
-			self.__clock.schedule_event_relative (duration, self.__callback)
+			self.__scheduled = self.__clock.schedule_event_relative (duration, self.__callback)
 
 		self.log (EventTimerStarted, duration)
 
@@ -662,7 +913,8 @@ class Timer (EventSource, logger.LoggedObject, named.NamedObject):
 	def stop (self):
 		with self.lock:
 			if self.__clock:
-				self.__clock.unschedule_events (self.__callback)
+				self.__scheduled.cancel()
+				self.__scheduled = None
 				self.__clock = None
 				self.__running = False
 
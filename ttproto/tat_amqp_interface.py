@@ -52,7 +52,8 @@ from ttproto import TMPDIR
 from ttproto import LOGDIR
 
 from ttproto import LOG_LEVEL
-from ttproto.tat_services import analyze_capture, dissect_capture, get_test_cases, base64_to_pcap_file
+from ttproto.tat_services import analyze_capture, dissect_capture, get_test_cases, base64_to_pcap_file, \
+    start_live_analysis
 
 from ttproto.core.typecheck import typecheck, optional, either
 from ttproto.utils import pure_pcapy
@@ -79,7 +80,7 @@ logger = logging.getLogger(__name__)
 #####################
 
 
-def launch_tat_amqp_interface(amqp_url, amqp_exchange, tat_protocol, dissection_auto):
+def launch_tat_amqp_interface(amqp_url, amqp_exchange, tat_protocol, dissection_auto, live_analysis=False):
     """
     Att this is blocking. Launches the TAT AMQP interface.
     See doc for more info about the AMQP API endpoints
@@ -92,15 +93,19 @@ def launch_tat_amqp_interface(amqp_url, amqp_exchange, tat_protocol, dissection_
             amqp_interface.stop()
 
     signal.signal(signal.SIGINT, signal_int_handler)
-    amqp_interface = AmqpInterface(amqp_url, amqp_exchange, tat_protocol, dissection_auto)
+    amqp_interface = AmqpInterface(amqp_url, amqp_exchange, tat_protocol, dissection_auto, live_analysis)
     amqp_interface.run()
 
 
 class AmqpInterface:
-    def __init__(self, amqp_url, amqp_exchange, tat_protocol, dissection_auto):
+    def __init__(self, amqp_url, amqp_exchange, tat_protocol, dissection_auto, live_analysis=False):
         self.COMPONENT_ID = 'tat|amqp_interface'
         self.tat_protocol = tat_protocol
         self.dissection_auto = dissection_auto
+        self.live_analysis = live_analysis
+
+        # live analysis of the test case running (if live_analysis option)
+        self.live_analyzer = None
 
         self.logger = logging.getLogger(self.COMPONENT_ID)
         self.logger.setLevel(LOG_LEVEL)
@@ -150,6 +155,24 @@ class AmqpInterface:
                                     queue=self.data_queue_name,
                                     routing_key='fromAgent.#.packet.raw')
 
+        if self.live_analysis:
+            self.live_queue_name = 'live_analysis@%s' % self.COMPONENT_ID
+            self.channel.queue_declare(queue=self.live_queue_name,
+                                       auto_delete=True,
+                                       arguments={'x-max-length': 1000})
+
+            self.channel.basic_qos(prefetch_count=1)
+            self.channel.basic_consume(self.on_live_analysis_event, queue=self.live_queue_name)
+
+            # subscribe to data events, and to the test case events delimiting the live analysis
+            for routing_key in ('fromAgent.#.packet.raw',
+                                messages.MsgTestCaseStarted.routing_key,
+                                messages.MsgTestCaseFinished.routing_key,
+                                messages.MsgTestCaseStop.routing_key):
+                self.channel.queue_bind(exchange=AMQP_EXCHANGE,
+                                        queue=self.live_queue_name,
+                                        routing_key=routing_key)
+
     def run(self):
         # let's send bootstrap message (analysis)
         event_bus_utils.publish_message(
@@ -254,6 +277,92 @@ class AmqpInterface:
         else:
             self.logger.debug('Unknonwn message. Message dropped: %s' % event_received)
 
+    def on_live_analysis_event(self, ch, method, props, body):
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+        try:
+            event_received = messages.Message.load_from_pika(method, props, body)
+        except Exception as e:
+            self.logger.error(str(e))
+            return
+
+        if isinstance(event_received, messages.MsgTestCaseStarted):
+            # a test case started before this one didn't finish
+            self._finish_live_analysis()
+
+            testcase_id = event_received.testcase_id
+            try:
+                self.live_analyzer = start_live_analysis(
+                    protocol=self.tat_protocol,
+                    testcase_ids=[testcase_id] if testcase_id else None
+                )
+            except Exception as e:
+                self.logger.error("Couldn't start live analysis of %s: %s" % (testcase_id, e))
+                return
+
+            self.logger.info("Live analysis started for %s" % testcase_id)
+
+        elif isinstance(event_received, (messages.MsgTestCaseFinished, messages.MsgTestCaseStop)):
+            self._finish_live_analysis()
+
+        elif isinstance(event_received, messages.MsgPacketSniffedRaw):
+            if self.live_analyzer is None:
+                return
+
+            if 'serial' in event_received.interface_name:
+                datalink = pure_pcapy.DLT_IEEE802_15_4_NOFCS
+            elif 'tun' in event_received.interface_name:
+                datalink = pure_pcapy.DLT_RAW
+            else:
+                self.logger.error('Not implemented protocol analysis for %s' % event_received.interface_name)
+                return
+
+            timestamp = getattr(event_received, 'timestamp', None) or time.time()
+
+            try:
+                self.live_analyzer.add_frame(float(timestamp), bytes(event_received.data), datalink)
+                analysis_results = self.live_analyzer.update()
+            except Exception as e:
+                self.logger.error("Error in live analysis: %s" % e)
+                return
+
+            for result in analysis_results:
+                self._publish_live_analysis_result(result, final=False)
+
+        else:
+            self.logger.debug('Unknonwn message. Message dropped: %s' % event_received)
+
+    def _finish_live_analysis(self):
+        if self.live_analyzer is None:
+            return
+
+        try:
+            analysis_results = self.live_analyzer.finish()
+        except Exception as e:
+            self.logger.error("Error in live analysis: %s" % e)
+            analysis_results = []
+        finally:
+            self.live_analyzer = None
+
+        for result in analysis_results:
+            self._publish_live_analysis_result(result, final=True)
+
+        self.logger.info("Live analysis finished (%s verdicts sent)" % len(analysis_results))
+
+    def _publish_live_analysis_result(self, result, final):
+        event_bus_utils.publish_message(
+            self.connection,
+            messages.MsgInteropTestCaseAnalysisLive(
+                final=final,
+                verdict=result[1],
+                description=result[3],
+                review_frames=result[2],
+                partial_verdicts=result[4],
+                testcase_id=result[0],
+                testcase_ref=None,
+            )
+        )
+
     def on_service_request(self, ch, method, props, body):
         ch.basic_ack(delivery_tag=method.delivery_tag)
 
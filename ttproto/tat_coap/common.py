@@ -31,7 +31,9 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
+import heapq
 import re
+import weakref
 from collections import OrderedDict
 from .templates import *
 from ttproto.core.analyzer import TestCase, is_protocol, Node, Conversation, Capture
@@ -51,6 +53,15 @@ MAX_TIMEOUT = 10 + round(
 )
 
 
+# Stimulus indexes of the captures being analysed, the CoAP conversations of a
+# capture are extracted and indexed once, then shared by all the test cases
+_stimulus_indexes = weakref.WeakKeyDictionary()
+
+# Blockwise transfers of the captures being analysed, with the number of frames
+# of the capture already added to their reassembler
+_block_reassemblers = weakref.WeakKeyDictionary()
+
+
 class NoStimuliFoundForTestcase(Error):
     """
     Error raised when no stimuli was defined for the testcase
@@ -65,6 +76,314 @@ class FilterError(Error):
     pass
 
 
+def _get_endpoints(frame: Frame) -> (tuple, tuple):
+    """
+    Get the source and destination (address, port) of a CoAP frame
+    """
+    src = dst = None
+    value = frame['value']
+    while not isinstance(value, UDP):
+        if isinstance(value, (IPv6, IPv4)):
+            src, dst = value['src'], value['dst']
+        value = value['pl']
+
+    return (src, value['sport']), (dst, value['dport'])
+
+
+class CoAPStimulusIndex:
+    """
+    Index of the frames of a list of conversations by discriminating CoAP
+    fields: message type, code and first Uri-Path segment.
+
+    The index is built once per capture (i.e. once per list of extracted
+    conversations) and is then used to look up the frames matching a
+    stimulus. Stimulus templates are only matched against the frames whose
+    discriminating fields are compatible with the stimulus, instead of
+    against every frame of every conversation.
+
+    Fields of the stimulus which are not plain values (eg: Any(65, 68), or
+    an All() template for the options) act as wildcards in the lookup.
+    """
+
+    @typecheck
+    def __init__(self, conversations: list_of(Conversation)):
+        """
+        Build the index from the given conversations
+
+        :param conversations: The conversations extracted from the capture
+        :type conversations: [Conversation]
+        """
+        self._conversations = conversations
+
+        # Map a (type, code, uri_path) key to the frames having those values
+        self._frames_by_key = {}
+
+        # Map the repr of a stimulus to the stimulus, its key and the ids of
+        # the frames matching it
+        self._lookups = {}
+
+        for conv in conversations:
+            for frame in conv:
+                key = self.get_frame_key(frame[CoAP])
+                self._frames_by_key.setdefault(key, []).append(frame)
+
+    @typecheck
+    def add_frame(self, frame: Frame):
+        """
+        Index a frame which was added to one of the indexed conversations, the
+        results of the previous lookups are updated with it
+
+        :param frame: The frame added
+        :type frame: Frame
+        """
+        key = self.get_frame_key(frame[CoAP])
+        self._frames_by_key.setdefault(key, []).append(frame)
+
+        for stimulus, stimulus_key, matching_frames in self._lookups.values():
+            if self.__is_compatible(stimulus_key, key) and frame[CoAP] in stimulus:
+                matching_frames.add(id(frame))
+
+    @property
+    def conversations(self):
+        """
+        Get the conversations indexed
+
+        :return: The conversations indexed
+        :rtype: [Conversation]
+        """
+        return self._conversations
+
+    @staticmethod
+    def get_frame_key(coap: CoAP) -> tuple:
+        """
+        Get the discriminating key of a CoAP message
+
+        :param coap: The CoAP layer of a frame
+        :type coap: CoAP
+
+        :return: The (type, code, first Uri-Path segment) key, the Uri-Path
+                 segment is None if the message has no Uri-Path option
+        :rtype: (int, int, str)
+        """
+        uri_path = None
+        for opt in coap['opt']:
+            if isinstance(opt, CoAPOptionUriPath):
+                uri_path = str(opt['val'])
+                break
+
+        return int(coap['type']), int(coap['code']), uri_path
+
+    @staticmethod
+    def get_stimulus_key(stimulus: Value) -> tuple:
+        """
+        Get the discriminating key of a stimulus template
+
+        :param stimulus: The stimulus template
+        :type stimulus: Value
+
+        :return: The (type, code, first Uri-Path segment) key, where None
+                 stands for any value
+        :rtype: (int, int, str)
+        """
+
+        def as_key_field(field):
+            return field if isinstance(field, Value) else None
+
+        msg_type = as_key_field(stimulus['type'])
+        code = as_key_field(stimulus['code'])
+
+        uri_path = None
+        opt = stimulus['opt']
+        if isinstance(opt, Opt):
+            for uri_path_opt in opt.opts(CoAPOptionUriPath):
+                val = as_key_field(uri_path_opt['val'])
+                if val is not None:
+                    uri_path = str(val)
+                break
+
+        return (
+            None if msg_type is None else int(msg_type),
+            None if code is None else int(code),
+            uri_path
+        )
+
+    @typecheck
+    def lookup(self, stimulus: Value) -> set:
+        """
+        Get the frames matching a stimulus
+
+        Only the frames found in the index for the discriminating fields of
+        the stimulus are matched against the whole template.
+
+        :param stimulus: The stimulus template
+        :type stimulus: Value
+
+        :return: The set of ids of the frames matching the stimulus
+        :rtype: {int}
+        """
+        cache_key = repr(stimulus)
+        try:
+            return self._lookups[cache_key][2]
+        except KeyError:
+            pass
+
+        stimulus_key = self.get_stimulus_key(stimulus)
+
+        matching_frames = set()
+        for key, frames in self._frames_by_key.items():
+            if self.__is_compatible(stimulus_key, key):
+                for frame in frames:
+                    if frame[CoAP] in stimulus:
+                        matching_frames.add(id(frame))
+
+        self._lookups[cache_key] = stimulus, stimulus_key, matching_frames
+        return matching_frames
+
+    @staticmethod
+    def __is_compatible(stimulus_key: tuple, key: tuple) -> bool:
+        return all(s is None or s == k for s, k in zip(stimulus_key, key))
+
+
+class CoAPConversationTracker:
+    """
+    Incremental extraction of the CoAP conversations of a capture.
+
+    Frames are added in the order of the capture. A CoAP frame joins the
+    conversation of its token, or for an ACK or a RST, the conversation of
+    the message it acknowledges. A frame with a new token starts a new
+    conversation. Frames without the protocol under test, and duplicated or
+    orphan ACK and RST frames are ignored.
+    """
+
+    @typecheck
+    def __init__(self, protocol: is_protocol, nodes: list_of(Node)):
+        """
+        Initialize the tracker
+
+        :param protocol: The protocol under test
+        :param nodes: The nodes of the conversations
+        :type protocol: type
+        :type nodes: [Node]
+        """
+        self._protocol = protocol
+        self._nodes = nodes
+
+        self._conversations = []
+        self._frames_count = 0
+
+        # The frames without the protocol under test, and the other ignored
+        # frames (kept apart for preserving the order of extract_all_coap_conversations)
+        self._not_protocol_frames = []
+        self._ignored = []
+
+        # Map a token to the corresponding conversations.
+        self._tkn_to_conv = {}
+
+        # Map a MID of a frame to it's containing token.
+        # It's allow us to know to which conversation ACK frames belongs to
+        # even though ACK do not contains token.
+        self._mid_to_tkn = {}
+
+        # A set of CMID of messages for which we already saw an ACK.
+        # This set allows use to detect duplicated ACK.
+        self._acknowledged_CMID = set()
+
+        # Map the id of a frame to its conversation
+        self._frame_to_conv = {}
+
+    @property
+    def conversations(self):
+        """
+        Get the conversations extracted so far, the list is updated in place
+        when frames are added
+
+        :return: The conversations, ordered by their first frame
+        :rtype: [Conversation]
+        """
+        return self._conversations
+
+    @property
+    def ignored(self):
+        """
+        Get the frames ignored so far
+
+        :return: The ignored frames
+        :rtype: [Frame]
+        """
+        return self._not_protocol_frames + self._ignored
+
+    @property
+    def frames_count(self):
+        """
+        Get the number of frames added to the tracker
+
+        :return: The number of frames added
+        :rtype: int
+        """
+        return self._frames_count
+
+    @typecheck
+    def get_conversation(self, frame: Frame) -> optional(Conversation):
+        """
+        Get the conversation of a frame
+
+        :param frame: A frame added to the tracker
+        :type frame: Frame
+
+        :return: The conversation of the frame, None if it was ignored
+        :rtype: Conversation
+        """
+        return self._frame_to_conv.get(id(frame))
+
+    @typecheck
+    def add_frame(self, frame: Frame) -> optional(Conversation):
+        """
+        Add the next frame of the capture
+
+        :param frame: The frame to add
+        :type frame: Frame
+
+        :return: The conversation the frame was added to, None if it was ignored
+        :rtype: Conversation
+        """
+        self._frames_count += 1
+
+        if self._protocol not in frame:
+            self._not_protocol_frames.append(frame)
+            return None
+
+        CMID = frame[CoAP]["mid"]
+        CTOK = frame[CoAP]["tok"]
+
+        if frame[CoAP]["type"] == 2 or frame[CoAP]["type"] == 3:
+            if CMID in self._acknowledged_CMID:
+                # A duplicated ACK or RST
+                self._ignored.append(frame)
+                return None
+
+            self._acknowledged_CMID.add(CMID)
+            if CMID not in self._mid_to_tkn:
+                # An orphan ACK or RST
+                self._ignored.append(frame)
+                return None
+
+            conv = self._tkn_to_conv[self._mid_to_tkn[CMID]]
+            conv.append(frame)
+        else:
+            if CTOK in self._tkn_to_conv:
+                conv = self._tkn_to_conv[CTOK]
+                conv.append(frame)
+            else:  # First time we encounter the token "CTOK".
+                conv = Conversation(self._nodes)
+                conv.append(frame)
+                self._tkn_to_conv[CTOK] = conv
+                self._conversations.append(conv)
+            self._mid_to_tkn[CMID] = CTOK
+
+        self._frame_to_conv[id(frame)] = conv
+        return conv
+
+
 class CoAPTestCase(TestCase):
     """
     The test case extension representing a CoAP test case
@@ -125,14 +444,152 @@ class CoAPTestCase(TestCase):
             raise NoStimuliFoundForTestcase(
                 'Expected stimuli declaration from the test case for running pre-process and filtering of frames'
             )
-        conversations_created_by_token, ignored = cls.extract_all_coap_conversations(capture)
-        conversations_correlated_for_testcases = cls.correlate(conversations_created_by_token, expected_frames_pattern)
-        return conversations_correlated_for_testcases, ignored
+        stimulus_index, ignored = cls.get_stimulus_index(capture)
+        conversations_correlated_for_testcases = cls.correlate(
+            stimulus_index.conversations,
+            expected_frames_pattern,
+            stimulus_index
+        )
+        return conversations_correlated_for_testcases, list(ignored)
+
+    @classmethod
+    @typecheck
+    def get_stimulus_index(cls, capture: Capture) -> (CoAPStimulusIndex, list_of(Frame)):
+        """
+        Get the stimulus index of the CoAP conversations of a capture.
+
+        The conversations are extracted and indexed the first time, then the
+        index is reused by every test case analysing the same capture.
+
+        :param capture: The capture to index
+        :type capture: Capture
+
+        :return: The stimulus index and the frames ignored while extracting
+                 the conversations
+        :rtype: (CoAPStimulusIndex, [Frame])
+        """
+        try:
+            tracker, stimulus_index = _stimulus_indexes[capture]
+        except KeyError:
+            tracker = cls.get_conversation_tracker()
+            for frame in capture.frames:
+                tracker.add_frame(frame)
+            stimulus_index = CoAPStimulusIndex(tracker.conversations)
+            _stimulus_indexes[capture] = tracker, stimulus_index
+        else:
+            # Catch up with the frames added since then to a live capture
+            for frame in capture.frames[tracker.frames_count:]:
+                if tracker.add_frame(frame) is not None:
+                    stimulus_index.add_frame(frame)
+
+        return stimulus_index, tracker.ignored
+
+    @classmethod
+    @typecheck
+    def get_block_reassembler(cls, capture: Capture) -> CoAPBlockReassembler:
+        """
+        Get the reassembler of the blockwise transfers of a capture.
+
+        The transfers are reassembled the first time, then the reassembler is
+        reused by every test case analysing the same capture.
+
+        :param capture: The capture
+        :type capture: Capture
+
+        :return: The reassembler fed with all the CoAP frames of the capture
+        :rtype: CoAPBlockReassembler
+        """
+        try:
+            reassembler, count = _block_reassemblers[capture]
+        except KeyError:
+            reassembler, count = CoAPBlockReassembler(), 0
+
+        frames = capture.frames
+        for frame in frames[count:]:
+            if CoAP in frame:
+                src, dst = _get_endpoints(frame)
+                reassembler.add(frame[CoAP], src, dst, frame['ts'], frame)
+        _block_reassemblers[capture] = reassembler, len(frames)
+
+        return reassembler
+
+    @classmethod
+    @typecheck
+    def get_conversation_tracker(cls) -> CoAPConversationTracker:
+        """
+        Get a new tracker for extracting the CoAP conversations of a capture
+
+        :return: The conversation tracker
+        :rtype: CoAPConversationTracker
+        """
+        protocol = cls.get_protocol()
+        nodes = cls.get_nodes_identification_templates()
+
+        # TODO what happens if no protocol declared on the test case?
+        if not nodes or len(nodes) < 2:
+            raise ValueError(
+                'Expected at leaset two nodes declaration from the test case'
+            )
+        if not protocol:
+            raise ValueError(
+                'Expected a protocol under test declaration from the test case'
+            )
+
+        return CoAPConversationTracker(protocol, nodes)
+
+    @classmethod
+    @typecheck
+    def is_related_frame(cls, capture: Capture, frame: Frame) -> bool:
+        """
+        Check if the frame belongs to a conversation of the capture in which
+        one of the stimulis of the test case was found.
+
+        :param capture: The capture containing the frame
+        :param frame: The frame
+        :type capture: Capture
+        :type frame: Frame
+
+        :return: True if the frame belongs to a stimulated conversation
+        :rtype: bool
+        """
+        # Make sure the conversations are up to date with the capture
+        cls.get_stimulus_index(capture)
+        tracker, stimulus_index = _stimulus_indexes[capture]
+
+        conv = tracker.get_conversation(frame)
+        if conv is None:
+            return False
+
+        conv_frames = set(id(f) for f in conv)
+        return any(
+            not conv_frames.isdisjoint(stimulus_index.lookup(stimulis))
+            for stimulis in cls.get_stimulis()
+        )
+
+    @classmethod
+    @typecheck
+    def is_stimulated(cls, capture: Capture) -> bool:
+        """
+        Check through the stimulus index of the capture if any of its frames
+        matches one of the stimulis of the test case.
+
+        :param capture: The capture to check
+        :type capture: Capture
+
+        :return: True if at least one frame matches a stimulis
+        :rtype: bool
+        """
+        stimulus_index, _ = cls.get_stimulus_index(capture)
+        return any(
+            stimulus_index.lookup(stimulis)
+            for stimulis in cls.get_stimulis()
+        )
 
     @classmethod
     @typecheck
     def correlate(cls, conversations: list_of(Conversation),
-                  expected_frames_pattern: list_of(Value)) -> list_of(Conversation):
+                  expected_frames_pattern: list_of(Value),
+                  stimulus_index: optional(CoAPStimulusIndex) = None) -> list_of(Conversation):
         """
         Correlates related conversations.
         Conversations related to a test case, having several
@@ -278,15 +735,27 @@ class CoAPTestCase(TestCase):
         with single TC able to being executed several times.
         Each different instance of the TC will have a different Conversation.
 
+        The stimulis are looked up through a CoAPStimulusIndex of the
+        conversations. If none is given, one is built for this call, callers
+        correlating the same conversations against several TCs should build
+        it once and pass it along.
+
         """
         # TODO Adding an example in the documentation above.
+        if stimulus_index is None:
+            stimulus_index = CoAPStimulusIndex(conversations)
+
+        frames_matching_stimulis = [
+            stimulus_index.lookup(stimulis)
+            for stimulis in expected_frames_pattern
+        ]
         conversations_matching_stimulis = cls.__get_all_matching_conversations(
             conversations,
-            expected_frames_pattern
+            frames_matching_stimulis
         )
         conversations_to_merge = cls.__get_conversation_to_merge(
             conversations_matching_stimulis,
-            expected_frames_pattern
+            frames_matching_stimulis[0]
         )
         return cls.__merge_all_conversations_to_merge(conversations_to_merge)
 
@@ -319,29 +788,54 @@ class CoAPTestCase(TestCase):
         """
         Merge the given conversations into a single one.
         The given conversation should be belong to the same instance of the same TC.
+
+        The first conversation is used as base conversation. Before each of
+        its frames, every other conversation not merged yet, and starting
+        before that frame, is inserted as a whole (in the order of the
+        given list). Once the base conversation is exhausted, the next
+        conversation not merged yet becomes the base one.
+
+        Conversations not merged yet are kept in a heap ordered by the
+        timestamp of their first frame, and merged ones are tracked by
+        identity, so the merge is O(n log n) in the number of
+        conversations plus linear in the number of frames.
         """
         nodes = cls.get_nodes_identification_templates()
         merged_conversation = Conversation(nodes)
 
-        # The list of conversations already merged,
+        # The ids of the conversations already merged,
         # used to avoid processing two time the same one several times.
-        added_in_merged_conv = list()
+        added_in_merged_conv = set()
+
+        # The conversations not merged yet, by timestamp of their first frame
+        # then by position in the given list
+        pending = [
+            (conv[0].timestamp, position, conv)
+            for position, conv in enumerate(conversations_to_merge)
+            if len(conv) > 0
+        ]
+        heapq.heapify(pending)
 
         for conv in conversations_to_merge:
-            if conv in added_in_merged_conv:
+            if id(conv) in added_in_merged_conv:
                 continue  # Already treated
+            added_in_merged_conv.add(id(conv))
+
             for frame in conv:
-                for other_conv in conversations_to_merge:
-                    if other_conv is not conv \
-                            and other_conv[0].timestamp < frame.timestamp \
-                            and other_conv not in added_in_merged_conv:
-                        # We check at the first frame of other conversation to see
-                        # if there is any correlation.
-                        for other_frame in other_conv:
-                            merged_conversation.append(other_frame)
-                            added_in_merged_conv.append(other_conv)
+                # Pop the conversations starting before this frame
+                starting_before = []
+                while pending and pending[0][0] < frame.timestamp:
+                    _, position, other_conv = heapq.heappop(pending)
+                    if id(other_conv) not in added_in_merged_conv:
+                        starting_before.append((position, other_conv))
+
+                # Insert them whole, in the order of the given list
+                starting_before.sort(key=lambda item: item[0])
+                for _, other_conv in starting_before:
+                    merged_conversation.extend(other_conv)
+                    added_in_merged_conv.add(id(other_conv))
+
                 merged_conversation.append(frame)
-            added_in_merged_conv.append(conv)
 
         return merged_conversation
 
@@ -350,30 +844,27 @@ class CoAPTestCase(TestCase):
     def __get_all_matching_conversations(
             cls,
             conversations: list_of(Conversation),
-            expected_frames_pattern: list_of(Value)
+            frames_matching_stimulis: list_of(set)
     ) -> list_of(Conversation):
         """
 
         Retrieve a list of all conversations that correspond to any stimulis
         of the test cases (see get_stimulis()).
 
+        :param frames_matching_stimulis: For each stimulis, the ids of the
+                                         frames matching it (see
+                                         CoAPStimulusIndex.lookup())
         """
         conversations_to_merge = list()
 
+        frames_matching_any_stimulis = set().union(*frames_matching_stimulis)
+
         for current_conversation in conversations:
-            for frame in current_conversation:
-                # conv_already_added is here to avoid doing useless iteration
-                # and adding several times the same conv.
-                conv_already_added = False
-                for stimulis in expected_frames_pattern:
-                    if frame[CoAP] in stimulis:
-                        # We only look at the first frame as stimulis are
-                        # Always query from client.
-                        conversations_to_merge.append(current_conversation)
-                        conv_already_added = True
-                        break
-                if conv_already_added:
-                    break
+            # A conversation is added once, as soon as one of its frames
+            # matches a stimulis.
+            if any(id(frame) in frames_matching_any_stimulis
+                   for frame in current_conversation):
+                conversations_to_merge.append(current_conversation)
 
         return conversations_to_merge
 
@@ -382,7 +873,7 @@ class CoAPTestCase(TestCase):
     def __get_conversation_to_merge(
             cls,
             conversations: list_of(Conversation),
-            expected_frames_pattern: list_of(Value)) \
+            frames_matching_first_stimulis: set) \
             -> list_of(list_of(Conversation)):
         """
         Retrieve a list 'outer' of list 'inter' with each conversations inside
@@ -401,10 +892,11 @@ class CoAPTestCase(TestCase):
         current_convs_to_merge = []
 
         for conv in conversations_maching_a_stimulis:
-            if conv[0][CoAP] in expected_frames_pattern[0] \
+            starts_with_first_stimulis = id(conv[0]) in frames_matching_first_stimulis
+            if starts_with_first_stimulis \
                     and len(current_convs_to_merge) == 0:
                 current_convs_to_merge.append(conv)
-            elif conv[0][CoAP] in expected_frames_pattern[0]:
+            elif starts_with_first_stimulis:
                 all_convs_to_merge.append(current_convs_to_merge)
                 current_convs_to_merge = []
                 current_convs_to_merge.append(conv)
@@ -422,63 +914,11 @@ class CoAPTestCase(TestCase):
             cls,
             capture: Capture) -> (list_of(Conversation), list_of(Frame)):
 
-        protocol = cls.get_protocol()
-        nodes = cls.get_nodes_identification_templates()
-
-        conversations = []
-        ignored = []
-
-        # TODO what happens if no protocol declared on the test case?
-        if not nodes or len(nodes) < 2:
-            raise ValueError(
-                'Expected at leaset two nodes declaration from the test case'
-            )
-        if not protocol:
-            raise ValueError(
-                'Expected a protocol under test declaration from the test case'
-            )
-        # Get the frames related with the protocol under test
-        frames, ignored = Frame.filter_frames(capture.frames, protocol)
-
-        # Map a token to the corresponding conversations.
-        tkn_to_conv = OrderedDict()
-
-        # Map a MID of a frame to it's containing token.
-        # It's allow us to know to which conversation ACK frames belongs to
-        # even though ACK do not contains token.
-        mid_to_tkn = OrderedDict()
-
-        # A set of CMID of messages for which we already saw an ACK.
-        # This set allows use to detect duplicated ACK.
-        acknowledged_CMID = set()
-
-        for frame in frames:
-            CMID = frame[CoAP]["mid"]
-            CTOK = frame[CoAP]["tok"]
-
-            if frame[CoAP]["type"] == 2 or frame[CoAP]["type"] == 3:
-                if CMID in acknowledged_CMID:
-                    # A duplicated ACK or RST
-                    ignored.append(frame)
-                    continue
-                else:
-                    acknowledged_CMID.add(CMID)
-                    if CMID not in mid_to_tkn:
-                        # An orphan ACK or RST
-                        ignored.append(frame)
-                    else:
-                        tkn_to_conv[mid_to_tkn[CMID]].append(frame)
-            else:
-                if CTOK in tkn_to_conv:
-                    tkn_to_conv[CTOK].append(frame)
-                else:  # First time we encounter the token "CTOK".
-                    conv = Conversation(nodes)
-                    conv.append(frame)
-                    tkn_to_conv[CTOK] = conv
-                mid_to_tkn[CMID] = CTOK
+        tracker = cls.get_conversation_tracker()
+        for frame in capture.frames:
+            tracker.add_frame(frame)
 
-        conversations = [tkn_to_conv[k] for k in tkn_to_conv.keys()]
-        return conversations, ignored
+        return tracker.conversations, tracker.ignored
 
     @typecheck
     def next_skip_ack(self, optional: bool = False):
@@ -499,6 +939,59 @@ class CoAPTestCase(TestCase):
         )):
             self.next(optional)
 
+    @typecheck
+    def get_block_transfer(self) -> optional(CoAPBlockwiseTransfer):
+        """
+        Get the blockwise transfer of the current frame
+
+        :return: The transfer the current frame carries a block of, None if
+                 it does not carry a block
+        :rtype: CoAPBlockwiseTransfer
+        """
+        if self._frame is None:
+            return None
+        return self.get_block_reassembler(self._capture).get_transfer(self._frame)
+
+    @typecheck
+    def check_block_transfer(self, szx: optional(int) = None) -> bool:
+        """
+        Check the representation reassembled from the blockwise transfer of
+        the current frame over the whole capture: the sequence of its blocks
+        (see CoAPBlockwiseTransfer.check_blocks) and its completeness. The
+        errors found set the verdict to fail.
+
+        :param szx: The block size exponent of the blocks following the
+                    first one (not checked if None)
+        :type szx: int
+
+        :return: True if the representation was fully reassembled from a
+                 valid sequence of blocks
+        :rtype: bool
+        """
+        tr = self.get_block_transfer()
+        if tr is None:
+            self.set_verdict('fail', 'the frame does not carry a block of a blockwise transfer')
+            return False
+
+        name = '%s transfer of %s' % (tr.option_type.__name__, tr.uri)
+        errors = tr.check_blocks(szx)
+        if tr.error:
+            errors.append(tr.error)
+        elif not tr.is_complete():
+            missing = ['[%d:%d]' % r for r in tr.missing()]
+            if tr.size is None:
+                missing.append('last block')
+            errors.append('missing %s' % ', '.join(missing))
+
+        for error in errors:
+            self.set_verdict('fail', '%s: %s' % (name, error))
+        if errors:
+            return False
+
+        self.log('%s: %d bytes reassembled from %d frames in %.3fs' % (
+            name, tr.size, len(tr.frames), tr.duration))
+        return True
+
     @property
     def coap(self) -> CoAP:
         """
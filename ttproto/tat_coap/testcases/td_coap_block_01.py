@@ -125,13 +125,10 @@ TD_COAP_BLOCK_01:
                     )):
                 break
 
-            if not self.match("server", CoAP (opt = Opt (CoAPOptionBlock2 (m=1)),
-                                pl = Length (bytes, server_size)
-                        ), None):
-                # Step 7 - no more blocks
-                self.match("server", CoAP (opt = Opt (CoAPOptionBlock2 (m=0)),
-                                pl = Length (bytes, (1, server_size))
-                        ), "fail")
+            if not self.match("server", CoAP (opt = Opt (CoAPOptionBlock2 (m=1))), None):
+                # Step 7 - no more blocks (the sizes of the blocks are
+                # checked on the reassembled representation)
+                self.check_block_transfer(server_szx)
 
                 # end of testcase
                 self.next_skip_ack(optional = True)
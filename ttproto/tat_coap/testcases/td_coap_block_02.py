@@ -117,7 +117,6 @@ TD_COAP_BLOCK_02:
                          opt = Opt(CoAPOptionBlock2(szx=Range(int, 0, server_szx)))))
 
         client_szx  = self.coap["opt"][CoAPOptionBlock2]["szx"]
-        client_size = 2**(client_szx+4)
 
         client_num  = self.coap["opt"][CoAPOptionBlock2]["num"]
 
@@ -143,13 +142,10 @@ TD_COAP_BLOCK_02:
                     )):
                 break
 
-            if not self.match("server", CoAP(opt = Opt(CoAPOptionBlock2(m=1)),
-                                pl = Length(bytes, client_size)
-                        ), None):
-                # Step 9 - no more blocks
-                self.match("server", CoAP(opt = Opt(CoAPOptionBlock2(m=0)),
-                                pl = Length(bytes,(1, client_size))
-                        ), "fail")
+            if not self.match("server", CoAP(opt = Opt(CoAPOptionBlock2(m=1))), None):
+                # Step 9 - no more blocks (the sizes of the blocks are
+                # checked on the reassembled representation)
+                self.check_block_transfer(client_szx)
 
                 # end of testcase
                 self.next_skip_ack(optional = True)
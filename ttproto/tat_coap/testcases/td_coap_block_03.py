@@ -103,7 +103,6 @@ TD_COAP_BLOCK_03:
                 )):
             return
         server_szx  = self.coap["opt"][CoAPOptionBlock1]["szx"]
-        server_size = 2**(server_szx+4)
 
         self.next_skip_ack()
 
@@ -127,14 +126,11 @@ TD_COAP_BLOCK_03:
                     ))
 
 
-            last = not self.match("client", CoAP (    opt = Opt (CoAPOptionBlock1 (m=1)),
-                                    pl = Length (bytes, server_size)
-                    ), None)
+            last = not self.match("client", CoAP (opt = Opt (CoAPOptionBlock1 (m=1))), None)
             if last:
-                # Step 6 - last block
-                self.match("client", CoAP (    opt = Opt (CoAPOptionBlock1 (m=0)),
-                                    pl = Length (bytes, (1, server_size))
-                        ), "fail")
+                # Step 6 - last block (the sizes of the blocks are checked
+                # on the reassembled representation)
+                self.check_block_transfer(server_szx)
 
             self.next_skip_ack()
 
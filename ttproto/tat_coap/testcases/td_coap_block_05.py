@@ -168,4 +168,5 @@ TD_COAP_BLOCK_05:
                         break
                     self.next()
                     j+=1
+                self.check_block_transfer()
         raise self.Stop()
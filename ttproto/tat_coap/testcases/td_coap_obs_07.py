@@ -153,6 +153,7 @@ TD_COAP_OBS_07:
         while (client_has_been_notified is False and
             Not(CoAP(type="con", code=4.04, opt = NoOpt(CoAPOptionObserve())))
             and not sent_notif_after_deletion):
+            frame = self._frame
             if (self.coap["mid"] == CMID_delete_request):
                 if self.match("server", CoAP(type="ack", code=2.02)):
                     server_has_confirmed_deletion = True
@@ -185,3 +186,8 @@ is present but there is no confirmation from the server (2.02 DELETED),\n nor 4.
                     self.set_verdict("fail", "Step 8-9: The server continued\
  to send notification after it's confirmed the deletion of the resource")
                     self.next()
+
+            # None of the steps matched the current frame, skip it (the end
+            # of the conversation stops the test case)
+            if self._frame is frame:
+                self.next()
@@ -1,15 +1,18 @@
 import os
 import time
+import glob
+import heapq
 import json
 import base64
 import hashlib
 import logging
+import multiprocessing
 
-from collections import OrderedDict
+from collections import OrderedDict, Counter
 
 from ttproto import LOG_LEVEL
 from ttproto.core.lib.all import *
-from ttproto.core.analyzer import Analyzer
+from ttproto.core.analyzer import Analyzer, LiveAnalyzer, TestCase
 from ttproto.core.dissector import Capture, get_dissectable_protocols
 from ttproto.core.typecheck import typecheck, optional, either
 from ttproto.utils.pcap_filter import remove_first_frames
@@ -21,6 +24,10 @@ from ttproto import DATADIR
 from ttproto import TMPDIR
 from ttproto import LOGDIR
 
+# Batch analysis
+BATCH_CAPTURE_EXTENSIONS = ('.pcap', '.pcapng')
+BATCH_SLOWEST_JOBS = 10
+
 # Prefix and suffix for the hashes
 HASH_PREFIX = 'tt'
 HASH_SUFFIX = 'proto'
@@ -60,6 +67,250 @@ def analyze_capture(filename, protocol, testcase_id, output_filename):
     return analysis_results
 
 
+def analyze_capture_all(filename, protocol, testcase_ids=None, output_filename=None):
+    """
+    Analyses network traces (.pcap file) based on the checks of several test cases (all by default), decoding the
+    traces only once.
+    """
+    assert filename
+    assert protocol
+
+    if os.path.isfile(filename) is False and os.path.isfile(os.path.join(TMPDIR, filename)):
+        filename = os.path.join(TMPDIR, filename)
+
+    logger.info("Analyzing PCAP file %s, for testcases: %s" % (filename, testcase_ids if testcase_ids else 'all'))
+
+    if protocol.lower() not in ALLOWED_PROTOCOLS_FOR_ANALYSIS:
+        raise NotImplementedError('Protocol %s not among the allowed analysis test suites' % protocol)
+
+    analysis_results = Analyzer('tat_' + protocol.lower()).analyse_all(filename, testcase_ids)
+    logger.info('Analysis finished. Got %s' % ['%s: %s' % (r[0], r[1]) for r in analysis_results])
+
+    if output_filename and type(output_filename) is str:
+        # save analysis responses
+        results_to_be_saved = [r[:-1] for r in analysis_results]  # drop the exceptions lists
+        _dump_json_to_file(json.dumps(results_to_be_saved), output_filename)
+        logger.info('Results saved at: %s' % output_filename)
+
+    return analysis_results
+
+
+def start_live_analysis(protocol, testcase_ids=None):
+    """
+    Starts the analysis of network traces while they are received (e.g. from the data plane of a live session), based
+    on the checks of several test cases (all by default). Frames are then added with the add_frame() method of the
+    returned LiveAnalyzer.
+    """
+    assert protocol
+
+    logger.info("Starting live analysis, for testcases: %s" % (testcase_ids if testcase_ids else 'all'))
+
+    if protocol.lower() not in ALLOWED_PROTOCOLS_FOR_ANALYSIS:
+        raise NotImplementedError('Protocol %s not among the allowed analysis test suites' % protocol)
+
+    return LiveAnalyzer('tat_' + protocol.lower(), testcase_ids)
+
+
+def analyze_captures_batch(source, protocol=None, testcase_ids=None, output_filename=None, processes=None):
+    """
+    Analyses a batch of network traces (.pcap files) over a pool of worker processes.
+
+    source is either a directory (all the captures it contains are analysed against the protocol's test suite) or a
+    manifest file listing one job per line as: <pcap file> [<protocol> [<testcase id>]] (relative paths are relative
+    to the manifest, empty lines and lines starting with # are ignored). The protocol is the one of the jobs which don't
+    give their own, it is required for a directory.
+    Workers import the test suites once when started, then get (pcap, testcase) jobs. A job without testcase analyses
+    the capture against all the test cases (or the testcase_ids ones) in a single pass.
+
+    Results are streamed as JSON lines (one per analysed testcase) to output_filename, or to the logger if none given.
+    Returns a summary with the throughput, the slowest jobs and the highest budgets usage of each testcase (see the
+    budgets of TestCase).
+    """
+    assert source
+
+    jobs = _get_batch_jobs(source, protocol.lower() if protocol else None, testcase_ids)
+    for job in jobs:
+        if not job[1]:
+            raise ValueError('No protocol given for the analysis of %s' % job[0])
+    for job_protocol in set(job[1] for job in jobs):
+        if job_protocol not in ALLOWED_PROTOCOLS_FOR_ANALYSIS:
+            raise NotImplementedError('Protocol %s not among the allowed analysis test suites' % job_protocol)
+
+    logger.info("Batch analysis of %s starts: %d jobs" % (source, len(jobs)))
+
+    verdicts = Counter()
+    durations = []
+    budgets = OrderedDict()
+    start = time.time()
+
+    output = open(output_filename, 'w') if output_filename else None
+    pool = multiprocessing.Pool(
+        processes=processes,
+        initializer=_batch_worker_init,
+        initargs=(sorted(set(job[1] for job in jobs)), testcase_ids)
+    )
+    try:
+        for job, results, duration in pool.imap_unordered(_batch_worker_analyze, jobs):
+            durations.append((duration, job))
+            for result in results:
+                verdicts[result['verdict']] += 1
+                if result.get('budgets'):
+                    _merge_budgets_usage(budgets, result['testcase_id'], result['budgets'])
+                line = json.dumps(result)
+                if output:
+                    output.write(line + '\n')
+                    output.flush()
+                else:
+                    logger.info(line)
+    finally:
+        pool.close()
+        pool.join()
+        if output:
+            output.close()
+
+    elapsed = time.time() - start
+
+    summary = OrderedDict()
+    summary['jobs'] = len(jobs)
+    summary['testcases'] = sum(verdicts.values())
+    summary['verdicts'] = dict(verdicts)
+    summary['elapsed'] = elapsed
+    summary['jobs_per_second'] = len(jobs) / elapsed if elapsed else 0.0
+    summary['slowest_jobs'] = [
+        {'file': job[0], 'protocol': job[1], 'testcase_id': job[2], 'duration': duration}
+        for duration, job in heapq.nlargest(BATCH_SLOWEST_JOBS, durations, key=lambda d: d[0])
+    ]
+    summary['budgets'] = budgets
+
+    logger.info('Batch analysis finished. Summary:\n%s' % json.dumps(summary, indent=4))
+
+    return summary
+
+
+def _get_batch_jobs(source, protocol, testcase_ids=None):
+    """
+    Builds the (filename, protocol, testcase_id) jobs of a batch analysis from a directory or a manifest file.
+    A None testcase_id stands for all the test cases (or for the testcase_ids ones).
+    """
+
+    def expand(filename, job_protocol, testcase_id=None):
+        if testcase_id:
+            return [(filename, job_protocol, testcase_id)]
+        elif testcase_ids and len(testcase_ids) == 1:
+            return [(filename, job_protocol, testcase_ids[0])]
+        else:
+            return [(filename, job_protocol, None)]
+
+    jobs = []
+
+    if os.path.isdir(source):
+        for filename in sorted(glob.glob(os.path.join(source, '**', '*'), recursive=True)):
+            if filename.endswith(BATCH_CAPTURE_EXTENSIONS):
+                jobs += expand(filename, protocol)
+
+    elif os.path.isfile(source):
+        manifest_dir = os.path.dirname(os.path.abspath(source))
+        with open(source) as manifest:
+            for line in manifest:
+                fields = line.split()
+                if not fields or fields[0].startswith('#'):
+                    continue
+                filename = os.path.join(manifest_dir, fields[0])
+                job_protocol = fields[1].lower() if len(fields) > 1 else protocol
+                jobs += expand(filename, job_protocol, fields[2] if len(fields) > 2 else None)
+
+    else:
+        raise FileNotFoundError('No directory or manifest file found for: %s' % source)
+
+    return jobs
+
+
+# batch worker state, the test cases to analyse when a job has no testcase id
+_batch_worker_testcase_ids = None
+
+
+def _batch_worker_init(protocols, testcase_ids=None):
+    """
+    Warms up a batch worker process, the test cases of the test suites are imported once for all the jobs.
+    """
+    global _batch_worker_testcase_ids
+    _batch_worker_testcase_ids = testcase_ids
+
+    for protocol in protocols:
+        Analyzer('tat_' + protocol).import_test_cases()
+
+
+def _batch_worker_analyze(job):
+    """
+    Runs a batch analysis job into a worker process.
+    Returns the job, its results as JSON serializable dicts and its duration.
+    """
+    filename, protocol, testcase_id = job
+    start = time.time()
+
+    # Budgets usage of the testcases run by this job only
+    TestCase.telemetry.clear()
+
+    try:
+        analyzer = Analyzer('tat_' + protocol)
+        if testcase_id:
+            analysis_results = [analyzer.analyse(filename, testcase_id)]
+        else:
+            analysis_results = analyzer.analyse_all(filename, _batch_worker_testcase_ids)
+
+        results = [
+            OrderedDict([
+                ('file', filename),
+                ('protocol', protocol),
+                ('testcase_id', tc_id),
+                ('verdict', verdict),
+                ('review_frames', rev_frames),
+                ('partial_verdicts', partial_verdicts),
+                ('exceptions', ['%s: %s' % (e[0].__name__, e[1]) for e in exceps]),
+            ])
+            for tc_id, verdict, rev_frames, log, partial_verdicts, exceps in analysis_results
+        ]
+
+    except Exception as e:
+        logger.error('Batch job %s failed: %s' % (str(job), e))
+        results = [
+            OrderedDict([
+                ('file', filename),
+                ('protocol', protocol),
+                ('testcase_id', testcase_id),
+                ('verdict', 'error'),
+                ('review_frames', []),
+                ('partial_verdicts', []),
+                ('exceptions', ['%s: %s' % (type(e).__name__, e)]),
+            ])
+        ]
+
+    duration = time.time() - start
+    budgets = TestCase.telemetry.get_stats()
+    for result in results:
+        result['duration'] = duration
+        result['budgets'] = budgets.get(result['testcase_id'])
+
+    return job, results, duration
+
+
+def _merge_budgets_usage(budgets, testcase_id, usage):
+    """
+    Merges the budgets usage of a testcase run by a batch job into the ones of the batch.
+    """
+    merged = budgets.setdefault(testcase_id, OrderedDict([
+        ('runs', 0),
+        ('exceeded', 0),
+        ('max_duration', 0.0),
+        ('max_frames', 0),
+        ('max_match_calls', 0),
+    ]))
+    merged['runs'] += usage['runs']
+    merged['exceeded'] += usage['exceeded']
+    for key in ('max_duration', 'max_frames', 'max_match_calls'):
+        merged[key] = max(merged[key], usage[key])
+
+
 def dissect_capture(filename, proto_filter=None, output_filename=None, number_of_frames_to_skip=None):
     """
     Dissects (decodes and converts to string representation) network traces (.pcap file).
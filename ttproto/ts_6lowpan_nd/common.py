@@ -44,6 +44,7 @@ from	ttproto.core.control		import *
 from	ttproto.core.data		import *
 from	ttproto.core.snapshot		import *
 from	ttproto.core.lib.ports.socat	import *
+from	ttproto.core.lib.ports.datagram	import *
 from	ttproto.core.exceptions		import TerminateTestcase
 
 from	.config			import *
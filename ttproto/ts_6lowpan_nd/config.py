@@ -31,6 +31,8 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
+import queue
+
 from . import local_config
 from . import implem
 from . import implembR
@@ -53,8 +55,22 @@ class SixLoWPAN_ND (Config):
 	def __init__ (self, profil):
 		Config.__init__ (self)
 
+		# ports to the NUTs, each in its own queue (a testcase takes the
+		# port of its NUT for its whole execution)
+		self.__tap_ports = []
+
+		# ports to the NUTs that do not know the address of the tester yet
+		self.__unknown_ports = set()
+
 		if not local_config.EMULATION_MODE:
-			self.__tap_port = SocatMessagePort("UDP:localhost:13000", Ieee802154)
+			for addr in local_config.NUT_UDP_ADDRS:
+				tap_port = UdpMessagePort (remote_addr = addr, decode_type = Ieee802154)
+				self.__add_tap_port (tap_port)
+				self.__unknown_ports.add (tap_port)
+
+			# the NUTs are isolated from each other, the testcases can
+			# be run concurrently (one per NUT)
+			self.parallel = len (local_config.NUT_UDP_ADDRS) > 1
 		else:
 			
 			clock.Clock.set_instance (clock.SimulatedClock())
@@ -73,7 +89,7 @@ class SixLoWPAN_ND (Config):
 
 
 			self.__implementation.daemon = True
-			self.__tap_port = self.__implementation.get_message_port()
+			self.__add_tap_port (self.__implementation.get_message_port())
 
 			self.__implementation.start()
 
@@ -154,10 +170,42 @@ class SixLoWPAN_ND (Config):
 
 		self["action"] = SUTActionEmulated if local_config.EMULATION_MODE else SUTActionManual
 
-	def __enter__ (self):
-		link1 = SixLowpanMessagePort (self["PANID"], self.__tap_port)
-		self["link1"] = link1
+	def __add_tap_port (self, tap_port):
+		q = queue.Queue()
+		q.put (tap_port)
+		self.__tap_ports.append (q)
+
+	def run (self, testcase, func, **kw):
+		# the NUTs are not reset between the testcases -> pin each
+		# testcase to a NUT (the consecutive testcases go to different
+		# NUTs), so that a NUT always runs the same testcases in the
+		# same order
+		try:
+			index = all_testcases.index (testcase)
+		except ValueError:
+			index = 0
+		tap_ports = self.__tap_ports[index % len (self.__tap_ports)]
+
+		tap_port = tap_ports.get()
+		link1 = SixLowpanMessagePort (self["PANID"], tap_port)
+		try:
+			if tap_port in self.__unknown_ports:
+				# the NUT replies to the peer of the first message
+				# it receives (the 'init' testcase only reaches
+				# one NUT)
+				self.__unknown_ports.discard (tap_port)
+				link1.send (pack (
+					IPv6 (src = "::", dst = "::" ),
+					ICMPv6EchoRequest(),
+					"init()"
+				))
+
+			Config.run (self, testcase, func, link1 = link1, **kw)
+		finally:
+			link1.disconnect()
+			tap_ports.put (tap_port)
 
+	def __enter__ (self):
 		if local_config.EMULATION_MODE:
 			clock.Clock.get_instance().reset()
 
@@ -167,7 +215,5 @@ class SixLoWPAN_ND (Config):
 
 		
 	def __exit__ (self, a, b, c):
-		self["link1"].disconnect()
-
 		if local_config.EMULATION_MODE:
 			clock.Clock.get_instance().reset()
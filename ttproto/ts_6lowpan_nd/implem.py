@@ -46,6 +46,7 @@ class Scheduler (snapshot.EventSource):
 		def __init__ (self, process, name: optional(str)):
 			self.process = process
 			self.name = name
+			self.scheduled = None	# clock.ScheduledEvent
 
 
 	def __init__ (self, clk: optional (clock.Clock) = None):
@@ -61,7 +62,8 @@ class Scheduler (snapshot.EventSource):
 	def reset (self):
 		with self.lock:
 			for e in self.__events:
-				self.__clock.unschedule_events (e)
+				if e.scheduled:
+					e.scheduled.cancel()
 			self.__events  = []
 			self.__expired_events = []
 	
@@ -75,7 +77,8 @@ class Scheduler (snapshot.EventSource):
 	def __unschedule_event (self, process, name: str):
 		ev = self.__find_event (process, name)
 		if ev is not None:
-			self.__clock.unschedule_events (ev)
+			if ev.scheduled:
+				ev.scheduled.cancel()
 			self.__events.remove (ev)
 			try:
 				self.__expired_events.remove (ev)
@@ -93,17 +96,19 @@ class Scheduler (snapshot.EventSource):
 			with self.lock:
 				self.__expired_events.append (ev)
 			
-		return callback
+		return ev, callback
 	
 	@typecheck
 	def schedule_event_relative (self, time: numbers.Number, process, name: optional(str) = None):
 		with self.lock:
-			self.__clock.schedule_event_relative (time, self.__prepare_schedule_event (process, name))
+			ev, callback = self.__prepare_schedule_event (process, name)
+			ev.scheduled = self.__clock.schedule_event_relative (time, callback)
 
 	@typecheck
 	def schedule_event_absolute (self, time: numbers.Number, process, name: optional(str) = None):
 		with self.lock:
-			self.__clock.schedule_event_absolute (time, self.__prepare_schedule_event (process, name))
+			ev, callback = self.__prepare_schedule_event (process, name)
+			ev.scheduled = self.__clock.schedule_event_absolute (time, callback)
 	
 	def evaluate_snapshot(self):
 		self.__snapshot_expired_events = len (self.__expired_events)
@@ -289,40 +294,43 @@ ig.delayRS,
 		(thus they can be received using the yield instruction).
 		"""
 		
-		self.reset()
-
-		while True:
-			with alt:
-
-				# match a scheduled event
-				@self.__scheduler.event
-				def _(ev):
-					ev.process.send (ev.name)		
-
-				# receive an IPv6 message from the communication port
-				@self.__port.receive (IPv6())
-				def _(value):
-					# we get the IPv6 datagram
-					ipv6_msg = value["pl"]["pl"]
-
-					# filter out packets not addressed to this node
-					if ipv6_msg["dst"] not in self.__addresses:
-						print ("Addresses:", self.__addresses)
-						print ("Ignored message (not for us):", ipv6_msg)
-						return
-
-					# check if one process is expecting this message
-					# and report it if any
-					for pattern, process in tuple(self.__message_handlers):
-						if pattern.match (ipv6_msg):
-							# report the IPv6 message to the process
-							# (will be the result of the yield instruction)
-							process.send (ipv6_msg)
-
-				# receive any other message
-				@self.__port.receive
-				def _(value):
-					print ("6lowpan implem: unexpected message:", value)
+		# the implementation runs in its own thread, the name resolution is
+		# not disabled by the testcases
+		with Data.disable_name_resolution():
+			self.reset()
+
+			while True:
+				with alt:
+
+					# match a scheduled event
+					@self.__scheduler.event
+					def _(ev):
+						ev.process.send (ev.name)		
+
+					# receive an IPv6 message from the communication port
+					@self.__port.receive (IPv6())
+					def _(value):
+						# we get the IPv6 datagram
+						ipv6_msg = value["pl"]["pl"]
+
+						# filter out packets not addressed to this node
+						if ipv6_msg["dst"] not in self.__addresses:
+							print ("Addresses:", self.__addresses)
+							print ("Ignored message (not for us):", ipv6_msg)
+							return
+
+						# check if one process is expecting this message
+						# and report it if any
+						for pattern, process in tuple(self.__message_handlers):
+							if pattern.match (ipv6_msg):
+								# report the IPv6 message to the process
+								# (will be the result of the yield instruction)
+								process.send (ipv6_msg)
+
+					# receive any other message
+					@self.__port.receive
+					def _(value):
+						print ("6lowpan implem: unexpected message:", value)
 			
 	def __send (self, msg):
 		"""Send a message to the communication port
@@ -298,40 +298,43 @@ ig.delayRS,
 		(thus they can be received using the yield instruction).
 		"""
 		
-		self.reset()
-
-		while True:
-			with alt:
-
-				# match a scheduled event
-				@self.__scheduler.event
-				def _(ev):
-					ev.process.send (ev.name)		
-
-				# receive an IPv6 message from the communication port
-				@self.__port.receive (IPv6())
-				def _(value):
-					# we get the IPv6 datagram
-					ipv6_msg = value["pl"]["pl"]
-
-					# filter out packets not addressed to this node
-					if ipv6_msg["dst"] not in self.__addresses:
-						print ("Addresses:", self.__addresses)
-						print ("Ignored message (not for us):", ipv6_msg)
-						return
-
-					# check if one process is expecting this message
-					# and report it if any
-					for pattern, process in tuple(self.__message_handlers):
-						if pattern.match (ipv6_msg):
-							# report the IPv6 message to the process
-							# (will be the result of the yield instruction)
-							process.send (ipv6_msg)
-
-				# receive any other message
-				@self.__port.receive
-				def _(value):
-					print ("6lowpan implem: unexpected message:", value)
+		# the implementation runs in its own thread, the name resolution is
+		# not disabled by the testcases
+		with Data.disable_name_resolution():
+			self.reset()
+
+			while True:
+				with alt:
+
+					# match a scheduled event
+					@self.__scheduler.event
+					def _(ev):
+						ev.process.send (ev.name)		
+
+					# receive an IPv6 message from the communication port
+					@self.__port.receive (IPv6())
+					def _(value):
+						# we get the IPv6 datagram
+						ipv6_msg = value["pl"]["pl"]
+
+						# filter out packets not addressed to this node
+						if ipv6_msg["dst"] not in self.__addresses:
+							print ("Addresses:", self.__addresses)
+							print ("Ignored message (not for us):", ipv6_msg)
+							return
+
+						# check if one process is expecting this message
+						# and report it if any
+						for pattern, process in tuple(self.__message_handlers):
+							if pattern.match (ipv6_msg):
+								# report the IPv6 message to the process
+								# (will be the result of the yield instruction)
+								process.send (ipv6_msg)
+
+					# receive any other message
+					@self.__port.receive
+					def _(value):
+						print ("6lowpan implem: unexpected message:", value)
 			
 	def __send (self, msg):
 		"""Send a message to the communication port
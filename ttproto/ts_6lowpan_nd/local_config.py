@@ -33,6 +33,13 @@
 
 EMULATION_MODE	= True
 
+# UDP addresses of the NUTs (when not in emulation mode)
+#
+# Each testcase uses one of them, with several NUTs the testcases are run
+# concurrently (one per NUT, see run_implem.py for running several
+# emulated NUTs).
+NUT_UDP_ADDRS	= [("localhost", 13000)]
+
 # ipv6calc --in prefix+mac --action prefixmac2ipv6 fe80::/10 00:00:00:00:00:42 --out ipv6addr
 # ipv6calc --in mac --action geneui64 00:00:00:00:00:42 --out eui64
 
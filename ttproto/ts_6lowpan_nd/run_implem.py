@@ -42,58 +42,8 @@ from . import implembR
 from . import implemR
 from .common import *
 
-import socket, threading
 import ttproto.core.lib.inet.all
 
-class UdpServerPort (port.RawMessagePort):
-
-	@typecheck
-	def __init__ (self, port_number: int, decode_type: is_type = bytes, endpoint: optional (port.BaseMessagePort) = None):
-		super().__init__ (decode_type, endpoint)
-
-		self.__sock = socket.socket (socket.AF_INET6, socket.SOCK_DGRAM)
-		self.__sock.bind (("", port_number))
-
-		self.__lock = threading.Lock()
-		self.__kill_event = threading.Event()
-		self.__peer = None
-
-		self.__thread = threading.Thread (target = self.__thread_func)
-		self.__thread.daemon = True
-		self.__thread.start()
-
-	def __thread_func (self):
-		try:
-			while True:
-				buff, peer = self.__sock.recvfrom (65535)
-				if self.__kill_event.is_set():
-					# the port is being killed -> just return silently
-					return
-				with self.__lock:
-					if self.__peer != peer:
-						print ("Using new endpoint:", peer)
-						self.__peer = peer
-
-				# forward it
-				self._forward (buff)
-				#TODO: warning if there is no endpoint ?
-
-		except Exception as e:
-			print("Error in receiving thread")
-			traceback.print_exc()
-
-			#TODO: report the error to the tester
-
-	def enqueue (self, msg: Message):
-		assert isinstance (msg.get_binary(), bytes) # supports only byte-aligned data
-
-		with self.__lock:
-			peer = self.__peer
-
-		if peer:
-			self.__sock.sendto (msg.get_binary(), peer)
-		else:	
-			print ("%s: warning: ignored (no known peer yet)" % type(self).__name__)
 @testcase
 def dummy_implem():
 	pass
@@ -110,13 +60,16 @@ def emrs (self):
 port.EventMessageSent.summary = emss
 port.EventMessageReceived.summary = emrs
 
-with LoggerGroup ([ConsoleLogger(), HTMLLogger()]) as logger:
+with QueueLoggerGroup ([ConsoleLogger(), HTMLLogger()]) as logger:
 
 	logger.log_event (EventTestcaseStarted (dummy_implem))
 
 	imp = implem.SixLowpanImplementation (compression = "-c" in sys.argv)
 	imp.get_message_port().add_logger (logger)
-	udp = UdpServerPort (13000, Ieee802154, imp.get_message_port())
+	# usage: run_implem.py [-c] [PORT]
+	# (run one per port listed in local_config.NUT_UDP_ADDRS)
+	udp_port = ([int (a) for a in sys.argv[1:] if a.isdigit()] + [13000])[0]
+	udp = UdpMessagePort (local_addr = ("::", udp_port), decode_type = Ieee802154, endpoint = imp.get_message_port())
 
 	imp.daemon = True
 	imp.start()
@@ -2477,9 +2477,10 @@ def Test_LPND_1_1_12a(NUT , TIMER1 , LBR1 , PRFX1 , link1, action):
 ################################################################################
 
 if __name__ == "__main__":
-	with LoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
+	with QueueLoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
 		Logger.set_default (l)
 #		ts = TestSession ([ init, Test_LPND_1_1_8c ])
 #		ts.set_config(SixLoWPAN_ND, SixLoWPAN_ND("host"))
 #		ts.run()
-		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("host")})
+		# one testcase at a time on each NUT
+		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("host")}, max_parallel = len (local_config.NUT_UDP_ADDRS))
@@ -369,9 +369,10 @@ def Test_LPND_1_5_2a(NUT , TIMER1 , HOST1 , HOST2, PRFX1 , link1, action):
 ################################################################################
 
 if __name__ == "__main__":
-	with LoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
+	with QueueLoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
 		Logger.set_default (l)
 #		ts = TestSession ([ init, Test_LPND_1_1_7a])
 #		ts.set_config(SixLoWPAN_ND, SixLoWPAN_ND())
 #		ts.run()
-		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("borderRouter")})
+		# one testcase at a time on each NUT
+		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("borderRouter")}, max_parallel = len (local_config.NUT_UDP_ADDRS))
@@ -326,9 +326,10 @@ def Test_LPND_1_4_1e(NUT , TIMER1 , HOST1 , LBR1 , LBR2 , PRFX1 , link1, action)
 ################################################################################
 
 if __name__ == "__main__":
-	with LoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
+	with QueueLoggerGroup ([ConsoleLogger(), HTMLLogger()]) as l:
 		Logger.set_default (l)
 #		ts = TestSession ([ init, Test_LPND_1_3_3c])
 #		ts.set_config(SixLoWPAN_ND, SixLoWPAN_ND("router"))
 #		ts.run()
-		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("router")})
+		# one testcase at a time on each NUT
+		run_all_testcases({SixLoWPAN_ND: SixLoWPAN_ND("router")}, max_parallel = len (local_config.NUT_UDP_ADDRS))
@@ -31,7 +31,7 @@
 # The fact that you are presently reading this means that you have had
 # knowledge of the CeCILL license and that you accept its terms.
 
-import traceback, urllib.parse, re
+import traceback, urllib.parse, re, heapq, itertools
 
 
 from ttproto.core.lib.inet.coap import *
@@ -48,6 +48,53 @@ MAX_RETRANSMIT = 4
 
 MAX_TIMEOUT = 10 + round ((RESPONSE_TIMEOUT * RESPONSE_RANDOM_FACTOR) * 2**MAX_RETRANSMIT)
 
+# period (in seconds of capture time) of the garbage collection of the
+# expired states of the CoAPTracker
+GC_PERIOD = MAX_TIMEOUT
+
+
+class TimeoutTable (dict):
+    """A dict whose entries expire
+
+    Entries are stored with a timeout by set(), and a heap of
+    (timeout, key) lets collect() remove the expired ones in timeout order,
+    so that the table only holds the entries that can still be used.
+    """
+    def __init__ (self):
+        super().__init__()
+        self.__timeouts = {}
+        self.__heap = []
+        self.__counter = itertools.count()
+
+    def set (self, key, value, timeout):
+        self[key] = value
+        self.__timeouts[key] = timeout
+        heapq.heappush (self.__heap, (timeout, next (self.__counter), key))
+
+    def collect (self, now, refresh = None):
+        """Remove the entries whose timeout is before now
+
+        refresh(value, now), if given, is called for every expired entry and
+        returns its new timeout: the entry is kept if it is not before now,
+        removed if it is or if refresh returns None.
+        """
+        heap = self.__heap
+        while heap and heap[0][0] < now:
+            timeout, _, key = heapq.heappop (heap)
+            if self.__timeouts.get (key) != timeout:
+                # the entry was set again since, with another timeout
+                continue
+
+            if key in self:
+                new_timeout = refresh (self[key], now) if refresh else None
+                if new_timeout is not None and new_timeout >= now:
+                    self.__timeouts[key] = new_timeout
+                    heapq.heappush (heap, (new_timeout, next (self.__counter), key))
+                    continue
+                del self[key]
+
+            del self.__timeouts[key]
+
 
 class CoAPConversation (list):
     def __init__ (self, request_frame):
@@ -583,20 +630,50 @@ class CoAPTracker:
             self.__tracker = tracker
 
             # msgid -> (conversation, timeout)
-            self.by_mid = {}
+            self.by_mid = TimeoutTable()
 
             # token -> conversation
-            self.by_request_token={}
+            self.by_request_token = TimeoutTable()
 
             # token -> conversation     (Block1)
             # uri   -> conversation     (Block2)
-            self.by_bl = {}
+            self.by_bl = TimeoutTable()
 
             # uri -> conversation
-            self.obs_by_uri = {}
+            self.obs_by_uri = TimeoutTable()
 
             # token -> conversation
-            self.obs_by_token = {}
+            self.obs_by_token = TimeoutTable()
+
+        def collect (self, now):
+            """Garbage-collect the expired states
+
+            The message ids expire with their timeout. The other states expire
+            MAX_TIMEOUT after the last frame of their conversation, unless it
+            is an active observation. Returns True if no state is left.
+            """
+            def conversation_timeout (tr, now):
+                return tr.__timeout
+
+            def observation_timeout (tr, now):
+                return now + MAX_TIMEOUT if tr.__obs_active else tr.__timeout
+
+            def active_observation_timeout (tr, now):
+                # an inactive observation is never looked up by uri
+                return now + MAX_TIMEOUT if tr.__obs_active else None
+
+            self.by_mid.collect (now)
+            self.by_request_token.collect (now, conversation_timeout)
+            self.by_bl.collect (now, conversation_timeout)
+            self.obs_by_uri.collect (now, active_observation_timeout)
+            self.obs_by_token.collect (now, observation_timeout)
+
+            return not (self.by_mid or self.by_request_token or self.by_bl
+                        or self.obs_by_uri or self.obs_by_token)
+
+        def __len__ (self):
+            return (len (self.by_mid) + len (self.by_request_token) + len (self.by_bl)
+                    + len (self.obs_by_uri) + len (self.obs_by_token))
 
         def append (self, frame):
 
@@ -630,7 +707,7 @@ class CoAPTracker:
                         elif bl["m"]:
                             # new block1 conversation w/ more blocks
                             tr = self.__tracker.new_conversation (frame)
-                            self.by_bl[token] = tr
+                            self.by_bl.set (token, tr, frame.ts + MAX_TIMEOUT)
                     else:
                         # block2 option
                         #print (" block2")
@@ -641,7 +718,7 @@ class CoAPTracker:
                         if tr:
                             #print (" delete from by_bl")
                             del self.by_bl[uri]
-                            self.by_request_token[token] = tr
+                            self.by_request_token.set (token, tr, frame.ts + MAX_TIMEOUT)
 
                 except KeyError:
                     # not a block conversation
@@ -664,10 +741,10 @@ class CoAPTracker:
                             # this is a new conversation
                             tr = self.__tracker.new_conversation (frame)
                             tr.__obs_active = True
-                            self.obs_by_uri[uri] = tr
+                            self.obs_by_uri.set (uri, tr, frame.ts + MAX_TIMEOUT)
 
                         # remember the token
-                        self.obs_by_token[token] = tr
+                        self.obs_by_token.set (token, tr, frame.ts + MAX_TIMEOUT)
 
                     except KeyError:
                         if tr and tr.__obs_active:
@@ -677,7 +754,7 @@ class CoAPTracker:
                             # unrelated new conversation
                             tr = self.__tracker.new_conversation (frame)
 
-                        self.by_request_token[token] = tr
+                        self.by_request_token.set (token, tr, frame.ts + MAX_TIMEOUT)
 
                 tr.__uri = uri
                 assert tr
@@ -701,7 +778,7 @@ class CoAPTracker:
                     #print (" bl2[M]", bl2["M"])
 
                     if bl2["M"]:
-                        self.by_bl[tr.__uri] = tr
+                        self.by_bl.set (tr.__uri, tr, frame.ts + MAX_TIMEOUT)
                 except KeyError:
                     #print (" key error 2")
                     pass
@@ -718,7 +795,8 @@ class CoAPTracker:
                 # CON frame w/ known conversation
 
                 # record the mid
-                self.by_mid[mid] = tr, frame.ts + MAX_TIMEOUT
+                timeout = frame.ts + MAX_TIMEOUT
+                self.by_mid.set (mid, (tr, timeout), timeout)
 
             elif typ>1 and not tr:
                 # ACK/RST frame w/o known conversation
@@ -742,6 +820,7 @@ class CoAPTracker:
 
             if tr:
                 tr.append (frame)
+                tr.__timeout = frame.ts + MAX_TIMEOUT
             else:
                 self.__tracker.ignored_frames.append (frame)
 
@@ -754,6 +833,7 @@ class CoAPTracker:
         self.conversations = []
         self.ignored_frames = []
         self.__states = {}
+        self.__next_gc = None
 
     @staticmethod
     def flow_tag (frame):
@@ -770,9 +850,27 @@ class CoAPTracker:
         return t
 
 
+    def collect (self, now):
+        """Garbage-collect the expired states of the flows, and the flows
+        left without any state"""
+        for tag, state in list (self.__states.items()):
+            if state.collect (now):
+                del self.__states[tag]
+
+    def state_count (self):
+        """Return the number of states held for the flows (not collected yet)"""
+        return sum (len (state) for state in self.__states.values())
+
     def append (self, frames):
         for f in frames:
             #print (f)
+            # garbage-collect the expired states every GC_PERIOD
+            if self.__next_gc is None:
+                self.__next_gc = f.ts + GC_PERIOD
+            elif f.ts >= self.__next_gc:
+                self.collect (f.ts)
+                self.__next_gc = f.ts + GC_PERIOD
+
             if not f.coap:
                 # not a coap frame
                 self.ignored_frames.append (f)
@@ -803,10 +901,18 @@ def extract_coap_conversations (frames):
     # tag -> conversation
     actives = {}
 
+    # heap of (timeout, id, tag) of the active conversations
+    timeouts = []
 
-    # TODO: garbage-collect timeouts every N frames
     for f in frames:
 
+        # garbage-collect the expired conversations
+        while timeouts and timeouts[0][0] < f.ts:
+            timeout, _, tag = heapq.heappop (timeouts)
+            t = actives.get (tag)
+            if t and t.timeout == timeout:
+                del actives[tag]
+
         if not f.coap:
             # we care only about coap packets
             ignored_frames.append (f)
@@ -816,20 +922,18 @@ def extract_coap_conversations (frames):
         tag = CoAPConversation.gen_tag (f)
         t = actives.get (tag)
         if t:
-            # we have an existing conversation w/ this tag
-            if f.ts > t.timeout:
-                # this conversation has expired
-                del actives[tag]
-            else:
-                # append this frame to the existing conversation
-                t.append (f)
-                if f.coap.is_request():
-                    t.update_timeout(f)
-                continue
+            # we have an existing (not expired) conversation w/ this tag
+            # -> append this frame to it
+            t.append (f)
+            if f.coap.is_request():
+                t.update_timeout(f)
+                heapq.heappush (timeouts, (t.timeout, t.id, tag))
+            continue
 
         # we have no valid conversation for that tag
 
-        if f.coap.is_response():
+        if not (f.coap.is_request() or (f.coap["code"]==0 and f.coap["type"]==0)):
+            # response or empty ACK/RST
             ignored_frames.append (f)
             continue
 
@@ -842,6 +946,10 @@ def extract_coap_conversations (frames):
 
         assert t.tag == tag
 
+        t.append (f)
+        t.update_timeout (f)
+        heapq.heappush (timeouts, (t.timeout, t.id, tag))
+
         conversations.append (t)
         actives[tag] = t
 
@@ -2332,6 +2332,39 @@ class MsgInteropTestCaseAnalyzeReply(MsgReply):
         "testcase_ref": "http://doc.f-interop.eu/tests/TD_COAP_CORE_01",
     }
 
+
+class MsgInteropTestCaseAnalysisLive(Message):
+    """
+    Requirements: Testing Tool MAY implement
+
+    Type: Event
+
+    Pub/Sub: analysis -> coordination
+
+    Description:
+        - Verdict of the live analysis of a test case, given while the frames of the session are received.
+        - Provisional verdicts (final=False) are published each time the verdict, the review frames or the partial
+        verdicts of the test case change, the final one (final=True) once the test case has finished.
+        - Same fields as analysis.interop.testcase.analyze.reply
+    """
+    routing_key = "analysis.interop.testcase.analysis.live"
+
+    _msg_data_template = {
+        "verdict": "pass",
+        "analysis_type": "live",
+        "final": False,
+        "description": "The test purpose has been verified without any fault detected",
+        "review_frames": [],
+        "partial_verdicts": [
+            [
+                "pass",
+                "<Frame   1: [127.0.0.1 -> 127.0.0.1] CoAP [CON 43521] GET /test> Match: CoAP(type=0, code=1)"
+            ],
+        ],
+        "testcase_id": "TD_COAP_CORE_01",
+        "testcase_ref": "http://doc.f-interop.eu/tests/TD_COAP_CORE_01",
+    }
+
     # # # # # # DISSECTION MESSAGES # # # # # #
 
 
@@ -2931,6 +2964,7 @@ rk_pattern_to_message_type_map = RoutingKeyToMessageMap(
 
         "analysis.interop.testcase.analyze.request": MsgInteropTestCaseAnalyze,  # Testing Tool Internal
         "analysis.interop.testcase.analyze.reply": MsgInteropTestCaseAnalyzeReply,  # Testing Tool Internal
+        "analysis.interop.testcase.analysis.live": MsgInteropTestCaseAnalysisLive,  # Testing Tool Internal
         "dissection.dissectcapture.request": MsgDissectionDissectCapture,  # Testing Tool Internal
         "dissection.dissectcapture.reply": MsgDissectionDissectCaptureReply,  # Testing Tool Internal
 